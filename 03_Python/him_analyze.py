@@ -0,0 +1,457 @@
+'''
+him - Hydrogen Investment Model
+This script analyzes the sensitivity analysis of an experiment. The KPIs of every run are averaged over the runs of a
+sensitivity and the sensitivity indices of every parameter are calculated with SALib, depending on the type of the
+sensitivity analysis in the sensitivity.config of the experiment.
+
+Morris: mu, mu* and sigma of the elementary effects (morris.csv)
+Sobol: first and total order indices with their bootstrap confidence intervals (sobol.csv)
+       first, total and second order indices of the KPIs over time (sobol_year.csv, sobol_s2.csv and one plot per
+       KPI), the bootstrap of every KPI and year runs in a pool of processes
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+             - Sobol indices, also for the first base samples of the design for the progressive Sobol sampling
+             - Sobol indices of the KPIs over time, calculated in a pool of processes and plotted
+             - runs of the screening with a short horizon are left out
+             - KPIs over time of output channels that were not written are skipped
+'''
+
+# import
+import os, sys, multiprocessing
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from SALib.analyze import morris as morrisanalyze
+from SALib.analyze import sobol as sobolanalyze
+import him_store
+
+# globals
+global analyze_settings
+global plot_type
+global plot_settings
+
+# KPIs over time (see him_store.kpi_series), years (year 0 is 2023), processes (0 = all cores) and bootstrap
+analyze_settings = {'kpis': list(him_store.kpi_series.keys()), 'years': [7, 17, 27, 37, 47, 57, 67, 77],
+                    'processes': 0, 'resamples': 100, 'conf_level': 0.95}
+plot_type = 'png'
+plot_settings = {'figsize': (8, 9), 'dpi': 500, 'year0': 2023}
+
+
+def load_sensitivity_config(out_path):
+    '''
+    Function that will load the sensitivity.config of an experiment.
+    :param:
+        str out_path: Path of the output folder
+    :return:
+        dict config: Type, parameters, bounds, levels and values of every sensitivity
+    '''
+    config = {'type': 'None', 'parameters': [], 'bounds': [], 'levels': 4, 'second_order': True, 'values': []}
+    try:
+        with open(os.path.join(out_path, 'sensitivity.config')) as config_file:
+            for line in config_file.readlines():
+                if line.startswith('#') or ':' not in line:
+                    continue
+                name, value = line.split(':', 1)
+                value = value.strip()
+                if name == 'type':
+                    config['type'] = value
+                elif name == 'parameters':
+                    config['parameters'] = value[1:-1].replace(' ', '').split(',')
+                elif name == 'bounds':
+                    config['bounds'] = eval(value)
+                elif name == 'levels':
+                    config['levels'] = int(value)
+                elif name == 'second_order':
+                    config['second_order'] = value == 'True'
+                elif name.startswith('sensitivity_') and not name.endswith('_runs'):
+                    config['values'].append(eval(value))
+    except FileNotFoundError:
+        print('Error in load_sensitivity_config: sensitivity.config not found in ' + out_path + '.')
+        exit(100)
+
+    return config
+
+
+def update_kpis(experiment, kpis):
+    '''
+    Function that will add the KPIs of all completed runs to the list of runs. KPIs that are already known are not
+    loaded again.
+    :param:
+        pd.DataFrame experiment: List of all runs including their state
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+    '''
+    for i in kpis:
+        if 'KPI.' + i not in experiment.columns:
+            experiment['KPI.' + i] = np.nan
+        experiment['KPI.' + i] = pd.to_numeric(experiment['KPI.' + i], errors='coerce')
+        for j in experiment[(experiment['State'] == 'done') & experiment['KPI.' + i].isna()].index:
+            experiment.loc[j, 'KPI.' + i] = him_store.get_kpi(experiment.loc[j, 'Path'], i)
+
+
+def get_kpi_means(experiment, kpis):
+    '''
+    Function that will average the KPIs of the completed runs over the runs of every sensitivity. Runs of the screening
+    with a short horizon are left out.
+    :param:
+        pd.DataFrame experiment: List of all runs including their state and KPIs
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+        pd.DataFrame -: Mean of every KPI for every sensitivity, indexed by the number of the sensitivity
+    '''
+    done = experiment[experiment['State'] == 'done']
+    if 'Fidelity' in done.columns:
+        done = done[done['Fidelity'] != 'low']
+
+    return done.groupby('Sensitivity')[['KPI.' + i for i in kpis]].mean()
+
+
+def load_kpis(out_path, kpis):
+    '''
+    Function that will load the KPIs of all completed runs of an experiment and average them over the runs of every
+    sensitivity.
+    :param:
+        str out_path: Path of the output folder
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+        pd.DataFrame -: Mean of every KPI for every sensitivity, indexed by the number of the sensitivity
+    '''
+    try:
+        experiment = pd.read_csv(os.path.join(out_path, 'manifest.csv'), sep=';')
+    except FileNotFoundError:
+        print('Error in load_kpis: manifest.csv not found in ' + out_path + '.')
+        exit(200)
+    update_kpis(experiment, kpis)
+
+    return get_kpi_means(experiment, kpis)
+
+
+def get_complete_blocks(y, size):
+    '''
+    Function that will mark the blocks of the design (Morris trajectories, Sobol base samples) in which every point has
+    a result.
+    :param:
+        np.array y: Result of every point of the design
+        int size: Number of points per block
+    :return:
+        np.array keep: True for every point of a complete block
+    '''
+    return np.concatenate([np.repeat(np.all(np.isfinite(y[i:i + size])), len(y[i:i + size]))
+                           for i in range(0, len(y), size)])
+
+
+def analyze_morris(out_path, config, kpis):
+    '''
+    Function that will calculate mu, mu* and sigma of the elementary effects for every KPI. Trajectories with a
+    sensitivity without completed runs are left out.
+    :param:
+        str out_path: Path of the output folder
+        dict config: Sensitivity config of the experiment
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+        pd.DataFrame result: mu, mu*, mu* confidence and sigma for every KPI and parameter
+    '''
+    problem = {'num_vars': len(config['parameters']), 'names': config['parameters'], 'bounds': config['bounds']}
+    values = np.array(config['values'], dtype=float)
+    means = load_kpis(out_path, kpis)
+    size = problem['num_vars'] + 1
+
+    list_result = []
+    for i in kpis:
+        y = means['KPI.' + i].reindex(range(1, len(values) + 1)).values
+        keep = get_complete_blocks(y, size)
+        if not np.any(keep):
+            print('Warning in analyze_morris: No complete trajectory for ' + i + '.')
+            continue
+        indices = morrisanalyze.analyze(problem, values[keep], y[keep], num_levels=config['levels'])
+        for j in range(problem['num_vars']):
+            list_result.append({'KPI': i, 'Parameter': problem['names'][j], 'mu': indices['mu'][j],
+                                'mu_star': indices['mu_star'][j], 'mu_star_conf': indices['mu_star_conf'][j],
+                                'sigma': indices['sigma'][j], 'Trajectories': int(sum(keep) / size)})
+    result = pd.DataFrame(list_result)
+    result.to_csv(os.path.join(out_path, 'morris.csv'), sep=';', index=False)
+
+    # Ranking of the parameters by mu* over all KPIs
+    if len(result) > 0:
+        ranking = result.assign(mu_star_rel=result['mu_star'] / result.groupby('KPI')['mu_star'].transform('max'))
+        ranking = ranking.groupby('Parameter')['mu_star_rel'].max().sort_values(ascending=False)
+        print('Parameters ranked by mu* relative to the most influential parameter:')
+        for j in ranking.index:
+            print('  ' + j + ': ' + str(round(ranking[j], 3)))
+
+    return result
+
+
+def get_sobol_step(config):
+    '''
+    Function that will report the number of points per base sample of the Sobol design.
+    :param:
+        dict config: Sensitivity config of the experiment
+    :return:
+        int -: Number of points per base sample
+    '''
+    if config['second_order']:
+        return 2 * len(config['parameters']) + 2
+
+    return len(config['parameters']) + 2
+
+
+def get_sobol_indices(config, means, kpis, no_samples=None):
+    '''
+    Function that will calculate the first and total order indices for every KPI. Base samples with a sensitivity
+    without completed runs are left out.
+    :param:
+        dict config: Sensitivity config of the experiment
+        pd.DataFrame means: Mean of every KPI for every sensitivity
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+        int no_samples: Number of the first base samples to analyze (default = None, all)
+    :return:
+        pd.DataFrame result: S1, ST and their confidence intervals for every KPI and parameter
+    '''
+    problem = {'num_vars': len(config['parameters']), 'names': config['parameters'], 'bounds': config['bounds']}
+    size = get_sobol_step(config)
+    no_values = len(config['values']) if no_samples is None else min(len(config['values']), no_samples * size)
+
+    list_result = []
+    for i in kpis:
+        y = means['KPI.' + i].reindex(range(1, no_values + 1)).values
+        keep = get_complete_blocks(y, size)
+        if sum(keep) < 2 * size or np.std(y[keep]) == 0:
+            continue
+        indices = sobolanalyze.analyze(problem, y[keep], calc_second_order=config['second_order'])
+        for j in range(problem['num_vars']):
+            list_result.append({'KPI': i, 'Parameter': problem['names'][j], 'S1': indices['S1'][j],
+                                'S1_conf': indices['S1_conf'][j], 'ST': indices['ST'][j],
+                                'ST_conf': indices['ST_conf'][j], 'Samples': int(sum(keep) / size)})
+
+    return pd.DataFrame(list_result)
+
+
+def is_sobol_converged(indices, previous, tolerance):
+    '''
+    Function that will check if the Sobol indices are stable. This is the case if no first or total order index changed
+    by more than the tolerance since the previous analysis and all of their confidence intervals are below the
+    tolerance.
+    :param:
+        pd.DataFrame indices: Sobol indices of the current analysis
+        pd.DataFrame previous: Sobol indices of the previous analysis
+        float tolerance: Tolerance for the change and the confidence intervals
+    :return:
+        bool -: True if the indices are stable
+    '''
+    if previous is None or len(indices) == 0 or len(indices) != len(previous):
+        return False
+    current = indices.set_index(['KPI', 'Parameter'])
+    previous = previous.set_index(['KPI', 'Parameter']).reindex(current.index)
+    for i in ['S1', 'ST']:
+        if not np.all(np.abs(current[i] - previous[i]) < tolerance):
+            return False
+        if not np.all(current[i + '_conf'] < tolerance):
+            return False
+
+    return True
+
+
+def analyze_sobol(out_path, config, kpis):
+    '''
+    Function that will calculate the first and total order indices for every KPI from all completed base samples.
+    :param:
+        str out_path: Path of the output folder
+        dict config: Sensitivity config of the experiment
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+        pd.DataFrame result: S1, ST and their confidence intervals for every KPI and parameter
+    '''
+    result = get_sobol_indices(config, load_kpis(out_path, kpis), kpis)
+    result.to_csv(os.path.join(out_path, 'sobol.csv'), sep=';', index=False)
+    if len(result) == 0:
+        print('Warning in analyze_sobol: Not enough complete base samples.')
+
+    return result
+
+
+def load_run_series(task):
+    '''
+    Function that will load the KPIs over time of a run, used by the pool of processes.
+    :param:
+        list task: Index of the run, path of the run folder, names of the KPIs and years
+    :return:
+        int index: Index of the run
+        dict values: Value of every KPI and year as dict {(kpi, year): float}
+    '''
+    index, run_dir, kpis, years = task
+
+    return index, him_store.get_kpi_series(run_dir, kpis, years)
+
+
+def load_kpi_series(out_path, kpis, years, pool):
+    '''
+    Function that will load the KPIs over time of all completed runs of an experiment and average them over the runs of
+    every sensitivity.
+    :param:
+        str out_path: Path of the output folder
+        list kpis: Names of the KPIs (see him_store.kpi_series)
+        list years: Years of the KPIs
+        multiprocessing.Pool pool: Pool of processes
+    :return:
+        pd.DataFrame -: Mean of every KPI and year for every sensitivity, indexed by the number of the sensitivity
+    '''
+    try:
+        experiment = pd.read_csv(os.path.join(out_path, 'manifest.csv'), sep=';')
+    except FileNotFoundError:
+        print('Error in load_kpi_series: manifest.csv not found in ' + out_path + '.')
+        exit(201)
+
+    done = experiment[experiment['State'] == 'done']
+    if 'Fidelity' in done.columns:
+        done = done[done['Fidelity'] != 'low']
+    tasks = [[i, done.loc[i, 'Path'], kpis, years] for i in done.index]
+    values = dict(pool.imap_unordered(load_run_series, tasks, chunksize=max(1, len(tasks) // (4 * os.cpu_count()))))
+    series = pd.DataFrame([values[i] for i in done.index], index=done.index)
+
+    return series.groupby(done['Sensitivity']).mean()
+
+
+def analyze_sobol_task(task):
+    '''
+    Function that will calculate the Sobol indices of a KPI in a year, used by the pool of processes.
+    :param:
+        list task: Name of the KPI, year, SALib problem, results of the design, second order, number of resamples and
+                   confidence level
+    :return:
+        list result: S1, ST and their confidence intervals for every parameter
+        list result_s2: S2 and its confidence interval for every pair of parameters
+    '''
+    kpi, year, problem, y, second_order, resamples, conf_level = task
+    indices = sobolanalyze.analyze(problem, y, calc_second_order=second_order, num_resamples=resamples,
+                                   conf_level=conf_level)
+    result = []
+    result_s2 = []
+    for i in range(problem['num_vars']):
+        result.append({'KPI': kpi, 'Year': year, 'Parameter': problem['names'][i], 'S1': indices['S1'][i],
+                       'S1_conf': indices['S1_conf'][i], 'ST': indices['ST'][i], 'ST_conf': indices['ST_conf'][i]})
+        if second_order:
+            for j in range(i + 1, problem['num_vars']):
+                result_s2.append({'KPI': kpi, 'Year': year, 'Parameter 1': problem['names'][i],
+                                  'Parameter 2': problem['names'][j], 'S2': indices['S2'][i, j],
+                                  'S2_conf': indices['S2_conf'][i, j]})
+
+    return result, result_s2
+
+
+def analyze_sobol_years(out_path, config, kpis=None, years=None, processes=None):
+    '''
+    Function that will calculate the first, total and second order indices with their bootstrap confidence intervals
+    for every KPI and year. The KPIs of the runs are loaded and the bootstrap of every KPI and year is calculated in a
+    pool of processes. Base samples with a sensitivity without completed runs and KPIs of output channels that were not
+    written are left out.
+    :param:
+        str out_path: Path of the output folder
+        dict config: Sensitivity config of the experiment
+        list kpis: Names of the KPIs (default = None, see analyze_settings)
+        list years: Years of the KPIs (default = None, see analyze_settings)
+        int processes: Number of processes, 0 for all cores (default = None, see analyze_settings)
+    :return:
+        pd.DataFrame result: S1, ST and their confidence intervals for every KPI, year and parameter
+        pd.DataFrame result_s2: S2 and its confidence interval for every KPI, year and pair of parameters
+    '''
+    kpis = analyze_settings['kpis'] if kpis is None else kpis
+    channels = him_store.get_channels(out_path)
+    for i in kpis:
+        if him_store.kpi_series[i][0] not in channels:
+            print('Warning in analyze_sobol_years: KPI ' + i + ' is skipped, the output channel '
+                  + him_store.kpi_series[i][0][:-4] + ' was not written.')
+    kpis = [i for i in kpis if him_store.kpi_series[i][0] in channels]
+    years = analyze_settings['years'] if years is None else years
+    processes = analyze_settings['processes'] if processes is None else processes
+    problem = {'num_vars': len(config['parameters']), 'names': config['parameters'], 'bounds': config['bounds']}
+    size = get_sobol_step(config)
+
+    list_result = []
+    list_result_s2 = []
+    with multiprocessing.Pool(processes if processes > 0 else os.cpu_count()) as pool:
+        series = load_kpi_series(out_path, kpis, years, pool)
+        tasks = []
+        for i in kpis:
+            for j in years:
+                if (i, j) not in series.columns:
+                    continue
+                y = series[(i, j)].reindex(range(1, len(config['values']) + 1)).values
+                keep = get_complete_blocks(y, size)
+                if sum(keep) < 2 * size or np.std(y[keep]) == 0:
+                    continue
+                tasks.append([i, j, problem, y[keep], config['second_order'], analyze_settings['resamples'],
+                              analyze_settings['conf_level']])
+        print('Sobol indices for ' + str(len(tasks)) + ' KPIs and years...')
+        for result, result_s2 in pool.imap_unordered(analyze_sobol_task, tasks):
+            list_result += result
+            list_result_s2 += result_s2
+
+    result = pd.DataFrame(list_result, columns=['KPI', 'Year', 'Parameter', 'S1', 'S1_conf', 'ST', 'ST_conf'])
+    result = result.sort_values(['KPI', 'Year', 'Parameter'])
+    result.to_csv(os.path.join(out_path, 'sobol_year.csv'), sep=';', index=False)
+    result_s2 = pd.DataFrame(list_result_s2, columns=['KPI', 'Year', 'Parameter 1', 'Parameter 2', 'S2', 'S2_conf'])
+    result_s2 = result_s2.sort_values(['KPI', 'Year', 'Parameter 1', 'Parameter 2'])
+    result_s2.to_csv(os.path.join(out_path, 'sobol_s2.csv'), sep=';', index=False)
+    plot_sobol_years(out_path, result)
+
+    return result, result_s2
+
+
+def plot_sobol_years(out_path, result):
+    '''
+    Function that will create a plot of the first and total order indices over time for every KPI.
+    :param:
+        str out_path: Path of the output folder
+        pd.DataFrame result: S1, ST and their confidence intervals for every KPI, year and parameter
+    :return:
+    '''
+    for i in result['KPI'].unique():
+        df_kpi = result[result['KPI'] == i]
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=plot_settings['figsize'], dpi=plot_settings['dpi'], sharex=True)
+        for j in df_kpi['Parameter'].unique():
+            df_plot = df_kpi[df_kpi['Parameter'] == j].sort_values('Year')
+            x = df_plot['Year'] + plot_settings['year0']
+            for ax, index in [[ax1, 'S1'], [ax2, 'ST']]:
+                line, = ax.plot(x, df_plot[index], marker='o', label=j)
+                ax.fill_between(x, df_plot[index] - df_plot[index + '_conf'], df_plot[index] + df_plot[index + '_conf'],
+                                color=line.get_color(), alpha=0.2)
+        ax1.set_ylabel('First order index S1 [-]')
+        ax2.set_ylabel('Total order index ST [-]')
+        ax2.set_xlabel('Year')
+        ax1.set_title(i)
+        ax1.legend(loc='upper left', bbox_to_anchor=(1, 1))
+        plt.savefig(os.path.join(out_path, 'sobol_' + i + '.' + plot_type), bbox_inches='tight')
+        plt.close(fig)
+
+
+def analyze_experiment(out_path, kpis):
+    '''
+    Function that will analyze an experiment depending on the type of its sensitivity analysis.
+    :param:
+        str out_path: Path of the output folder
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+    '''
+    config = load_sensitivity_config(out_path)
+    if config['type'] == 'Morris':
+        analyze_morris(out_path, config, kpis)
+    elif config['type'] == 'Sobol' and len(config['parameters']) > 1:
+        analyze_sobol(out_path, config, kpis)
+        analyze_sobol_years(out_path, config)
+    else:
+        print('No analysis for sensitivity type ' + config['type'] + '.')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Error: Use python him_analyze.py <outdir> [kpi, ...]')
+        exit(300)
+    result_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output')
+    path = sys.argv[1] if os.path.isdir(sys.argv[1]) else os.path.join(result_dir, sys.argv[1])
+    analyze_experiment(path, sys.argv[2:] if len(sys.argv) > 2 else list(him_store.kpi_settings.keys()))
@@ -0,0 +1,401 @@
+'''
+him - Hydrogen Investment Model
+This script runs a daemon that keeps a pool of workers with a loaded model and runs all experiments submitted to its
+spool folder, so a new experiment does not wait for the start of the JVMs and the model. The runs of all experiments
+are handed out in turns, one chunk per experiment, so a small experiment is not stuck behind a large one. Every
+experiment is saved in its own output folder like with him_run_model.
+
+Use:
+python him_daemon.py serve [workers|auto]
+python him_daemon.py submit [init_dir]
+python him_daemon.py status
+python him_daemon.py stop
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+             - automatic number of workers and heap of the JVMs with concurrent_runs: auto or serve auto
+             - a submission that can not be created for any reason is marked as failed and does not stop the daemon
+             - Morris and Sobol experiments are analyzed in a separate process, so the runs of the other experiments
+               are handed out meanwhile
+'''
+
+# import
+import os, sys, shutil, time, multiprocessing
+import pandas as pd
+from datetime import datetime
+import him_pool, him_run_model, him_analyze
+
+# globals
+global spool_dir
+global daemon_settings
+
+spool_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output', 'spool')
+# poll: time to wait for the workers and new experiments in seconds, status: time between updates of status.csv in
+# seconds
+daemon_settings = {'poll': 1.0, 'status': 10.0}
+
+
+def run_job(run_name, run_no, run_dir, config, horizon, mode, stop, callback=None):
+    '''
+    Function that will run a single run of an experiment with the warm start and the early stop of its experiment.
+    :param:
+        str run_name: Name of the run
+        int run_no: Number of the run
+        str run_dir: Path to the output folder
+        dict config: Lines of the config as dict {'model': list, 'branch': list} (None, load the files)
+        int horizon: Number of ticks of the run
+        str mode: Warm start of the runs - none, run or config
+        dict stop: Early stop as {'years': int, 'tol': float} (None, no early stop)
+        function callback: Function called with the tick and the new lines of the output tables (default = None)
+    :return:
+        dict -: Result of the run (see him_run_model.run_model)
+    '''
+    him_run_model.warm_start = mode.lower()
+    him_run_model.early_stop = stop
+
+    return him_run_model.run_model(run_name, run_no, run_dir, config, horizon, callback)
+
+
+def analyze_job(list_path, kpis):
+    '''
+    Function that will analyze a finished experiment in a separate process of the daemon.
+    :param:
+        list list_path: Output folders of the experiment and its scenarios
+        list kpis: Names of the KPIs (see him_store.kpi_settings)
+    :return:
+    '''
+    for i in list_path:
+        him_analyze.analyze_experiment(i, kpis)
+
+
+def submit_experiment(init_dir=None):
+    '''
+    Function that will submit an experiment to the daemon. The runs.init is copied into the queue of the spool folder
+    in one step, so the daemon never reads an incomplete file. The ID of the experiment is the name of its output
+    folder.
+    :param:
+        str init_dir: Folder of the runs.init file (default = None, current folder)
+    :return:
+        str job_id: ID of the experiment
+    '''
+    init_dir = os.getcwd() if init_dir is None else init_dir
+    if not os.path.isfile(os.path.join(init_dir, 'runs.init')):
+        print('Error in submit_experiment: runs.init not found in ' + init_dir + '.')
+        exit(100)
+
+    queue_dir = os.path.join(spool_dir, 'queue')
+    os.makedirs(queue_dir, exist_ok=True)
+    job_id = datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
+    i = 1
+    while os.path.exists(os.path.join(queue_dir, job_id)) or \
+            os.path.exists(os.path.join(os.path.dirname(spool_dir), job_id)):
+        job_id = datetime.now().strftime('%Y-%m-%d-%H-%M-%S') + '-' + str(i)
+        i += 1
+    tmp_dir = os.path.join(queue_dir, job_id + '.tmp')
+    os.makedirs(tmp_dir)
+    shutil.copy(os.path.join(init_dir, 'runs.init'), tmp_dir)
+    os.replace(tmp_dir, os.path.join(queue_dir, job_id))
+    print('Experiment ' + job_id + ' submitted')
+
+    return job_id
+
+
+def load_status():
+    '''
+    Function that will load the status of all experiments of the daemon.
+    :return:
+        pd.DataFrame status: State and progress of every experiment
+    '''
+    try:
+        return pd.read_csv(os.path.join(spool_dir, 'status.csv'), sep=';', keep_default_na=False)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=['Job', 'State', 'Runs', 'Done', 'Failed', 'Submitted', 'Started', 'Finished'])
+
+
+def write_status(status):
+    '''
+    Function that will write the status of all experiments of the daemon. The file is replaced in one step.
+    :param:
+        pd.DataFrame status: State and progress of every experiment
+    :return:
+    '''
+    out_file = os.path.join(spool_dir, 'status.csv')
+    status.to_csv(out_file + '.tmp', sep=';', index=False)
+    os.replace(out_file + '.tmp', out_file)
+
+
+def update_status(status, job, state=None):
+    '''
+    Function that will update the state and the progress of an experiment in the status.
+    :param:
+        pd.DataFrame status: State and progress of every experiment
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        str state: New state of the experiment (default = None, unchanged)
+    :return:
+        pd.DataFrame status: State and progress of every experiment
+    '''
+    if job['id'] not in status['Job'].values:
+        status = pd.concat([status, pd.DataFrame([{'Job': job['id'], 'Submitted': job['submitted']}])],
+                           ignore_index=True)
+    i = status.index[status['Job'] == job['id']][0]
+    if state is not None:
+        status.loc[i, 'State'] = state
+        if state == 'running':
+            status.loc[i, 'Started'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        elif state in ['done', 'failed']:
+            status.loc[i, 'Finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if 'experiment' in job:
+        status.loc[i, 'Runs'] = len(job['experiment'])
+        status.loc[i, 'Done'] = sum(job['experiment']['State'] == 'done')
+        status.loc[i, 'Failed'] = sum(job['experiment']['State'] == 'failed')
+
+    return status
+
+
+def accept_jobs(status):
+    '''
+    Function that will create the experiments of all submissions in the queue of the spool folder. A submission with an
+    invalid runs.init is marked as failed and removed from the queue, the other experiments of the daemon go on.
+    :param:
+        pd.DataFrame status: State and progress of every experiment
+    :return:
+        list jobs: New experiments, each as state of the experiment (see him_run_model.start_experiment)
+        pd.DataFrame status: State and progress of every experiment
+    '''
+    jobs = []
+    queue_dir = os.path.join(spool_dir, 'queue')
+    if not os.path.isdir(queue_dir):
+        return jobs, status
+
+    for job_id in sorted(os.listdir(queue_dir)):
+        init_dir = os.path.join(queue_dir, job_id)
+        if job_id.endswith('.tmp') or not os.path.isdir(init_dir):
+            continue
+        submitted = datetime.fromtimestamp(os.path.getmtime(init_dir)).strftime('%Y-%m-%d %H:%M:%S')
+        print('Experiment ' + job_id + ' is started')
+        try:
+            out_dir, experiment = him_run_model.create_experiment(init_dir, job_id)
+            job = him_run_model.start_experiment(os.path.join(os.path.dirname(spool_dir), out_dir), experiment)
+        except (SystemExit, Exception) as error:
+            print('Error in accept_jobs: Experiment ' + job_id + ' could not be created with ' + repr(error))
+            status = update_status(status, {'id': job_id, 'submitted': submitted}, 'failed')
+            shutil.rmtree(init_dir, ignore_errors=True)
+            continue
+        job.update({'id': job_id, 'submitted': submitted, 'busy': 0, 'attempts': {}, 'runs': []})
+        job['runs'] = [get_entry(job, i) for i in job['order']]
+        jobs.append(job)
+        status = update_status(status, job, 'running')
+        shutil.rmtree(init_dir, ignore_errors=True)
+
+    return jobs, status
+
+
+def check_analyses(status, analyses):
+    '''
+    Function that will update the state of the experiments whose analysis ended.
+    :param:
+        pd.DataFrame status: State and progress of every experiment
+        list analyses: Analyses of finished experiments, each as [process, job]
+    :return:
+        pd.DataFrame status: State and progress of every experiment
+        list list_running: Analyses that are still running, each as [process, job]
+    '''
+    list_running = []
+    for process, job in analyses:
+        if process.is_alive():
+            list_running.append([process, job])
+            continue
+        process.join()
+        state = 'done' if process.exitcode == 0 else 'failed'
+        status = update_status(status, job, state)
+        print('Experiment ' + job['id'] + ' is ' + state)
+
+    return status, list_running
+
+
+def get_entry(job, i):
+    '''
+    Function that will return a run of an experiment as it is handed out to the workers of the daemon. The index of the
+    run includes the ID of its experiment.
+    :param:
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        int i: Index of the run
+    :return:
+        list -: Run as [(job_id, index), run_name, run_no, run_dir, config, horizon, warm_start, stop]
+    '''
+    entry = him_run_model.get_run(job, i)
+
+    return [(job['id'], i)] + entry[1:] + [job['options']['warm_start'], job['stop']]
+
+
+def get_next_job(jobs, turn):
+    '''
+    Function that will return the next experiment in turn that has runs left to hand out.
+    :param:
+        list jobs: Running experiments
+        int turn: Position of the experiment whose turn it is
+    :return:
+        int -: Position of the next experiment (None if no experiment has runs left)
+    '''
+    for i in range(len(jobs)):
+        if len(jobs[(turn + i) % len(jobs)]['runs']) > 0:
+            return (turn + i) % len(jobs)
+
+    return None
+
+
+def serve(no_workers=None):
+    '''
+    Function that will run the daemon until it is stopped with python him_daemon.py stop. The pool is started with the
+    settings of the runs.init in the current folder. Runs that were handed out when the daemon is stopped are marked
+    as running in the manifest.csv of their experiment, so it can be finished with him_run_model.py --resume. Morris
+    and Sobol experiments are analyzed in a separate process, the daemon waits for these processes when it is
+    stopped.
+    :param:
+        int no_workers: Number of workers, 0 for an automatic number (default = None, concurrent_runs of the runs.init)
+    :return:
+    '''
+    init = him_run_model.load_init()
+    options = init[7]
+    no_workers = init[1] if no_workers is None else no_workers
+    jvm_args, auto = him_run_model.get_pool_sizing(no_workers, options)
+    model_file = him_run_model.check_model() + '\\main.nlogo'
+    os.makedirs(spool_dir, exist_ok=True)
+    stop_file = os.path.join(spool_dir, 'stop')
+    if os.path.isfile(stop_file):
+        os.remove(stop_file)
+
+    pool = him_pool.start_pool(no_workers, him_run_model.initializer, (model_file,), run_job,
+                               him_run_model.get_memory, options['recycle_runs'], options['recycle_memory'],
+                               options['timeout'], options['timeout_tick'], jvm_args, auto)
+    print('Daemon is running with ' + str(len(pool['workers'])) + ' workers, submit experiments with python '
+          + 'him_daemon.py submit')
+    status = load_status()
+    jobs = []
+    analyses = []
+    turn = 0
+    last_write = 0
+    try:
+        while not os.path.isfile(stop_file):
+            new_jobs, status = accept_jobs(status)
+            jobs += new_jobs
+
+            # Hand out one chunk of the next experiment in turn to every idle worker
+            for worker_id in him_pool.get_idle_workers(pool):
+                turn = get_next_job(jobs, turn)
+                if turn is None:
+                    turn = 0
+                    break
+                job = jobs[turn]
+                if him_pool.is_warmup(pool) and him_pool.is_busy(pool):
+                    break
+                size = 1 if him_pool.is_warmup(pool) else \
+                    him_run_model.get_chunksize(len(job['runs']), len(pool['workers']), job['options']['chunksize'])
+                chunk = job['runs'][:size]
+                del job['runs'][:size]
+                job['busy'] += len(chunk)
+                him_run_model.set_running(job, [entry[0][1] for entry in chunk])
+                him_pool.submit(pool, worker_id, chunk)
+                turn += 1
+
+            # Collect the results, runs of dead workers are handed out again
+            results, lost = him_pool.get_results(pool, daemon_settings['poll'])
+            dict_jobs = {job['id']: job for job in jobs}
+            for entry in lost:
+                dict_jobs[entry[0][0]]['runs'].insert(0, entry)
+                dict_jobs[entry[0][0]]['busy'] -= 1
+            for index, result, runtime, tables in results:
+                job = dict_jobs[index[0]]
+                job['busy'] -= 1
+                job['attempts'][index[1]] = job['attempts'].get(index[1], 0) + 1
+                attempts = job['attempts'][index[1]]
+                if not result:
+                    him_run_model.reset_run(job['experiment'].loc[index[1], 'Path'])
+                    if attempts <= job['options']['retries']:
+                        print('Run ' + str(job['experiment'].loc[index[1], 'No']) + ' of ' + job['id']
+                              + ' failed and is retried')
+                        job['runs'].append(get_entry(job, index[1]))
+                        continue
+                list_more = him_run_model.update_experiment(job, index[1], result, runtime, tables, attempts)
+                job['runs'] += [get_entry(job, i) for i in list_more]
+
+            # Finish the experiments without runs left, the analysis runs in a separate process
+            for job in [job for job in jobs if len(job['runs']) == 0 and job['busy'] == 0]:
+                state = 'done'
+                try:
+                    list_path = him_run_model.finish_experiment(job, analyze=False)
+                except Exception as error:
+                    print('Error in serve: Experiment ' + job['id'] + ' could not be finished with ' + repr(error))
+                    list_path = []
+                    state = 'failed'
+                if len(list_path) > 0:
+                    process = multiprocessing.Process(target=analyze_job, args=(list_path, job['options']['kpis']))
+                    process.start()
+                    analyses.append([process, job])
+                    state = 'analyzing'
+                status = update_status(status, job, state)
+                jobs.remove(job)
+                print('Experiment ' + job['id'] + ' is ' + state)
+                last_write = 0
+            status, list_running = check_analyses(status, analyses)
+            if len(list_running) < len(analyses):
+                last_write = 0
+            analyses = list_running
+
+            if time.time() - last_write > daemon_settings['status']:
+                for job in jobs:
+                    status = update_status(status, job)
+                write_status(status)
+                last_write = time.time()
+    finally:
+        him_pool.close_pool(pool)
+        for job in jobs:
+            him_run_model.update_manifest(job, force=True)
+            status = update_status(status, job, 'stopped')
+        for process, job in analyses:
+            print('Wait for the analysis of experiment ' + job['id'])
+            process.join()
+        status = check_analyses(status, analyses)[0]
+        write_status(status)
+        if os.path.isfile(stop_file):
+            os.remove(stop_file)
+
+    print('Daemon stopped')
+
+
+def print_status():
+    '''
+    Function that will print the state and the progress of all experiments of the daemon, including the submissions
+    that were not started yet.
+    :return:
+    '''
+    status = load_status()
+    queue_dir = os.path.join(spool_dir, 'queue')
+    if os.path.isdir(queue_dir):
+        queued = [{'Job': i, 'State': 'queued'} for i in sorted(os.listdir(queue_dir)) if not i.endswith('.tmp')]
+        status = pd.concat([status, pd.DataFrame(queued)], ignore_index=True)
+    if len(status) == 0:
+        print('No experiments submitted')
+    else:
+        print(status.fillna('').to_string(index=False))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ['serve', 'submit', 'status', 'stop']:
+        print('Error: Use python him_daemon.py serve [workers|auto], submit [init_dir], status or stop')
+        exit(300)
+    if sys.argv[1] == 'serve':
+        serve((0 if sys.argv[2] == 'auto' else int(sys.argv[2])) if len(sys.argv) > 2 else None)
+    elif sys.argv[1] == 'submit':
+        submit_experiment(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif sys.argv[1] == 'status':
+        print_status()
+    else:
+        os.makedirs(spool_dir, exist_ok=True)
+        open(os.path.join(spool_dir, 'stop'), 'w').close()
+        print('Daemon is stopped, unfinished experiments can be finished with python him_run_model.py --resume '
+              '<outdir>')
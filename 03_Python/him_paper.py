@@ -61,6 +61,9 @@ changelog:
 0.1.25.5.20 - fixed missing cases in sensitivity analysis and added more figures
 0.1.25.6.3 - changed the way sensitivity plots look, also comment not needed plots out
 0.1.25.11.10 - added functions for sensitivity analysis for learning rate
+0.1.26.10.18 - runs with missing files (e.g. failed runs) are skipped instead of stopping the script
+             - tables are loaded with him_store, so runs saved as results.npz can be used as well
+             - results of experiments with restricted output channels are rejected, the figures need all files
 '''
 
 # import
@@ -72,6 +75,7 @@ import numpy as np
 import seaborn as sb
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+import him_store
 
 from matplotlib.legend_handler import HandlerTuple
 from matplotlib.ticker import MultipleLocator, AutoMinorLocator
@@ -203,6 +207,21 @@ dfHistoricalData = pd.DataFrame(data=[[2000, 2001, 2002, 2003, 2004, 2005, 2006,
 dfHistoricalData = dfHistoricalData.T
 
 
+def check_channels(resultDir):
+    '''
+    Function that checks if the experiment in the given directory wrote all files needed for the figures.
+    :param:
+        str resultDir: Name of the directory to check.
+    :return:
+    '''
+    channels = him_store.get_channels(os.path.join(os.getcwd(), resultDir))
+    missing = [i for i in listFiles if i not in channels]
+    if len(missing) > 0:
+        print('Error in check_channels: ' + resultDir + ' was run without the output channels ' +
+              ', '.join(i[:-4] for i in missing) + '. The figures need all output channels.')
+        exit(301)
+
+
 def check_data(resultDir):
     '''
     Function that checks if all files exists in the given directory.
@@ -210,14 +229,17 @@ def check_data(resultDir):
         str resultDir: Name of the directory to check.
     :return:
     '''
+    check_channels(resultDir)
     NoRuns = 0
     wkdir = os.getcwd()
     for i in os.listdir(os.path.join(wkdir, resultDir, 'Sensitivity_1')):
         if i.startswith('Run_'):
-            for j in listFiles:
-                if not os.path.isfile(os.path.join(wkdir, resultDir, 'Sensitivity_1', i, j)):
-                    print('Error in check_data: ' + resultDir + '\\Sensitivity_1\\' + i + '\\' + j + ' not found.')
-                    exit(200)
+            missing = [j for j in listFiles
+                       if not him_store.has_table(os.path.join(wkdir, resultDir, 'Sensitivity_1', i), j)]
+            if len(missing) > 0:
+                print('Warning in check_data: ' + resultDir + '\\Sensitivity_1\\' + i + '\\' + missing[0] +
+                      ' not found. Run is skipped.')
+                continue
             NoRuns += 1
     print(str(NoRuns) + ' runs found.')
 
@@ -262,14 +284,16 @@ def check_sensitivity(resultCsv):
     # Check data for each run
     for i in sensDf['run']:
         print('Check ' + str(i) + '...')
+        check_channels(i)
         NoRuns = 0
         wkdir = os.getcwd()
         for j in os.listdir(os.path.join(wkdir, i)):
             if j.startswith('Run_'):
-                for k in listFiles:
-                    if not os.path.isfile(os.path.join(wkdir, i, j, k)):
-                        print('Error in check_sensitivity: ' + i + '\\' + j + '\\' + k + ' not found.')
-                        exit(301)
+                missing = [k for k in listFiles if not him_store.has_table(os.path.join(wkdir, i, j), k)]
+                if len(missing) > 0:
+                    print('Warning in check_sensitivity: ' + i + '\\' + j + '\\' + missing[0] +
+                          ' not found. Run is skipped.')
+                    continue
                 NoRuns += 1
         print(str(NoRuns) + ' runs found.')
 
@@ -288,10 +312,8 @@ def load_data(resultDir):
     listRuns = []
     for i in os.listdir(os.path.join(wkdir, resultDir, 'Sensitivity_1')):
         if i.startswith('Run_'):
-            for j in listFiles:
-                if not os.path.isfile(os.path.join(wkdir, resultDir, 'Sensitivity_1', i, j)):
-                    print('Error in check_date: ' + resultDir + '\\Sensitivity_1\\' + i + '\\' + j + ' not found.')
-                    exit(400)
+            if any(not him_store.has_table(os.path.join(wkdir, resultDir, 'Sensitivity_1', i), j) for j in listFiles):
+                continue
             listRuns.append(i)
 
     # Load data for all runs
@@ -300,8 +322,7 @@ def load_data(resultDir):
         listDf = []
         for i in listRuns:
             try:
-                file = (os.path.join(wkdir, resultDir, 'Sensitivity_1', i, j))
-                tmpDf = pd.read_csv(file, sep=';')
+                tmpDf = him_store.load_table(os.path.join(wkdir, resultDir, 'Sensitivity_1', i), j)
                 tmpDf['Run'] = np.ones(len(tmpDf.index)) * int(i.split('_')[1])
                 listDf.append(tmpDf)
             except FileNotFoundError:
@@ -325,10 +346,11 @@ def load_data_sens(resultDir):
     listRuns = []
     for i in os.listdir(os.path.join(wkdir, resultDir)):
         if i.startswith('Run_'):
-            for j in listFiles:
-                if not os.path.isfile(os.path.join(wkdir, resultDir, i, j)):
-                    print('Error in check_date: ' + resultDir + '\\' + i + '\\' + j + ' not found.')
-                    exit(400)
+            missing = [j for j in listFiles if not him_store.has_table(os.path.join(wkdir, resultDir, i), j)]
+            if len(missing) > 0:
+                print('Warning in load_data_sens: ' + resultDir + '\\' + i + '\\' + missing[0] +
+                      ' not found. Run is skipped.')
+                continue
             listRuns.append(i)
 
     # Load data for all runs
@@ -337,8 +359,7 @@ def load_data_sens(resultDir):
         listDf = []
         for i in listRuns:
             try:
-                file = (os.path.join(wkdir, resultDir, i, j))
-                tmpDf = pd.read_csv(file, sep=';')
+                tmpDf = him_store.load_table(os.path.join(wkdir, resultDir, i), j)
                 tmpDf['Run'] = np.ones(len(tmpDf.index)) * int(i.split('_')[1])
                 listDf.append(tmpDf)
             except FileNotFoundError:
@@ -400,16 +421,18 @@ def check_learningrate(resultDir):
         string resultDir: Name of the folder with the learning rate sensitivity
     :return:
     '''
+    check_channels(resultDir)
     NoRuns = 0
     wkdir = os.getcwd()
     for i in os.listdir(os.path.join(wkdir, resultDir)):
         if i.startswith('Sensitivity_'):
             for j in os.listdir(os.path.join(wkdir, resultDir, i)):
                 if j.startswith('Run_'):
-                    for k in listFiles:
-                        if not os.path.isfile(os.path.join(wkdir, resultDir, i, j, k)):
-                            print('Error in check_learningrate: ' + resultDir + '\\' + i + '\\' + j + '\\' + k + 'not found.')
-                            exit(400)
+                    missing = [k for k in listFiles if not him_store.has_table(os.path.join(wkdir, resultDir, i, j), k)]
+                    if len(missing) > 0:
+                        print('Warning in check_learningrate: ' + resultDir + '\\' + i + '\\' + j + '\\' +
+                              missing[0] + ' not found. Run is skipped.')
+                        continue
                     NoRuns += 1
     print(str(NoRuns) + ' runs found.')
 
@@ -427,15 +450,15 @@ def load_learningrate(resultDir):
     # Get list of Sensitivity
     listSens = []
     listRuns = []
+    listSkip = []
     listLearningRate = np.arange(0.08, 0.18, 0.01)
     for i in os.listdir(os.path.join(wkdir, resultDir)):
         if i.startswith('Sensitivity_'):
             for j in os.listdir(os.path.join(wkdir, resultDir, i)):
                 if j.startswith('Run_'):
-                    for k in listFiles:
-                        if not os.path.isfile(os.path.join(wkdir, resultDir, i, j, k)):
-                            print('Error in load_learningrate: ' + resultDir + '\\' + i + '\\' + j + '\\' + k + 'not found.')
-                            exit(500)
+                    if any(not him_store.has_table(os.path.join(wkdir, resultDir, i, j), k) for k in listFiles):
+                        listSkip.append((i, j))
+                        continue
                     if j not in listRuns:
                         listRuns.append(j)
             if i not in listSens:
@@ -447,9 +470,10 @@ def load_learningrate(resultDir):
         listDf = []
         for j in listRuns:
             for i in listSens:
+                if (i, j) in listSkip or not os.path.isdir(os.path.join(wkdir, resultDir, i, j)):
+                    continue
                 try:
-                    file = (os.path.join(wkdir, resultDir, i, j, k))
-                    tmpDf = pd.read_csv(file, sep=';')
+                    tmpDf = him_store.load_table(os.path.join(wkdir, resultDir, i, j), k)
                     tmpDf['Run'] = np.ones(len(tmpDf.index)) * int(j.split('_')[1])
                     tmpDf['Sensitivity'] = np.ones(len(tmpDf.index)) * int(i.split('_')[1])
                     tmpDf['LearningRate'] = np.ones(len(tmpDf.index)) * listLearningRate[int(int(i.split('_')[1]) - 1)]
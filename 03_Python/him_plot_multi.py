@@ -42,11 +42,15 @@ changelog:
 0.1.24.07.16 - add load data
              - add plots for no. of agents
 0.2.24.07.19 - feature complete
+0.2.26.10.18 - runs with missing files (e.g. failed runs) are skipped instead of stopping the script
+             - tables are loaded with him_store, so runs saved as results.npz can be used as well
+             - only the files of the output channels are checked, plots of the other files are skipped
 '''
 import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import him_store
 
 global list_files
 global plot_type
@@ -78,18 +82,19 @@ x = list(range(year0, year0 + delta_year))
 
 def check_data():
     '''
-    Function that checks if all files exists.
+    Function that checks if all files of the output channels exists.
     :return:
     '''
     wkdir = os.getcwd()
-    global list_runs
+    global list_runs, list_channels
     list_runs = []
+    list_channels = [i for i in list_files if i in him_store.get_channels(wkdir)]
     for i in os.listdir(wkdir):
         if i.startswith('Run_'):
-            for j in list_files:
-                if not os.path.isfile(str(i + '\\' + j)):
-                    print('Error in check_data: ' + i + '\\' + j + ' not found.')
-                    exit(100)
+            missing = [j for j in list_channels if not him_store.has_table(i, j)]
+            if len(missing) > 0:
+                print('Warning in check_data: ' + i + '\\' + missing[0] + ' not found. Run is skipped.')
+                continue
             list_runs.append(i)
     print(str(len(list_runs)) + ' runs found.')
 
@@ -103,11 +108,13 @@ def load_data():
     tmp_list = []
     wkdir = os.getcwd()
     for j in list_files:
+        if j not in list_channels:
+            tmp_list.append(None)
+            continue
         list_df = []
         for i in list_runs:
             try:
-                file = (str(wkdir) + '\\' + i + '\\' + j)
-                tmp_df = pd.read_csv(file, sep=';')
+                tmp_df = him_store.load_table(os.path.join(wkdir, i), j)
                 tmp_df['Run'] = np.ones(len(tmp_df.index)) * int(i.split('_')[1])
                 list_df.append(tmp_df)
             except FileNotFoundError:
@@ -118,6 +125,21 @@ def load_data():
     return (tmp_list)
 
 
+def call_plot(function, *list_df):
+    '''
+    Function that will create a plot if all its tables were loaded. Plots that need a table of an output channel that
+    was not written by the runs are skipped.
+    :param:
+        function function: Function of the plot
+        pd.DataFrame list_df: Tables of the plot
+    :return:
+    '''
+    if any(df is None for df in list_df):
+        print('Warning in call_plot: ' + function.__name__ + ' is skipped, its tables were not written.')
+        return
+    function(*list_df)
+
+
 def plot_no_of_agents(df_pm, df_hm, df_em):
     '''
     Will create the plot of the number of agents for all three markets.
@@ -3381,60 +3403,60 @@ def main(dir):
 
     # Create all plots
     print('Create plots for multiple runs...')
-    plot_no_of_agents(df_pm, df_hm, df_em)
-    plot_no_of_investment(df_pm, df_hm, df_em)
-    plot_ratio_investment_agents(df_pm, df_hm, df_em)
-    plot_installed_cap_res(df_pm)
-    plot_installed_cap_elc(df_hm)
-    plot_installed_cap_man(df_em)
-    plot_installed_cap_all(df_pm, df_hm, df_em)
-    plot_capacity_extension(df_pm, df_hm, df_em)
-    plot_capacity_extension_max(df_pp, df_hp, df_ep)
-    plot_electricity_production(df_pm_daily)
-    plot_electricity_production_share(df_pm_daily)
-    plot_electricity_production_excess(df_pm_daily)
-    plot_hydrogen_production(df_hm, df_hm_daily)
-    plot_utilization_elc(df_hm_daily)
-    plot_utilization_all(df_res, df_elc, df_ep)
-    plot_utilization_elc_res(df_res, df_elc)
+    call_plot(plot_no_of_agents, df_pm, df_hm, df_em)
+    call_plot(plot_no_of_investment, df_pm, df_hm, df_em)
+    call_plot(plot_ratio_investment_agents, df_pm, df_hm, df_em)
+    call_plot(plot_installed_cap_res, df_pm)
+    call_plot(plot_installed_cap_elc, df_hm)
+    call_plot(plot_installed_cap_man, df_em)
+    call_plot(plot_installed_cap_all, df_pm, df_hm, df_em)
+    call_plot(plot_capacity_extension, df_pm, df_hm, df_em)
+    call_plot(plot_capacity_extension_max, df_pp, df_hp, df_ep)
+    call_plot(plot_electricity_production, df_pm_daily)
+    call_plot(plot_electricity_production_share, df_pm_daily)
+    call_plot(plot_electricity_production_excess, df_pm_daily)
+    call_plot(plot_hydrogen_production, df_hm, df_hm_daily)
+    call_plot(plot_utilization_elc, df_hm_daily)
+    call_plot(plot_utilization_all, df_res, df_elc, df_ep)
+    call_plot(plot_utilization_elc_res, df_res, df_elc)
     #plot_weighted_utilization_all(df_res, df_elc, df_man)
     #plot_duration_curves_res(df_pm, df_pm_daily)
     #plot_duration_curves_elc(df_hm_daily)
-    plot_load_type_elc(df_pm, df_hm)
-    plot_p_elc_vs_lcoe(df_pm)
-    plot_p_h2_vs_lcoh(df_hm)
-    plot_p_elc_vs_p_h2(df_pm, df_hm)
-    plot_p_elc_ave_vs_lcoe_ave(df_ep, df_sale)
-    plot_p_elc_vs_c_elc(df_sale)
-    plot_investment_threshold_pp(df_pp, df_pm)
-    plot_investment_threshold_hp(df_hp, df_hm)
-    plot_investment_threshold_ep(df_ep, df_em)
-    plot_weighted_investment_threshold_pp(df_pp, df_pm)
-    plot_weighted_investment_threshold_hp(df_hp, df_hm)
-    plot_weighted_investment_threshold_ep(df_ep, df_em)
-    plot_age_res(df_res)
-    plot_age_elc(df_elc)
-    plot_age_man(df_man)
-    plot_weighted_age_res(df_res)
-    plot_weighted_age_elc(df_elc)
-    plot_weighted_age_man(df_man)
-    plot_profitability(df_pp, df_hp, df_ep)
-    plot_profitability_min_max(df_pp, df_hp, df_ep)
-    plot_weighted_profitability(df_pp, df_hp, df_ep)
-    plot_liquidity_pp(df_pp)
-    plot_liquidity_hp(df_hp)
-    plot_liquidity_ep(df_ep)
-    plot_w2p_elc_vs_c_elc(df_hp, df_hm, df_man)
-    plot_w2p_elc_vs_c_elc_vs_p_elc(df_sale)
-    plot_w2p_elc_spec_cashflow_investment_threshold(df_hp, df_hm)
-    plot_final_p_elc(df_sale)
-    plot_p_elc(df_pm)
-    plot_p_h2(df_hm)
+    call_plot(plot_load_type_elc, df_pm, df_hm)
+    call_plot(plot_p_elc_vs_lcoe, df_pm)
+    call_plot(plot_p_h2_vs_lcoh, df_hm)
+    call_plot(plot_p_elc_vs_p_h2, df_pm, df_hm)
+    call_plot(plot_p_elc_ave_vs_lcoe_ave, df_ep, df_sale)
+    call_plot(plot_p_elc_vs_c_elc, df_sale)
+    call_plot(plot_investment_threshold_pp, df_pp, df_pm)
+    call_plot(plot_investment_threshold_hp, df_hp, df_hm)
+    call_plot(plot_investment_threshold_ep, df_ep, df_em)
+    call_plot(plot_weighted_investment_threshold_pp, df_pp, df_pm)
+    call_plot(plot_weighted_investment_threshold_hp, df_hp, df_hm)
+    call_plot(plot_weighted_investment_threshold_ep, df_ep, df_em)
+    call_plot(plot_age_res, df_res)
+    call_plot(plot_age_elc, df_elc)
+    call_plot(plot_age_man, df_man)
+    call_plot(plot_weighted_age_res, df_res)
+    call_plot(plot_weighted_age_elc, df_elc)
+    call_plot(plot_weighted_age_man, df_man)
+    call_plot(plot_profitability, df_pp, df_hp, df_ep)
+    call_plot(plot_profitability_min_max, df_pp, df_hp, df_ep)
+    call_plot(plot_weighted_profitability, df_pp, df_hp, df_ep)
+    call_plot(plot_liquidity_pp, df_pp)
+    call_plot(plot_liquidity_hp, df_hp)
+    call_plot(plot_liquidity_ep, df_ep)
+    call_plot(plot_w2p_elc_vs_c_elc, df_hp, df_hm, df_man)
+    call_plot(plot_w2p_elc_vs_c_elc_vs_p_elc, df_sale)
+    call_plot(plot_w2p_elc_spec_cashflow_investment_threshold, df_hp, df_hm)
+    call_plot(plot_final_p_elc, df_sale)
+    call_plot(plot_p_elc, df_pm)
+    call_plot(plot_p_h2, df_hm)
     #plot_cashflow_system(df_pm_daily, df_hp, df_ep)
-    plot_best_profitability(df_pp, df_hp, df_ep)
-    plot_return_on_investment_agents(df_pp, df_hp, df_ep)
-    plot_return_on_investment_all(df_res, df_elc, df_man)
-    plot_weighted_return_on_investment_all(df_res, df_elc, df_man)
+    call_plot(plot_best_profitability, df_pp, df_hp, df_ep)
+    call_plot(plot_return_on_investment_agents, df_pp, df_hp, df_ep)
+    call_plot(plot_return_on_investment_all, df_res, df_elc, df_man)
+    call_plot(plot_weighted_return_on_investment_all, df_res, df_elc, df_man)
     print('Done.')
 
 
@@ -40,11 +40,15 @@ author: Jesse
 
 changelog:
 0.1.24.07.19 - start new script
+0.1.26.10.18 - runs with missing files (e.g. failed runs) are skipped instead of stopping the script
+             - tables are loaded with him_store, so runs saved as results.npz can be used as well
+             - only the files of the output channels are checked, plots of the other files are skipped
 '''
 import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import him_store
 
 from matplotlib.legend_handler import HandlerTuple
 
@@ -126,21 +130,24 @@ def check_sensitivity_config():
 
 def check_data():
     '''
-    Function that checks if all files exists.
+    Function that checks if all files of the output channels exists.
     :return:
     '''
     wkdir = os.getcwd()
-    global list_sens, list_runs
+    global list_sens, list_runs, list_skip, list_channels
     list_sens = []
     list_runs = []
+    list_skip = []
+    list_channels = [i for i in list_files if i in him_store.get_channels(wkdir)]
     for i in os.listdir(wkdir):
         if i.startswith('Sensitivity_'):
             for j in os.listdir(os.path.join(wkdir, i)):
                 if j.startswith('Run_'):
-                    for k in list_files:
-                        if not os.path.isfile(os.path.join(wkdir, i, j, k)):
-                            print('Error in check_data: ' + i + '\\' + j + '\\' + k + ' not found.')
-                            exit(200)
+                    missing = [k for k in list_channels if not him_store.has_table(os.path.join(wkdir, i, j), k)]
+                    if len(missing) > 0:
+                        print('Warning in check_data: ' + i + '\\' + j + '\\' + missing[0] + ' not found. Run is skipped.')
+                        list_skip.append((i, j))
+                        continue
                     if j not in list_runs:
                         list_runs.append(j)
             list_sens.append(i)
@@ -156,12 +163,16 @@ def load_data():
     tmp_list = []
     wkdir = os.getcwd()
     for k in list_files:
+        if k not in list_channels:
+            tmp_list.append(None)
+            continue
         list_df = []
         for j in list_runs:
             for i in list_sens:
+                if (i, j) in list_skip or not os.path.isdir(os.path.join(wkdir, i, j)):
+                    continue
                 try:
-                    file = (str(wkdir) + '\\' + i + '\\' + j + '\\' + k)
-                    tmp_df = pd.read_csv(file, sep=';')
+                    tmp_df = him_store.load_table(os.path.join(wkdir, i, j), k)
                     tmp_df['Run'] = np.ones(len(tmp_df.index)) * int(j.split('_')[1])
                     tmp_df['Sensitivity'] = np.ones(len(tmp_df.index)) * int(i.split('_')[1])
                     list_df.append(tmp_df)
@@ -173,6 +184,21 @@ def load_data():
     return(tmp_list)
 
 
+def call_plot(function, *list_df):
+    '''
+    Function that will create a plot if all its tables were loaded. Plots that need a table of an output channel that
+    was not written by the runs are skipped.
+    :param:
+        function function: Function of the plot
+        pd.DataFrame list_df: Tables of the plot
+    :return:
+    '''
+    if any(df is None for df in list_df):
+        print('Warning in call_plot: ' + function.__name__ + ' is skipped, its tables were not written.')
+        return
+    function(*list_df)
+
+
 def plot_no_of_agents(df_pm, df_hm, df_em):
     '''
     Will create the plot of the number of agents for all three markets.
@@ -2764,37 +2790,37 @@ def main(dir):
 
     # Create all plots
     print('Create plots for sensitivity analysis...')
-    plot_no_of_agents(df_pm, df_hm, df_em)
-    plot_no_of_investment(df_pm, df_hm, df_em)
-    plot_ratio_investment_agents(df_pm, df_hm, df_em)
-    plot_installed_cap_res(df_pm)
-    plot_installed_cap_elc(df_hm)
-    plot_installed_cap_man(df_em)
-    plot_installed_cap_all(df_pm, df_hm, df_em)
-    plot_electricity_production(df_pm_daily)
-    plot_hydrogen_production(df_hm, df_hm_daily)
-    plot_utilization_elc(df_hm_daily)
+    call_plot(plot_no_of_agents, df_pm, df_hm, df_em)
+    call_plot(plot_no_of_investment, df_pm, df_hm, df_em)
+    call_plot(plot_ratio_investment_agents, df_pm, df_hm, df_em)
+    call_plot(plot_installed_cap_res, df_pm)
+    call_plot(plot_installed_cap_elc, df_hm)
+    call_plot(plot_installed_cap_man, df_em)
+    call_plot(plot_installed_cap_all, df_pm, df_hm, df_em)
+    call_plot(plot_electricity_production, df_pm_daily)
+    call_plot(plot_hydrogen_production, df_hm, df_hm_daily)
+    call_plot(plot_utilization_elc, df_hm_daily)
     #plot_duration_curves_res(df_pm, df_pm_daily)
     #plot_duration_curves_elc(df_hm_daily)
     #plot_load_type_elc(df_pm, df_hm)
-    plot_p_elc_vs_lcoe(df_pm)
-    plot_p_h2_vs_lcoh(df_hm)
-    plot_p_elc_ave_vs_lcoe_ave(df_ep, df_sale)
-    plot_p_elc_vs_c_elc(df_sale)
-    plot_investment_threshold_pp(df_pp)
-    plot_investment_threshold_hp(df_hp)
-    plot_investment_threshold_ep(df_ep)
-    plot_weighted_investment_threshold_pp(df_pp)
-    plot_weighted_investment_threshold_hp(df_hp)
-    plot_weighted_investment_threshold_ep(df_ep)
-    plot_age_res(df_res)
-    plot_age_elc(df_elc)
-    plot_age_man(df_man)
-    plot_weighted_age_res(df_res)
-    plot_weighted_age_elc(df_elc)
-    plot_weighted_age_man(df_man)
-    plot_profitability(df_pp, df_hp, df_ep)
-    plot_weighted_profitability(df_pp, df_hp, df_ep)
+    call_plot(plot_p_elc_vs_lcoe, df_pm)
+    call_plot(plot_p_h2_vs_lcoh, df_hm)
+    call_plot(plot_p_elc_ave_vs_lcoe_ave, df_ep, df_sale)
+    call_plot(plot_p_elc_vs_c_elc, df_sale)
+    call_plot(plot_investment_threshold_pp, df_pp)
+    call_plot(plot_investment_threshold_hp, df_hp)
+    call_plot(plot_investment_threshold_ep, df_ep)
+    call_plot(plot_weighted_investment_threshold_pp, df_pp)
+    call_plot(plot_weighted_investment_threshold_hp, df_hp)
+    call_plot(plot_weighted_investment_threshold_ep, df_ep)
+    call_plot(plot_age_res, df_res)
+    call_plot(plot_age_elc, df_elc)
+    call_plot(plot_age_man, df_man)
+    call_plot(plot_weighted_age_res, df_res)
+    call_plot(plot_weighted_age_elc, df_elc)
+    call_plot(plot_weighted_age_man, df_man)
+    call_plot(plot_profitability, df_pp, df_hp, df_ep)
+    call_plot(plot_weighted_profitability, df_pp, df_hp, df_ep)
     print('Done.')
 
 
@@ -40,6 +40,8 @@ author: Jesse
 changelog:
 0.1.24.07.03 - start new script
 0.1.24.07.15 - feature complete
+0.1.26.10.18 - tables are loaded with him_store, so runs saved as results.npz can be used as well
+             - only the files of the output channels are checked, plots of the other files are skipped
 '''
 
 # import
@@ -47,6 +49,7 @@ import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import him_store
 
 # global
 global list_files
@@ -78,12 +81,14 @@ x = list(range(year0, year0+delta_year))
 
 def check_data():
     '''
-    Function that checks if all files exists.
+    Function that checks if all files of the output channels exists.
     :return:
     '''
     wkdir = os.getcwd()
-    for i in list_files:
-        if not os.path.isfile(str(wkdir + '\\' + i)):
+    global list_channels
+    list_channels = [i for i in list_files if i in him_store.get_channels(wkdir)]
+    for i in list_channels:
+        if not him_store.has_table(wkdir, i):
             print('Error in check_data: ' + i + ' not found.')
             exit(100)
 
@@ -97,9 +102,11 @@ def load_data():
     tmp_list = []
     wkdir = os.getcwd()
     for i in list_files:
+        if i not in list_channels:
+            tmp_list.append(None)
+            continue
         try:
-            file = str(wkdir + '\\' + i)
-            tmp_df = pd.read_csv(file, sep=';')
+            tmp_df = him_store.load_table(wkdir, i)
             tmp_list.append(tmp_df)
         except FileNotFoundError:
             print('Error in load_data: ' + i + ' not found.')
@@ -108,6 +115,21 @@ def load_data():
     return(tmp_list)
 
 
+def call_plot(function, *list_df):
+    '''
+    Function that will create a plot if all its tables were loaded. Plots that need a table of an output channel that
+    was not written by the runs are skipped.
+    :param:
+        function function: Function of the plot
+        pd.DataFrame list_df: Tables of the plot
+    :return:
+    '''
+    if any(df is None for df in list_df):
+        print('Warning in call_plot: ' + function.__name__ + ' is skipped, its tables were not written.')
+        return
+    function(*list_df)
+
+
 def plot_no_of_agents(df_pm, df_hm, df_em):
     '''
     Function that will create a plot of the no. of agents.
@@ -1391,37 +1413,37 @@ def main(dir):
 
     # Create all plots
     print('Create plots for single run...')
-    plot_no_of_agents(df_pm, df_hm, df_em)
-    plot_no_of_investment(df_pm, df_hm, df_em)
-    plot_ratio_investment_agents(df_pm, df_hm, df_em)
-    plot_installed_cap_res(df_pm)
-    plot_installed_cap_elc(df_hm)
-    plot_installed_cap_man(df_em)
-    plot_installed_cap_all(df_pm, df_hm, df_em)
-    plot_electricity_production(df_pm_daily)
-    plot_hydrogen_production(df_hm, df_hm_daily)
-    plot_utilization_elc(df_hm_daily)
-    plot_duration_curves_res(df_pm, df_pm_daily)
-    plot_duration_curves_elc(df_hm_daily)
-    plot_load_type_elc(df_pm, df_hm)
-    plot_p_elc_vs_lcoe(df_pm)
-    plot_p_h2_vs_lcoh(df_hm)
-    plot_p_elc_ave_vs_lcoe_ave(df_ep, df_sale)
-    plot_p_elc_vs_c_elc(df_sale)
-    plot_investment_threshold_pp(df_pp)
-    plot_investment_threshold_hp(df_hp)
-    plot_investment_threshold_ep(df_ep)
-    plot_weighted_investment_threshold_pp(df_pp)
-    plot_weighted_investment_threshold_hp(df_hp)
-    plot_weighted_investment_threshold_ep(df_ep)
-    plot_age_res(df_res)
-    plot_age_elc(df_elc)
-    plot_age_man(df_man)
-    plot_weighted_age_res(df_res)
-    plot_weighted_age_elc(df_elc)
-    plot_weighted_age_man(df_man)
-    plot_profitability(df_pp, df_hp, df_ep)
-    plot_weighted_profitability(df_pp, df_hp, df_ep)
+    call_plot(plot_no_of_agents, df_pm, df_hm, df_em)
+    call_plot(plot_no_of_investment, df_pm, df_hm, df_em)
+    call_plot(plot_ratio_investment_agents, df_pm, df_hm, df_em)
+    call_plot(plot_installed_cap_res, df_pm)
+    call_plot(plot_installed_cap_elc, df_hm)
+    call_plot(plot_installed_cap_man, df_em)
+    call_plot(plot_installed_cap_all, df_pm, df_hm, df_em)
+    call_plot(plot_electricity_production, df_pm_daily)
+    call_plot(plot_hydrogen_production, df_hm, df_hm_daily)
+    call_plot(plot_utilization_elc, df_hm_daily)
+    call_plot(plot_duration_curves_res, df_pm, df_pm_daily)
+    call_plot(plot_duration_curves_elc, df_hm_daily)
+    call_plot(plot_load_type_elc, df_pm, df_hm)
+    call_plot(plot_p_elc_vs_lcoe, df_pm)
+    call_plot(plot_p_h2_vs_lcoh, df_hm)
+    call_plot(plot_p_elc_ave_vs_lcoe_ave, df_ep, df_sale)
+    call_plot(plot_p_elc_vs_c_elc, df_sale)
+    call_plot(plot_investment_threshold_pp, df_pp)
+    call_plot(plot_investment_threshold_hp, df_hp)
+    call_plot(plot_investment_threshold_ep, df_ep)
+    call_plot(plot_weighted_investment_threshold_pp, df_pp)
+    call_plot(plot_weighted_investment_threshold_hp, df_hp)
+    call_plot(plot_weighted_investment_threshold_ep, df_ep)
+    call_plot(plot_age_res, df_res)
+    call_plot(plot_age_elc, df_elc)
+    call_plot(plot_age_man, df_man)
+    call_plot(plot_weighted_age_res, df_res)
+    call_plot(plot_weighted_age_elc, df_elc)
+    call_plot(plot_weighted_age_man, df_man)
+    call_plot(plot_profitability, df_pp, df_hp, df_ep)
+    call_plot(plot_weighted_profitability, df_pp, df_hp, df_ep)
     print('Done.')
 
 
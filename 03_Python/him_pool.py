@@ -0,0 +1,452 @@
+'''
+him - Hydrogen Investment Model
+This script provides the pool of workers for him_run_model. Every worker is a process with its own NetLogo workspace.
+The pool keeps track of the runs and the JVM memory of every worker, recycles a worker after a number of runs or
+above a memory limit and restarts workers that died or exceeded the time limit of a run.
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+             - workers are killed if a run exceeds the time limit per run or per tick
+             - tables collected from the model every tick are sent with the tick and merged when the run is done
+             - every process of a worker has its own token, late messages of a killed or recycled process are dropped
+             - optional automatic number of workers and JVM heap from the peak memory and CPU time of the runs, the
+               first run is a warm-up run and the pool is resized whenever later runs need more memory, the heap is
+               sized from the used heap and capped by the memory budget
+             - every process of a worker sends its messages through its own pipe, which is discarded when it is killed,
+               workers that die before they are ready are restarted with a backoff and the pool stops after
+               max_failures of them in a row
+'''
+
+# import
+import multiprocessing, multiprocessing.connection, time, os, math, ctypes
+import him_store
+
+# globals
+global pool_settings
+
+# max_failures: workers of a slot in a row that die before they are ready, backoff: time to wait before the restart of
+# such a worker in seconds, doubled after every failure
+pool_settings = {'max_failures': 3, 'backoff': 2.0}
+
+
+def get_total_memory():
+    '''
+    Function that will report the physical memory of the machine.
+    :return:
+        float -: Physical memory in MB
+    '''
+    if os.name == 'nt':
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+        return status.ullTotalPhys / 1048576
+
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1048576
+
+
+def get_peak_rss():
+    '''
+    Function that will report the peak resident memory of the current process, including the JVM.
+    :return:
+        float -: Peak resident memory in MB
+    '''
+    if os.name == 'nt':
+        class MemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = MemoryCounters()
+        counters.cb = ctypes.sizeof(MemoryCounters)
+        ctypes.windll.kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+        ctypes.windll.psapi.GetProcessMemoryInfo.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong]
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                                 counters.cb)
+        return counters.PeakWorkingSetSize / 1048576
+
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker_main(worker_id, initializer, initargs, jvm_args, function_run, function_memory, task_queue, result_conn):
+    '''
+    Main loop of a worker. The worker initializes its workspace once and then runs every chunk it gets from its task
+    queue until it gets None. Every completed run is reported with the heap of the JVM, the CPU time of the run and the
+    peak memory of the worker. Every message carries the ID of the worker with the token of its process.
+    :param:
+        tuple worker_id: ID of the worker and token of its process
+        function initializer: Function to initialize the workspace
+        tuple initargs: Arguments for the initializer
+        list jvm_args: Arguments for the JVM, passed to the initializer as jvm_args (None without arguments)
+        function function_run: Function to run a single run, called with a callback for the tick and the tables
+        function function_memory: Function that reports the memory of the workspace in MB
+        multiprocessing.Queue task_queue: Queue with the chunks for this worker
+        multiprocessing.Connection result_conn: Pipe for the messages to the pool
+    :return:
+    '''
+    if jvm_args:
+        initializer(*initargs, jvm_args=jvm_args)
+    else:
+        initializer(*initargs)
+    result_conn.send(['ready', worker_id, function_memory()])
+
+    while True:
+        chunk = task_queue.get()
+        if chunk is None:
+            break
+
+        for entry in chunk:
+            result_conn.send(['start', worker_id, entry[0]])
+            start = time.time()
+            start_cpu = time.process_time()
+            try:
+                result = function_run(*entry[1:], callback=lambda tick, tables=None: result_conn.send(
+                    ['tick', worker_id, tick, tables]))
+            except Exception as error:
+                print('Error in worker_main: Run ' + str(entry[2]) + ' failed with ' + repr(error))
+                result = False
+            result_conn.send(['done', worker_id, entry[0], result, time.time() - start, function_memory(),
+                              time.process_time() - start_cpu, get_peak_rss()])
+
+
+def start_pool(no_workers, initializer, initargs, function_run, function_memory, max_runs=0, max_memory=0, timeout=0,
+               timeout_tick=0, jvm_args=None, auto=None):
+    '''
+    Function that will start the pool of workers. With an automatic number of workers the pool starts with a single
+    worker for the warm-up run.
+    :param:
+        int no_workers: Number of workers
+        function initializer: Function to initialize the workspace of a worker
+        tuple initargs: Arguments for the initializer
+        function function_run: Function to run a single run
+        function function_memory: Function that reports the memory of the workspace in MB
+        int max_runs: Number of runs after which a worker is recycled (default = 0, never)
+        int max_memory: Memory of the workspace in MB above which a worker is recycled (default = 0, never)
+        float timeout: Time limit for a run in seconds (default = 0, none)
+        float timeout_tick: Time limit for a tick in seconds (default = 0, none)
+        list jvm_args: Arguments for the JVM of every worker (default = None, none)
+        dict auto: Automatic sizing as {'budget': memory of all workers in MB, 'cores': int, 'min_workers': int,
+                   'workers': bool, 'heap': bool} (default = None, fixed)
+    :return:
+        dict pool: State of the pool
+    '''
+    if auto is not None and auto['workers']:
+        no_workers = 1
+    pool = {'workers': {}, 'restart': {}, 'failures': {}, 'initializer': initializer, 'initargs': initargs,
+            'function_run': function_run, 'function_memory': function_memory, 'max_runs': max_runs,
+            'max_memory': max_memory, 'timeout': timeout, 'timeout_tick': timeout_tick,
+            'jvm_args': list(jvm_args) if jvm_args is not None else [], 'auto': auto, 'size': no_workers, 'heap': 0,
+            'generation': 0, 'profile': [], 'token': 0}
+    for worker_id in range(no_workers):
+        start_worker(pool, worker_id)
+
+    return pool
+
+
+def start_worker(pool, worker_id):
+    '''
+    Function that will start a new worker with its own pipe for the messages to the pool.
+    :param:
+        dict pool: State of the pool
+        int worker_id: ID of the worker
+    :return:
+    '''
+    task_queue = multiprocessing.Queue()
+    jvm_args = pool['jvm_args'] + (['-Xmx' + str(pool['heap']) + 'm'] if pool['heap'] > 0 else [])
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    pool['token'] += 1
+    process = multiprocessing.Process(target=worker_main, args=((worker_id, pool['token']), pool['initializer'],
+                                                                pool['initargs'], jvm_args, pool['function_run'],
+                                                                pool['function_memory'], task_queue, writer),
+                                      daemon=True)
+    process.start()
+    writer.close()
+    pool['restart'].pop(worker_id, None)
+    pool['workers'][worker_id] = {'process': process, 'token': pool['token'], 'task_queue': task_queue,
+                                  'reader': reader, 'ready': False, 'task': [], 'current': None, 'start': None,
+                                  'tick': None, 'tables': [], 'runs': 0, 'memory': 0, 'generation': pool['generation']}
+
+
+def stop_worker(pool, worker_id, kill=False):
+    '''
+    Function that will stop a worker. A worker is either asked to finish or killed right away.
+    :param:
+        dict pool: State of the pool
+        int worker_id: ID of the worker
+        bool kill: Kill the worker instead of waiting for it (default = False)
+    :return:
+    '''
+    worker = pool['workers'].pop(worker_id)
+    if not kill and worker['process'].is_alive():
+        worker['task_queue'].put(None)
+        worker['process'].join(timeout=60)
+    if worker['process'].is_alive():
+        worker['process'].kill()
+        worker['process'].join()
+    worker['reader'].close()
+
+
+def restart_worker(pool, worker_id, kill=False):
+    '''
+    Function that will replace a worker by a new one.
+    :param:
+        dict pool: State of the pool
+        int worker_id: ID of the worker
+        bool kill: Kill the worker instead of waiting for it (default = False)
+    :return:
+    '''
+    stop_worker(pool, worker_id, kill)
+    start_worker(pool, worker_id)
+
+
+def is_warmup(pool):
+    '''
+    Function that will report if the pool is waiting for the warm-up run to size itself. During the warm-up only single
+    runs should be handed out.
+    :param:
+        dict pool: State of the pool
+    :return:
+        bool -: True during the warm-up
+    '''
+    return pool['auto'] is not None and pool['auto']['workers'] and len(pool['profile']) == 0
+
+
+def resize_pool(pool):
+    '''
+    Function that will choose the heap of the JVMs and the number of workers from the completed runs. The heap is twice
+    the largest used heap of the last runs and only grows, up to the memory budget of the minimal number of workers,
+    new workers and idle workers are restarted with it. The number
+    of workers is limited by the memory budget, with the peak memory of the workers plus 20%, and by the cores, with
+    the median CPU time per runtime of the last runs.
+    :param:
+        dict pool: State of the pool
+    :return:
+    '''
+    auto = pool['auto']
+    recent = pool['profile'][-20:]
+    if auto is None or len(recent) == 0:
+        return
+
+    heap = max(i['heap'] for i in recent)
+    max_heap = 256 * int(auto['budget'] / (1.2 * max(1, auto['min_workers'])) / 256)
+    if auto['heap'] and heap > 0.75 * pool['heap'] and pool['heap'] < max_heap:
+        pool['heap'] = min(max_heap, max(512, 256 * math.ceil(2 * heap / 256)))
+        pool['generation'] += 1
+        print('JVM heap of the workers is set to ' + str(pool['heap']) + ' MB')
+
+    if auto['workers']:
+        memory = 1.2 * max(max(i['rss'] for i in recent), pool['heap'])
+        cpu = sorted(i['cpu'] / max(i['runtime'], 1e-3) for i in recent)[len(recent) // 2]
+        size = max(1, min(int(auto['budget'] / memory), round(auto['cores'] / max(cpu, 0.5))))
+        if size != pool['size']:
+            print('Pool is resized to ' + str(size) + ' workers (' + str(round(memory)) + ' MB and '
+                  + str(round(cpu, 2)) + ' cores per run)')
+            pool['size'] = size
+        worker_id = 0
+        while len(pool['workers']) + len(pool['restart']) < pool['size']:
+            if worker_id not in pool['workers'] and worker_id not in pool['restart']:
+                start_worker(pool, worker_id)
+            worker_id += 1
+
+
+def submit(pool, worker_id, chunk):
+    '''
+    Function that will hand out a chunk of runs to a worker.
+    :param:
+        dict pool: State of the pool
+        int worker_id: ID of the worker
+        list chunk: List of runs, each as [index, run_name, run_no, run_dir, config]
+    :return:
+    '''
+    pool['workers'][worker_id]['task'] = list(chunk)
+    pool['workers'][worker_id]['task_queue'].put(list(chunk))
+
+
+def get_idle_workers(pool):
+    '''
+    Function that will report all workers without a chunk. Idle workers that reached the limit for runs or memory or
+    were started with an older heap are recycled first, idle workers above the size of the pool are stopped.
+    :param:
+        dict pool: State of the pool
+    :return:
+        list idle: IDs of the idle workers
+    '''
+    idle = []
+    for worker_id in list(pool['workers'].keys()):
+        worker = pool['workers'][worker_id]
+        if len(worker['task']) > 0:
+            continue
+        if len(pool['workers']) > pool['size']:
+            stop_worker(pool, worker_id)
+            continue
+        if worker['generation'] < pool['generation']:
+            restart_worker(pool, worker_id)
+        elif (pool['max_runs'] > 0 and worker['runs'] >= pool['max_runs']) or \
+                (pool['max_memory'] > 0 and worker['memory'] >= pool['max_memory']):
+            print('Worker ' + str(worker_id) + ' is recycled after ' + str(worker['runs']) + ' runs ('
+                  + str(round(worker['memory'])) + ' MB)')
+            restart_worker(pool, worker_id)
+        idle.append(worker_id)
+
+    return idle
+
+
+def is_busy(pool):
+    '''
+    Function that will report if any worker has a chunk.
+    :param:
+        dict pool: State of the pool
+    :return:
+        bool -: True if any worker has a chunk
+    '''
+    return any(len(worker['task']) > 0 for worker in pool['workers'].values())
+
+
+def is_timeout(pool, worker):
+    '''
+    Function that will check if the current run of a worker exceeded the time limit per run or per tick.
+    :param:
+        dict pool: State of the pool
+        dict worker: State of the worker
+    :return:
+        bool -: True if a time limit is exceeded
+    '''
+    if worker['current'] is None:
+        return False
+    if pool['timeout'] > 0 and time.time() - worker['start'] > pool['timeout']:
+        return True
+    if pool['timeout_tick'] > 0 and time.time() - worker['tick'] > pool['timeout_tick']:
+        return True
+
+    return False
+
+
+def check_workers(pool):
+    '''
+    Function that will check if all workers are still alive and within the time limits. Dead workers are restarted and
+    workers that exceeded a time limit are killed and restarted. The run such a worker was working on is reported as
+    failed, all other runs of its chunk are handed back. Workers that die before they are ready, e.g. because the JVM
+    or the model can not be started, are restarted after a backoff, after max_failures of them in a row the pool is
+    closed.
+    :param:
+        dict pool: State of the pool
+    :return:
+        list results: Failed runs, each as [index, result, runtime, tables]
+        list lost: Runs that were not started, each as [index, run_name, run_no, run_dir, config]
+    '''
+    results = []
+    lost = []
+    for worker_id in [i for i in pool['restart'].keys() if pool['restart'][i] <= time.time()]:
+        start_worker(pool, worker_id)
+
+    for worker_id in list(pool['workers'].keys()):
+        worker = pool['workers'][worker_id]
+        if worker['process'].is_alive():
+            if not is_timeout(pool, worker):
+                continue
+            print('Worker ' + str(worker_id) + ' exceeded the time limit and is restarted')
+        elif not worker['ready']:
+            pool['failures'][worker_id] = pool['failures'].get(worker_id, 0) + 1
+            if pool['failures'][worker_id] >= pool_settings['max_failures']:
+                print('Error in check_workers: Worker ' + str(worker_id) + ' died ' + str(pool['failures'][worker_id])
+                      + ' times in a row before it was ready.')
+                close_pool(pool)
+                exit(100)
+        else:
+            print('Worker ' + str(worker_id) + ' died and is restarted')
+
+        for entry in worker['task']:
+            if entry[0] == worker['current']:
+                results.append([entry[0], False, time.time() - worker['start'], None])
+            else:
+                lost.append(entry)
+        if worker['ready'] or worker['process'].is_alive():
+            restart_worker(pool, worker_id, kill=True)
+        else:
+            stop_worker(pool, worker_id, kill=True)
+            backoff = pool_settings['backoff'] * 2 ** (pool['failures'][worker_id] - 1)
+            print('Worker ' + str(worker_id) + ' died before it was ready and is restarted in ' + str(backoff)
+                  + ' seconds')
+            pool['restart'][worker_id] = time.time() + backoff
+
+    return results, lost
+
+
+def get_results(pool, timeout=1):
+    '''
+    Function that will wait for the messages of the workers and report all completed runs. Tables sent with the ticks
+    of a run are merged into one table per file when the run is done. Messages of a process that was replaced in the
+    meantime are dropped, so they are never applied to the new process of the worker.
+    :param:
+        dict pool: State of the pool
+        float timeout: Time to wait for the first message in seconds (default = 1)
+    :return:
+        list results: Completed runs, each as [index, result, runtime, tables]
+        list lost: Runs of dead workers that were not started (see check_workers)
+    '''
+    results = []
+    readers = {worker['reader']: worker for worker in pool['workers'].values()}
+    for reader in multiprocessing.connection.wait(list(readers.keys()), timeout=timeout) if readers else []:
+        while True:
+            try:
+                if not reader.poll():
+                    break
+                message = reader.recv()
+            except (EOFError, OSError):
+                break
+            worker = readers[reader]
+            if worker['token'] == message[1][1]:
+                if message[0] == 'ready':
+                    worker['ready'] = True
+                    worker['memory'] = message[2]
+                    pool['failures'][message[1][0]] = 0
+                elif message[0] == 'start':
+                    worker['current'] = message[2]
+                    worker['start'] = time.time()
+                    worker['tick'] = time.time()
+                    worker['tables'] = []
+                elif message[0] == 'tick':
+                    worker['tick'] = time.time()
+                    if message[3] is not None:
+                        worker['tables'].append(message[3])
+                elif message[0] == 'done' and message[2] in [entry[0] for entry in worker['task']]:
+                    worker['task'] = [entry for entry in worker['task'] if entry[0] != message[2]]
+                    worker['current'] = None
+                    worker['runs'] += 1
+                    worker['memory'] = message[5]
+                    tables = him_store.merge_tables(worker['tables']) if worker['tables'] else None
+                    results.append(message[2:5] + [tables])
+                    worker['tables'] = []
+                    pool['profile'].append({'runtime': message[4], 'heap': message[5], 'cpu': message[6],
+                                            'rss': message[7]})
+    if not readers:
+        time.sleep(timeout)
+
+    failed, lost = check_workers(pool)
+    if len(results) > 0:
+        resize_pool(pool)
+
+    return results + failed, lost
+
+
+def close_pool(pool):
+    '''
+    Function that will stop all workers of the pool.
+    :param:
+        dict pool: State of the pool
+    :return:
+    '''
+    for worker_id in list(pool['workers'].keys()):
+        stop_worker(pool, worker_id)
+    pool['restart'] = {}
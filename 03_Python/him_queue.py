@@ -0,0 +1,612 @@
+'''
+him - Hydrogen Investment Model
+This script runs an experiment on several machines with a work queue in a shared folder. A coordinator writes the runs
+of the experiment as task files into the queue folder of its output folder, workers on any machine with access to the
+shared folder claim a task by renaming it into a lease, run it and acknowledge it. Leases are kept alive by a heartbeat,
+the runs of crashed workers are put back into the queue. The coordinator shows that it is running by updating the
+coordinator file of the queue. Every run is written into its own staging folder first and
+only moved into the Sensitivity_N/Run_M folder of the experiment when it is merged, so the output folder only contains
+completed runs.
+
+Use:
+python him_queue.py start [init_dir]
+python him_queue.py resume <outdir>
+python him_queue.py work <outdir> [workers]
+python him_queue.py merge <outdir>
+python him_queue.py stop <outdir>
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+             - a run is acknowledged by renaming its lease before the result is written, so a worker with an expired
+               lease never writes or removes the result of another worker
+             - merge only merges the acknowledged runs and is refused while the coordinator is running
+             - time limits per run and per tick are enforced by the workers, a worker that exceeded one acknowledges
+               the run as failed and is restarted
+'''
+
+# import
+import os, sys, shutil, time, json, socket, threading, multiprocessing
+import him_run_model, him_store
+
+# globals
+global queue_settings
+global exit_timeout
+
+# poll: time to wait for new tasks and acknowledgements in seconds, heartbeat: time between updates of a lease in
+# seconds, lease: time without heartbeat after which a lease is expired in seconds
+queue_settings = {'poll': 1.0, 'heartbeat': 10.0, 'lease': 60.0}
+# exit code of a worker process that exceeded a time limit, only these workers are restarted
+exit_timeout = 124
+
+
+def get_queue_dir(out_path, create=True):
+    '''
+    Function that will return the folders of the queue of an experiment.
+    :param:
+        str out_path: Path of the output folder
+        bool create: Create the folders, otherwise only the paths are returned (default = True)
+    :return:
+        dict queue: Paths of the queue as dict {'root', 'pending', 'leased', 'done', 'work'}
+    '''
+    root = os.path.join(out_path, 'queue')
+    queue = {'root': root}
+    for i in ['pending', 'leased', 'done', 'work']:
+        queue[i] = os.path.join(root, i)
+        if create:
+            os.makedirs(queue[i], exist_ok=True)
+
+    return queue
+
+
+def get_worker_id():
+    '''
+    Function that will return the ID of the current worker, which is unique on all machines.
+    :return:
+        str -: ID of the worker as host-pid
+    '''
+    return socket.gethostname().replace('_', '-') + '-' + str(os.getpid())
+
+
+def get_staging_dir(out_path, path, worker_id):
+    '''
+    Function that will return the staging folder of a run next to its run folder. Snapshots and branches of the
+    experiment are found from the staging folder like from the run folder.
+    :param:
+        str out_path: Path of the output folder
+        str path: Path of the run folder relative to the output folder
+        str worker_id: ID of the worker
+    :return:
+        str -: Path of the staging folder
+    '''
+    return os.path.normpath(os.path.join(out_path, path)) + '.' + worker_id + '.tmp'
+
+
+def write_task(queue, seq, task):
+    '''
+    Function that will put a task into the queue. The file is created in one step, so a worker never claims an
+    incomplete task.
+    :param:
+        dict queue: Paths of the queue (see get_queue_dir)
+        int seq: Position of the task, tasks are claimed in this order
+        dict task: Run as dict (see get_task)
+    :return:
+    '''
+    task_file = os.path.join(queue['pending'], str(seq).zfill(6) + '_' + str(task['index']) + '.json')
+    with open(task_file + '.tmp', 'w') as tmp_file:
+        json.dump(task, tmp_file)
+    os.replace(task_file + '.tmp', task_file)
+
+
+def get_task(job, i):
+    '''
+    Function that will return a run of an experiment as a task of the queue. The path of the run is relative to the
+    output folder, so it is valid on every machine.
+    :param:
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        int i: Index of the run
+    :return:
+        dict -: Run as dict {'index', 'name', 'no', 'path', 'config', 'horizon', 'warm_start', 'stop', 'timeout',
+                'timeout_tick'}
+    '''
+    entry = him_run_model.get_run(job, i)
+
+    return {'index': int(i), 'name': entry[1], 'no': int(entry[2]), 'path': os.path.relpath(entry[3], job['out_path']),
+            'config': entry[4], 'horizon': int(entry[5]), 'warm_start': job['options']['warm_start'],
+            'stop': job['stop'], 'timeout': job['options']['timeout'], 'timeout_tick': job['options']['timeout_tick']}
+
+
+def parse_name(name):
+    '''
+    Function that will split the name of a task, lease or acknowledgement file.
+    :param:
+        str name: Name of the file as seq_index[_worker].json
+    :return:
+        int seq: Position of the task
+        int index: Index of the run
+        str worker_id: ID of the worker (None for a task)
+    '''
+    parts = name[:-len('.json')].split('_', 2)
+
+    return int(parts[0]), int(parts[1]), parts[2] if len(parts) > 2 else None
+
+
+def watch_task(queue, lease_file, task, worker_id, progress, lock, stop_event):
+    '''
+    Function that will update the time of a lease until the run is done or the lease is gone and check the time limits
+    of the run. The model can not be interrupted, so a run that exceeded its time limit per run or per tick is
+    acknowledged as failed and the worker process is ended with exit_timeout.
+    :param:
+        dict queue: Paths of the queue (see get_queue_dir)
+        str lease_file: Path of the lease
+        dict task: Run of the task (see get_task)
+        str worker_id: ID of the worker
+        dict progress: Start of the run and time of the last tick as dict {'start', 'tick'}
+        threading.Lock lock: Lock of the acknowledgement of the run
+        threading.Event stop_event: Event that is set when the run is done
+    :return:
+    '''
+    heartbeat = time.time()
+    while not stop_event.wait(queue_settings['poll']):
+        if time.time() - heartbeat >= queue_settings['heartbeat']:
+            try:
+                os.utime(lease_file, None)
+            except FileNotFoundError:
+                return
+            heartbeat = time.time()
+        if not (task['timeout'] > 0 and time.time() - progress['start'] > task['timeout']) and \
+                not (task['timeout_tick'] > 0 and time.time() - progress['tick'] > task['timeout_tick']):
+            continue
+        with lock:
+            if stop_event.is_set():
+                return
+            print('Run ' + str(task['no']) + ' exceeded the time limit, the worker is restarted')
+            ack_task(queue, lease_file, False, time.time() - progress['start'], worker_id)
+            os._exit(exit_timeout)
+
+
+def claim_task(queue, worker_id):
+    '''
+    Function that will claim the first task of the queue. The task is renamed into a lease of the worker, which only
+    succeeds for one worker if several try at the same time.
+    :param:
+        dict queue: Paths of the queue (see get_queue_dir)
+        str worker_id: ID of the worker
+    :return:
+        str lease_file: Path of the lease (None if there is no task)
+        dict task: Run of the task (None if there is no task)
+    '''
+    for name in sorted(os.listdir(queue['pending'])):
+        if not name.endswith('.json'):
+            continue
+        lease_file = os.path.join(queue['leased'], name[:-len('.json')] + '_' + worker_id + '.json')
+        try:
+            os.rename(os.path.join(queue['pending'], name), lease_file)
+        except OSError:
+            continue
+        with open(lease_file) as task_file:
+            return lease_file, json.load(task_file)
+
+    return None, None
+
+
+def ack_task(queue, lease_file, result, runtime, worker_id):
+    '''
+    Function that will acknowledge a run. The lease is renamed into the work folder first, which fails if the lease
+    expired and the task was put back into the queue. Only then the result is written and the lease is moved into the
+    done folder, so the result of a run is only written by the worker that owns it.
+    :param:
+        dict queue: Paths of the queue (see get_queue_dir)
+        str lease_file: Path of the lease
+        dict result: Result of the run (False if the run failed)
+        float runtime: Runtime of the run in seconds
+        str worker_id: ID of the worker
+    :return:
+        bool -: True if the run was acknowledged, False if the lease expired
+    '''
+    name = os.path.basename(lease_file)
+    ack_file = os.path.join(queue['work'], name[:-len('.json')] + '.lease')
+    try:
+        os.rename(lease_file, ack_file)
+    except OSError:
+        return False
+
+    result_file = os.path.join(queue['work'], name)
+    with open(result_file + '.tmp', 'w') as tmp_file:
+        json.dump({'result': result, 'runtime': runtime, 'worker': worker_id}, tmp_file)
+    os.replace(result_file + '.tmp', result_file)
+    os.rename(ack_file, os.path.join(queue['done'], name))
+
+    return True
+
+
+def run_task(out_path, task, worker_id, progress=None):
+    '''
+    Function that will run a task in its staging folder. The tables kept in memory are saved in the staging folder as
+    well, so the run is complete when it is acknowledged.
+    :param:
+        str out_path: Path of the output folder
+        dict task: Run of the task (see get_task)
+        str worker_id: ID of the worker
+        dict progress: Time of the last tick is updated as dict {'start', 'tick'} (default = None)
+    :return:
+        dict result: Result of the run (False if the run failed)
+        float runtime: Runtime of the run in seconds
+    '''
+    run_dir = os.path.join(out_path, task['path'])
+    staging_dir = get_staging_dir(out_path, task['path'], worker_id)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    config = task['config'] if task['config'] is not None else him_run_model.get_config(run_dir)
+    him_run_model.warm_start = task['warm_start'].lower()
+    him_run_model.early_stop = task['stop']
+
+    list_tables = []
+    progress = {} if progress is None else progress
+
+    def callback(tick, tables=None):
+        progress['tick'] = time.time()
+        if tables is not None:
+            list_tables.append(tables)
+
+    start = time.time()
+    try:
+        result = him_run_model.run_model(task['name'], task['no'], staging_dir + '\\', config, task['horizon'],
+                                         callback=callback)
+        if result and list_tables:
+            him_store.save_run(staging_dir, him_store.merge_tables(list_tables))
+    except Exception as error:
+        print('Error in run_task: Run ' + str(task['no']) + ' failed with ' + repr(error))
+        result = False
+
+    return result, time.time() - start
+
+
+def work(out_path, no_worker=0):
+    '''
+    Function that will run the tasks of the queue until the experiment is finished or stopped. Runs whose lease expired
+    while they were running are dropped (see ack_task), runs that exceed a time limit end the worker (see watch_task).
+    :param:
+        str out_path: Path of the output folder
+        int no_worker: Number of the worker on this machine (default = 0)
+    :return:
+    '''
+    queue = get_queue_dir(out_path, create=False)
+    worker_id = get_worker_id()
+    him_run_model.initializer(him_run_model.check_model() + '\\main.nlogo')
+    print('Worker ' + str(no_worker) + ' (' + worker_id + ') is running')
+
+    while not os.path.isfile(os.path.join(queue['root'], 'stop')) and \
+            not os.path.isfile(os.path.join(queue['root'], 'finished')):
+        lease_file, task = claim_task(queue, worker_id)
+        if task is None:
+            time.sleep(queue_settings['poll'])
+            continue
+
+        progress = {'start': time.time(), 'tick': time.time()}
+        lock = threading.Lock()
+        stop_event = threading.Event()
+        watch = threading.Thread(target=watch_task, args=(queue, lease_file, task, worker_id, progress, lock,
+                                                          stop_event), daemon=True)
+        watch.start()
+        result, runtime = run_task(out_path, task, worker_id, progress)
+        with lock:
+            stop_event.set()
+        watch.join()
+
+        if not ack_task(queue, lease_file, result, runtime, worker_id):
+            print('Lease of run ' + str(task['no']) + ' expired, the run is dropped')
+            shutil.rmtree(get_staging_dir(out_path, task['path'], worker_id), ignore_errors=True)
+
+    print('Worker ' + str(no_worker) + ' (' + worker_id + ') stopped')
+
+
+def start_workers(out_path, no_workers):
+    '''
+    Function that will start the workers on this machine and restart the workers that were ended because a run
+    exceeded its time limit, until all workers stopped.
+    :param:
+        str out_path: Path of the output folder
+        int no_workers: Number of workers
+    :return:
+    '''
+    queue = get_queue_dir(out_path, create=False)
+    list_process = [multiprocessing.Process(target=work, args=(out_path, i)) for i in range(no_workers)]
+    for process in list_process:
+        process.start()
+
+    while True:
+        for i in range(no_workers):
+            if list_process[i].is_alive() or list_process[i].exitcode != exit_timeout or \
+                    os.path.isfile(os.path.join(queue['root'], 'stop')) or \
+                    os.path.isfile(os.path.join(queue['root'], 'finished')):
+                continue
+            list_process[i] = multiprocessing.Process(target=work, args=(out_path, i))
+            list_process[i].start()
+        if not any(process.is_alive() for process in list_process):
+            break
+        time.sleep(queue_settings['poll'])
+
+
+def merge_run(out_path, task, worker_id):
+    '''
+    Function that will move the output files of a run from its staging folder into its run folder. The config files of
+    the run folder are kept.
+    :param:
+        str out_path: Path of the output folder
+        dict task: Run of the task (see get_task)
+        str worker_id: ID of the worker
+    :return:
+    '''
+    run_dir = os.path.join(out_path, task['path'])
+    staging_dir = get_staging_dir(out_path, task['path'], worker_id)
+    if not os.path.isdir(staging_dir):
+        return
+
+    list_files = os.listdir(staging_dir)
+    if len(list_files) > 0:
+        os.makedirs(run_dir, exist_ok=True)
+    for i in list_files:
+        if i in ['model.config', 'branch.config'] and os.path.isfile(os.path.join(run_dir, i)):
+            continue
+        os.replace(os.path.join(staging_dir, i), os.path.join(run_dir, i))
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def merge_results(job, queue):
+    '''
+    Function that will merge all acknowledged runs into the run folders of the experiment.
+    :param:
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        dict queue: Paths of the queue (see get_queue_dir)
+    :return:
+        list results: Merged runs, each as [seq, index, result, runtime]
+    '''
+    results = []
+    for name in sorted(os.listdir(queue['done'])):
+        if not name.endswith('.json'):
+            continue
+        seq, index, worker_id = parse_name(name)
+        with open(os.path.join(queue['done'], name)) as task_file:
+            task = json.load(task_file)
+        try:
+            with open(os.path.join(queue['work'], name)) as result_file:
+                ack = json.load(result_file)
+        except FileNotFoundError:
+            ack = {'result': False, 'runtime': 0.0}
+        if ack['result']:
+            merge_run(job['out_path'], task, worker_id)
+        else:
+            shutil.rmtree(get_staging_dir(job['out_path'], task['path'], worker_id), ignore_errors=True)
+        results.append([seq, index, ack['result'], ack['runtime']])
+        for i in [os.path.join(queue['work'], name), os.path.join(queue['done'], name)]:
+            if os.path.isfile(i):
+                os.remove(i)
+
+    return results
+
+
+def requeue_leases(job, queue, seen):
+    '''
+    Function that will put the tasks of expired leases back into the queue. A lease is expired if its time did not
+    change for the lease time, measured with the clock of the coordinator, so the clocks of the machines do not have to
+    be in sync. Leases of workers that crashed while acknowledging a run are found in the work folder. Runs of new
+    leases are marked as running.
+    :param:
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        dict queue: Paths of the queue (see get_queue_dir)
+        dict seen: Time of every lease and when it was last changed as dict {lease file: [mtime, time]}
+    :return:
+    '''
+    list_leases = [os.path.join(queue['leased'], name) for name in os.listdir(queue['leased'])
+                   if name.endswith('.json')]
+    list_leases += [os.path.join(queue['work'], name) for name in os.listdir(queue['work'])
+                    if name.endswith('.lease')]
+    for lease_file in list(seen.keys()):
+        if lease_file not in list_leases:
+            del seen[lease_file]
+
+    for lease_file in list_leases:
+        try:
+            mtime = os.path.getmtime(lease_file)
+        except FileNotFoundError:
+            continue
+        name = os.path.splitext(os.path.basename(lease_file))[0] + '.json'
+        seq, index, worker_id = parse_name(name)
+        if lease_file not in seen and lease_file.endswith('.json'):
+            him_run_model.set_running(job, [index])
+        if lease_file not in seen or seen[lease_file][0] != mtime:
+            seen[lease_file] = [mtime, time.time()]
+        elif time.time() - seen[lease_file][1] > queue_settings['lease']:
+            try:
+                os.rename(lease_file, os.path.join(queue['pending'], str(seq).zfill(6) + '_' + str(index) + '.json'))
+            except OSError:
+                continue
+            del seen[lease_file]
+            print('Lease of run ' + str(job['experiment'].loc[index, 'No']) + ' by ' + worker_id
+                  + ' expired, the run is put back into the queue')
+            job['experiment'].loc[index, 'State'] = 'pending'
+            if os.path.isfile(os.path.join(queue['work'], name)):
+                os.remove(os.path.join(queue['work'], name))
+            shutil.rmtree(get_staging_dir(job['out_path'], os.path.relpath(job['experiment'].loc[index, 'Path'],
+                                                                           job['out_path']), worker_id),
+                          ignore_errors=True)
+
+
+def is_coordinator_running(queue):
+    '''
+    Function that will check if a coordinator is running for the queue. The coordinator file is updated every poll and
+    has to change within the time of a heartbeat, so the clocks of the machines do not have to be in sync.
+    :param:
+        dict queue: Paths of the queue (see get_queue_dir)
+    :return:
+        bool -: True if the coordinator is running
+    '''
+    coordinator_file = os.path.join(queue['root'], 'coordinator')
+    try:
+        mtime = os.path.getmtime(coordinator_file)
+        time.sleep(queue_settings['heartbeat'])
+        return os.path.getmtime(coordinator_file) != mtime
+    except FileNotFoundError:
+        return False
+
+
+def merge_queue(out_path, experiment):
+    '''
+    Function that will merge the acknowledged runs of the queue into the experiment. Tasks and leases are kept, so
+    workers that are still running are not affected.
+    :param:
+        str out_path: Path of the output folder
+        pd.DataFrame experiment: List of all runs including their state
+    :return:
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        dict queue: Paths of the queue (see get_queue_dir)
+    '''
+    job = him_run_model.start_experiment(out_path, experiment)
+    job.update({'attempts': {}, 'seq': 0})
+    queue = get_queue_dir(out_path)
+
+    list_merged = []
+    for seq, index, result, runtime in merge_results(job, queue):
+        if result:
+            him_run_model.update_experiment(job, index, result, runtime, None, 1)
+            list_merged.append(index)
+    if len(list_merged) > 0:
+        print(str(len(list_merged)) + ' acknowledged runs merged')
+    job['order'] = [i for i in job['order'] if i not in list_merged]
+    him_run_model.update_manifest(job, force=True)
+
+    return job, queue
+
+
+def prepare_queue(out_path, experiment):
+    '''
+    Function that will prepare the experiment and its queue. Runs that were acknowledged before are merged, all other
+    tasks and leases of a previous coordinator are removed.
+    :param:
+        str out_path: Path of the output folder
+        pd.DataFrame experiment: List of all runs including their state
+    :return:
+        dict job: State of the experiment (see him_run_model.start_experiment)
+        dict queue: Paths of the queue (see get_queue_dir)
+    '''
+    job, queue = merge_queue(out_path, experiment)
+    for i in ['stop', 'finished']:
+        if os.path.isfile(os.path.join(queue['root'], i)):
+            os.remove(os.path.join(queue['root'], i))
+
+    list_names = [name for name in os.listdir(queue['leased']) if name.endswith('.json')]
+    list_names += [name[:-len('.lease')] + '.json' for name in os.listdir(queue['work']) if name.endswith('.lease')]
+    for name in list_names:
+        seq, index, worker_id = parse_name(name)
+        shutil.rmtree(get_staging_dir(out_path, os.path.relpath(experiment.loc[index, 'Path'], out_path), worker_id),
+                      ignore_errors=True)
+    for i in ['pending', 'leased', 'work']:
+        for name in os.listdir(queue[i]):
+            os.remove(os.path.join(queue[i], name))
+    him_run_model.update_manifest(job, force=True)
+
+    return job, queue
+
+
+def coordinate(out_path, experiment):
+    '''
+    Function that will coordinate an experiment until all runs are merged. The runs are written into the queue in the
+    order of the experiment, failed runs are put back into the queue until they ran out of retries and the runs of the
+    adaptive replication, the progressive Sobol and the screening are added as soon as they are decided.
+    :param:
+        str out_path: Path of the output folder
+        pd.DataFrame experiment: List of all runs including their state
+    :return:
+    '''
+    queue = get_queue_dir(out_path)
+    if is_coordinator_running(queue):
+        print('Error in coordinate: A coordinator is already running for ' + out_path + '.')
+        exit(200)
+    job, queue = prepare_queue(out_path, experiment)
+    options = job['options']
+    busy = set()
+    coordinator_file = os.path.join(queue['root'], 'coordinator')
+
+    def put_tasks(list_index):
+        for i in list_index:
+            write_task(queue, job['seq'], get_task(job, i))
+            job['seq'] += 1
+            busy.add(i)
+
+    put_tasks(job['order'])
+    print(str(len(busy)) + ' runs in the queue, start workers with python him_queue.py work ' + out_path)
+    seen = {}
+    no_done = 0
+    while len(busy) > 0:
+        open(coordinator_file, 'a').close()
+        os.utime(coordinator_file, None)
+        if os.path.isfile(os.path.join(queue['root'], 'stop')):
+            print('Coordinator stopped, the experiment can be finished with python him_queue.py resume ' + out_path)
+            him_run_model.update_manifest(job, force=True)
+            os.remove(coordinator_file)
+            return
+
+        requeue_leases(job, queue, seen)
+        for seq, index, result, runtime in merge_results(job, queue):
+            busy.discard(index)
+            job['attempts'][index] = job['attempts'].get(index, 0) + 1
+            if not result and job['attempts'][index] <= options['retries']:
+                print('Run ' + str(job['experiment'].loc[index, 'No']) + ' failed and is retried')
+                put_tasks([index])
+                continue
+            no_done += 1
+            put_tasks(him_run_model.update_experiment(job, index, result, runtime, None, job['attempts'][index]))
+            print(str(no_done) + '/' + str(no_done + len(busy)) + ' runs completed')
+        time.sleep(queue_settings['poll'])
+
+    him_run_model.finish_experiment(job)
+    open(os.path.join(queue['root'], 'finished'), 'w').close()
+    if os.path.isfile(coordinator_file):
+        os.remove(coordinator_file)
+    print('done')
+
+
+def main():
+    '''
+    Main function that will start the coordinator, the workers, the merge or stop an experiment.
+    :return:
+    '''
+    if len(sys.argv) < 2 or sys.argv[1] not in ['start', 'resume', 'work', 'merge', 'stop'] or \
+            (sys.argv[1] != 'start' and len(sys.argv) < 3):
+        print('Error: Use python him_queue.py start [init_dir], resume <outdir>, work <outdir> [workers], '
+              + 'merge <outdir> or stop <outdir>')
+        exit(100)
+
+    result_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output')
+    if sys.argv[1] == 'start':
+        out_dir, experiment = him_run_model.create_experiment(sys.argv[2] if len(sys.argv) > 2 else None)
+        coordinate(os.path.join(result_dir, out_dir), experiment)
+        return
+
+    out_path = sys.argv[2] if os.path.isdir(sys.argv[2]) else os.path.join(result_dir, sys.argv[2])
+    if not os.path.isfile(os.path.join(out_path, 'manifest.csv')):
+        print('Error: No experiment found in ' + out_path + '.')
+        exit(101)
+
+    if sys.argv[1] == 'resume':
+        coordinate(out_path, him_run_model.load_manifest(out_path))
+    elif sys.argv[1] == 'work':
+        start_workers(out_path, int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+    elif sys.argv[1] == 'merge':
+        if is_coordinator_running(get_queue_dir(out_path, create=False)):
+            print('Error: The coordinator of ' + out_path + ' is running and merges the runs itself.')
+            exit(102)
+        job = merge_queue(out_path, him_run_model.load_manifest(out_path))[0]
+        print(str(sum(job['experiment']['State'] == 'done')) + '/' + str(len(job['experiment'])) + ' runs merged')
+    else:
+        os.makedirs(get_queue_dir(out_path, create=False)['root'], exist_ok=True)
+        open(os.path.join(get_queue_dir(out_path, create=False)['root'], 'stop'), 'w').close()
+        print('Experiment ' + os.path.basename(os.path.normpath(out_path)) + ' is stopped after the current runs')
+
+
+if __name__ == '__main__':
+    main()
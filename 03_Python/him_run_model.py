@@ -2,22 +2,58 @@
 him - Hydrogen Investment Model
 This script will read the runs.init and runs the model with the given settings
 
-version: 0.1.24.08.10
-date: 2024-08-10
+version: 0.2.26.10.18
+date: 2026-10-18
 author: Jesse
 
 changelog:
 0.1.24.07.03 - feature complete
 0.1.24.08.08 - fixed a bug that prevented to set meta.run and meta.run_no with pynetlogo
 0.1.24.08.10 - fixed a bug in creating the sensitivity file, parameters now seperated by comma
+0.2.26.10.18 - runs are now handed out one at a time (or in adaptive chunks) instead of Pool.starmap
+             - optional longest-job-first scheduler based on the runtimes of previous experiments
+             - manifest.csv with the state of every run and --resume <outdir> to finish interrupted experiments
+             - own pool of workers (him_pool) that recycles workers after a number of runs or above a memory limit
+             - runs are killed after a time limit per run or per tick and retried before they are marked as failed
+             - optional memory mode, the output tables are collected every year and saved with him_store
+             - optional warm start, runs restore a snapshot of the world after setup instead of running the setup
+             - optional branch year, runs that only differ in their policies share the years before the branch year
+             - optional adaptive replication, runs of a sensitivity are only run until the KPIs are precise enough
+             - optional seeds for every run in model.config and manifest.csv, also shared between sensitivities
+             - optional config_files: false, the config of every run is built from manifest.csv and set with pynetlogo,
+               run folders are only created if the run writes output files
+             - optional cache of completed runs in 02_Output/cache, runs with the same config and model are linked
+             - sensitivity type Morris for the screening of the parameters, analyzed with him_analyze
+             - optional progressive Sobol, the design is run in doublings of the base samples until the indices are
+               stable
+             - optional horizon of the runs and multi-fidelity screening, the design is run with a short horizon first
+               and only promising or uncertain sensitivities are run with the full horizon
+             - optional early stop of runs in a degenerate or steady state, the remaining years are filled with the last
+               year and the year of the stop is saved in manifest.csv, with a time lag no run is degenerate as new
+               producers are created
+             - optional scenario design (full, fractional or list) of the scenario flags, all scenarios are run with the
+               same pool into one folder per scenario, snapshots and branches are shared by all scenarios
+             - experiments are prepared, updated and finished step by step, so him_daemon can run several of them
+               with one pool
+             - --dry-run predicts the CPU-hours, the wall-clock time and the size of every output file of an experiment
+               from previous experiments without creating any folder
+             - optional output channels and sampling of the daily data (all years, every k-th year or a list of years),
+               passed to the model as settings.output and settings.day_years
+             - optional concurrent_runs: auto, the number of workers and the heap of the JVMs are chosen from a
+               warm-up run within a memory budget and adjusted when later runs need more memory, optional JVM options
+             - optional ingest of every completed run in a separate pool of processes, the csv files are saved in the
+               numpy file of him_store with a summary of the KPIs and kept, compressed or deleted
 '''
 
 # import
-import os, pynetlogo, multiprocessing, shutil
+import os, sys, pynetlogo, jpype, shutil, time, hashlib, itertools, heapq, zipfile, multiprocessing
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from SALib.sample import sobol as sobolsample
+from SALib.sample import morris as morrissample
+from scipy import stats
+import him_pool, him_store, him_analyze
 
 # globals
 # Default paths - may need adjustment
@@ -26,18 +62,47 @@ global netlogo_file
 global scenario_settings
 global run_settings
 global sensitivity_settings
+global experiment_settings
+global restart_settings
+global branch_settings
+global stop_reporters
 
 jvm_file = 'C:/Users/openJDK/jdk-22.0.1/bin/server/jvm.dll' # CHANGE THIS
 netlogo_file = 'C:/Program Files/NetLogo 6.4.0' # CHANGE THIS
 
 scenario_settings = ['ref', 'co2_tax', 'h2_subsidy', 'h2_guarant', 'res_subsidy', 'power_subsidy', 'power_guarant',
                      'elc_subsidy', 'elc_guarant', 'man_subsidy', 'time_lag']
-run_settings = ['plot', 'write', 'debug', 'track']
+run_settings = ['plot', 'write', 'debug', 'track', 'memory']
 sensitivity_settings = ['const.beta', 'const.PM.delta_threshold', 'const.HM.delta_threshold',
                         'const.EM.delta_threshold', 'const.gamma', 'init.HM.threshold_0', 'init.EM.threshold_0',
                         'const.EM.inexperience_penalty_max', 'const.MAN.learning_rate', 'const.EM.global_share',
                         'GOV.h2_subsidy', 'GOV.h2_guarant', 'GOV.res_subsidy', 'GOV.power_subsidy', 'GOV.power_guarant',
                         'GOV.elc_subsidy', 'GOV.elc_guarant', 'GOV.man_subsidy']
+# Settings for the execution of the experiment with their default values
+experiment_settings = {'chunksize': 1, 'scheduler': 'dynamic', 'recycle_runs': 100, 'recycle_memory': 0,
+                       'timeout': 0.0, 'timeout_tick': 0.0, 'retries': 2, 'warm_start': 'none', 'branch_year': 0,
+                       'adaptive': False, 'min_runs': 20, 'kpis': ['elc_capacity_2050', 'elc_price_2050'],
+                       'ci_width': 0.1, 'seed': 'none', 'seed_base': 1000, 'config_files': True,
+                       'cache': False, 'trajectories': 10, 'levels': 4, 'progressive': False, 'sobol_min': 8,
+                       'sobol_max': 256, 'sobol_tol': 0.05, 'horizon': 81, 'screening': False,
+                       'screening_horizon': 13, 'screening_kpi': 'elc_capacity_2035', 'promote': 0.25,
+                       'early_stop': False, 'stop_years': 5, 'stop_tol': 1e-6, 'scenario_design': 'none',
+                       'scenario_factors': [], 'fraction': 1, 'scenario_list': [], 'output': [],
+                       'day_sampling': 'all', 'day_every': 5, 'day_years': [], 'memory_budget': 0.8, 'jvm_heap': 0,
+                       'jvm_options': [], 'ingest': False, 'ingest_processes': 2, 'ingest_raw': 'keep'}
+# Settings that are not needed to setup the world and can be changed after a warm start
+restart_settings = ['GOV.', 'const.beta', 'const.EM.inexperience_penalty_max', 'const.MAN.learning_rate',
+                    'const.EM.global_share']
+# Policies that are switched on at the branch year, the years before are shared by all runs that only differ in these
+branch_settings = ['scenario.h2_subsidy', 'scenario.h2_guarant', 'scenario.res_subsidy', 'scenario.power_subsidy',
+                   'scenario.power_guarant', 'scenario.elc_subsidy', 'scenario.elc_guarant', 'scenario.man_subsidy',
+                   'scenario.time_lag', 'GOV.']
+# Values checked every year for the early stop, the first two are the live hydrogen producers and the electrolyzer
+# capacity
+stop_reporters = ['count HydrogenProducers with [HP.alive]', 'sum [ELC.capacity] of Electrolyzers',
+                  'count PowerProducers with [PP.alive]', 'sum [RES.capacity] of Renewables',
+                  'count ElectrolyzerProducers with [EP.alive]',
+                  'sum [MAN.capacity] of Manufacturings', 'global.HM.price_h2', 'mean global.PM.list_price']
 
 def check_model():
     '''
@@ -68,31 +133,76 @@ def check_model():
 
     return(modeldir)
 
-def load_init():
+def convert_value(value, default):
+    '''
+    Function to convert a value of the init file into the type of its default value
+    :param:
+        str value: Value as written in the init file
+        - default: Default value of the setting
+    :return:
+        - value: Converted value
+    '''
+    if isinstance(default, bool):
+        return value.capitalize() == 'True'
+    elif isinstance(default, list):
+        return [i for i in value[1:-1].split(',') if i]
+    else:
+        return type(default)(value)
+
+def load_args():
+    '''
+    Function to load the command line arguments
+    :return:
+        dict args: Command line arguments
+    '''
+    args = {'resume': None, 'dry_run': False}
+    argv = sys.argv[1:]
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--resume' and i + 1 < len(argv):
+            args['resume'] = argv[i + 1]
+            i += 2
+        elif argv[i] == '--dry-run':
+            args['dry_run'] = True
+            i += 1
+        else:
+            print('Error in load_args: Unknown argument ' + argv[i] + '.')
+            exit(150)
+
+    return args
+
+def load_init(init_dir=None):
     '''
     Function to load the init file for the runs of the model
+    :param:
+        str init_dir: Folder of the runs.init file (default = current folder)
     :return:
         int no_runs : Number of runs
-        int concurrent_runs : Number of concurrent runs
+        int concurrent_runs : Number of concurrent runs (0 for an automatic number)
         dict scenario : Settings for scenario
         dict settings : Settings for model
         dict sensitivity : Settings for sensitivity analysis
+        dict options : Settings for the execution of the experiment
     '''
     # Initialize output
+    options = dict(experiment_settings)
     scenario = {}
     settings = {}
     sensitivity = {}
     sensitivity_variables = []
 
+    if init_dir is None:
+        init_dir = os.getcwd()
+
     # Check if runs.init exists
     try:
-        os.path.isfile(str(os.getcwd()+'/runs.init'))
+        os.path.isfile(str(init_dir + '/runs.init'))
     except OSError:
         print('Error: runs.init file not found.')
         exit(200)
 
     # Load file
-    with open(str(os.getcwd() + '/runs.init')) as init_file:
+    with open(str(init_dir + '/runs.init')) as init_file:
         for line in init_file.readlines():
             if line.strip() and line[0] != '#':
                 line = line.replace(' ', '').replace('\n', '').split(':')
@@ -106,8 +216,8 @@ def load_init():
                         exit(201)
                 elif line[0] == 'concurrent_runs':
                     try:
-                        no_conruns = int(line[1])
-                    except TypeError:
+                        no_conruns = 0 if line[1].lower() == 'auto' else int(line[1])
+                    except ValueError:
                         print('Error in load_init: Unknown type while loading init file.')
                         exit(202)
                 elif line[0] in run_settings:
@@ -128,7 +238,7 @@ def load_init():
                     except TypeError:
                         print('Error in load_init: Unknown type while loading init file.')
                         exit(205)
-                    if sensitivity_type not in ['None', 'Single', 'Sobol']:
+                    if sensitivity_type not in ['None', 'Single', 'Sobol', 'Morris']:
                         print('Error in load_init: Unknown type for sensitivity.')
                         exit(206)
                 elif line[0] == 'parameters' and sensitivity_type != 'None':
@@ -154,18 +264,99 @@ def load_init():
                             except TypeError:
                                 print('Error in load_init: Unknown type while loading init file.')
                                 exit(209)
+                elif line[0] in experiment_settings:
+                    try:
+                        options[line[0]] = convert_value(':'.join(line[1:]), experiment_settings[line[0]])
+                    except ValueError:
+                        print('Error in load_init: Unknown type while loading init file.')
+                        exit(210)
+
+    # Check the KPIs for adaptive replication
+    for i in options['kpis']:
+        if i not in him_store.kpi_settings:
+            print('Error in load_init: Unknown KPI ' + i + '.')
+            exit(211)
+
+    # Check the progressive Sobol
+    if options['progressive'] and options['adaptive']:
+        print('Error in load_init: progressive and adaptive can not be combined.')
+        exit(212)
+
+    # Check the screening
+    if options['screening']:
+        if options['adaptive'] or options['progressive']:
+            print('Error in load_init: screening can not be combined with adaptive or progressive.')
+            exit(213)
+        if options['screening_kpi'] not in him_store.kpi_settings or \
+                him_store.kpi_settings[options['screening_kpi']][2] >= options['screening_horizon']:
+            print('Error in load_init: KPI ' + options['screening_kpi'] + ' is unknown or not within the screening '
+                  + 'horizon.')
+            exit(214)
+
+    # Check the scenario design
+    if options['scenario_design'] not in ['none', 'full', 'fractional', 'list']:
+        print('Error in load_init: Unknown scenario design ' + options['scenario_design'] + '.')
+        exit(215)
+    list_flags = options['scenario_factors'] + [j.lstrip('!') for i in options['scenario_list'] for j in i.split('+')
+                                                if i != 'base']
+    for i in list_flags:
+        if i not in scenario_settings:
+            print('Error in load_init: Unknown scenario flag ' + i + '.')
+            exit(216)
+    if options['scenario_design'] == 'fractional' and \
+            not 0 < options['fraction'] <= 2 ** (len(options['scenario_factors']) - options['fraction']) - \
+            (len(options['scenario_factors']) - options['fraction']) - 1:
+        print('Error in load_init: No fractional design with fraction ' + str(options['fraction']) + ' for '
+              + str(len(options['scenario_factors'])) + ' factors.')
+        exit(217)
+    if options['scenario_design'] != 'none' and (options['progressive'] or options['screening']):
+        print('Error in load_init: scenario_design can not be combined with progressive or screening.')
+        exit(218)
+
+    # Check the output channels, the KPIs of the experiment have to be written
+    for i in options['output']:
+        if i + '.csv' not in him_store.output_files:
+            print('Error in load_init: Unknown output channel ' + i + '.')
+            exit(219)
+    list_kpis = options['kpis'] + ([options['screening_kpi']] if options['screening'] else [])
+    for i in list_kpis if len(options['output']) > 0 else []:
+        if him_store.kpi_settings[i][0] not in [j + '.csv' for j in options['output']]:
+            print('Error in load_init: KPI ' + i + ' needs the output channel ' + him_store.kpi_settings[i][0][:-4]
+                  + '.')
+            exit(220)
+
+    # Output channels and sampling of the daily data are passed to the model as settings
+    if len(options['output']) > 0:
+        settings['output'] = [i + '.csv' for i in options['output']]
+    try:
+        if options['day_sampling'] == 'every':
+            settings['day_years'] = list(range(0, 80, max(1, options['day_every'])))
+        elif options['day_sampling'] == 'years':
+            settings['day_years'] = [int(i) for i in options['day_years']]
+        elif options['day_sampling'] != 'all':
+            raise ValueError
+    except ValueError:
+        print('Error in load_init: Unknown sampling of the daily data.')
+        exit(221)
+
+    # Check the ingest of the completed runs
+    if options['ingest_raw'] not in ['keep', 'compress', 'delete']:
+        print('Error in load_init: Unknown handling ' + options['ingest_raw'] + ' of the ingested csv files.')
+        exit(222)
 
     # Close file when done
     init_file.close()
 
     # Return
-    return(no_runs, no_conruns, settings, scenario, sensitivity_type, sensitivity_variables, sensitivity)
+    return(no_runs, no_conruns, settings, scenario, sensitivity_type, sensitivity_variables, sensitivity, options)
 
-def create_sensitivity_file(out_dir, sens_type, sens_var, no_sens, sensitivity):
+def create_sensitivity_file(out_dir, sens_type, sens_var, no_sens, sensitivity, bounds=None, levels=4):
     '''
     Function to create the sensitivity file for the post processing.
     :param:
         str out_dir: Name of the output folder
+        list bounds: Bounds of every parameter, needed for the analysis with him_analyze (default = None)
+        int levels: Number of levels of the Morris grid (default = 4)
     :return:
     '''
     # Create the file
@@ -178,6 +369,12 @@ def create_sensitivity_file(out_dir, sens_type, sens_var, no_sens, sensitivity):
         else:
             config += str(i + ']\n')
     config += str('sensitivity_runs: ' + str(no_sens) + '\n')
+    if bounds is not None:
+        config += str('bounds: ' + str([[float(j) for j in i] for i in bounds]) + '\n')
+    if sens_type == 'Morris':
+        config += str('levels: ' + str(levels) + '\n')
+    elif sens_type == 'Sobol':
+        config += str('second_order: True\n')
     i = 1
     while i <= no_sens:
         config += str('sensitivity_' + str(i) + ': ' + str(sensitivity.loc[i-1].to_list()) + '\n')
@@ -190,20 +387,24 @@ def create_sensitivity_file(out_dir, sens_type, sens_var, no_sens, sensitivity):
         file.write(config)
 
 
-def create_sensitivity(s_names, s_dict, no_sens_runs=11):
+def create_sensitivity(s_names, s_dict, no_sens_runs=11, s_type='Sobol', trajectories=10, levels=4):
     '''
     Function to create the sensitivity analysis parameter, depending on the sensitivity type
     :param:
         list s_names: Type of sensitivity analysis
         dict s_dict: Sensitivity analysis parameters
         int no_sens_runs: Number of sensitivity runs (default = 11)
+        str s_type: Type of the sensitivity analysis (default = Sobol)
+        int trajectories: Number of Morris trajectories, each with len(s_names) + 1 points (default = 10)
+        int levels: Number of levels of the Morris grid (default = 4)
     :return:
         pd.DataFrame sensitivity: Sobol sensitivity analysis parameters
     '''
     # Create Problem
     problem = {
         'num_vars': len(s_names),
-        'name': s_names
+        'name': s_names,
+        'names': s_names
     }
     tmp_bounds = []
     for i in s_names:
@@ -217,6 +418,8 @@ def create_sensitivity(s_names, s_dict, no_sens_runs=11):
     # Create parameter values sensitivity analysis
     if len(s_names) == 0:
         param_values = []
+    elif s_type == 'Morris':
+        param_values = morrissample.sample(problem, trajectories, num_levels=levels)
     elif len(s_names) < 2:
         param_values = []
         for i in np.linspace(tmp_bounds[0][0], tmp_bounds[0][1], no_sens_runs):
@@ -231,15 +434,73 @@ def create_sensitivity(s_names, s_dict, no_sens_runs=11):
     return sensitivity
 
 
-def create_out_folder():
+def get_fractional_design(no_factors, fraction):
+    '''
+    Function that will create a two-level fractional factorial design with 2^(no_factors - fraction) runs. The first
+    factors form a full factorial design, every other factor is the product of the highest interaction of these factors
+    that is not used yet, so main effects are only aliased with interactions of high order.
+    :param:
+        int no_factors: Number of factors
+        int fraction: Number of factors that are generated from the others
+    :return:
+        np.array design: Level of every factor in every run (True = on)
+    '''
+    no_base = no_factors - fraction
+    base = np.array(list(itertools.product([-1, 1], repeat=no_base)))
+    generators = [j for size in range(no_base, 1, -1) for j in itertools.combinations(range(no_base), size)]
+    design = [base] + [np.prod(base[:, list(j)], axis=1)[:, None] for j in generators[:fraction]]
+
+    return np.hstack(design) > 0
+
+
+def get_scenarios(scenario, options):
+    '''
+    Function that will create the scenarios of the experiment. All flags that are not part of the scenario design keep
+    their values of the runs.init. With scenario_design: list every entry switches flags on (flag) or off (!flag),
+    joined with +, or keeps the runs.init (base). Scenarios with the same flags are only run once.
+    :param:
+        dict scenario: Dictionary of scenario parameters
+        dict options: Settings for the execution of the experiment
+    :return:
+        list list_scenario: Scenarios, each as dict of scenario parameters
+    '''
+    factors = options['scenario_factors']
+    if options['scenario_design'] == 'full':
+        design = list(itertools.product([False, True], repeat=len(factors)))
+    elif options['scenario_design'] == 'fractional':
+        design = get_fractional_design(len(factors), options['fraction']).tolist()
+    elif options['scenario_design'] == 'list':
+        factors = [i for i in scenario_settings]
+        design = []
+        for i in options['scenario_list']:
+            levels = dict(scenario)
+            for j in [j for j in i.split('+') if i != 'base']:
+                levels[j.lstrip('!')] = not j.startswith('!')
+            design.append([levels.get(j, False) for j in factors])
+    else:
+        return [dict(scenario)]
+
+    list_scenario = []
+    for levels in design:
+        tmp_scenario = dict(scenario)
+        tmp_scenario.update({factors[i]: bool(levels[i]) for i in range(len(factors))})
+        if tmp_scenario not in list_scenario:
+            list_scenario.append(tmp_scenario)
+
+    return list_scenario
+
+
+def create_out_folder(name=None):
     '''
     Function that will create the output folder, named on the current date and time. It also returns the name of the new
     folder.
+    :param:
+        str name: Name of the output folder (default = None, current date and time)
     :return:
         str date: Name of the output folder
     '''
     wkdir = os.getcwd()
-    date = datetime.now().strftime('%Y-%m-%d-%H-%M')
+    date = datetime.now().strftime('%Y-%m-%d-%H-%M') if name is None else name
     outdir = os.path.dirname(wkdir) + '\\02_Output\\' + date + '\\'
 
     if not os.path.isdir(outdir):
@@ -251,12 +512,13 @@ def create_out_folder():
     return(date)
 
 
-def create_sens_folder(out_dir, no_sens):
+def create_sens_folder(out_dir, no_sens, create=True):
     '''
     Function that will create the sensitivity folder, numerated by the number of sensitivity settings.
     :param:
         str out_dir: name of the output folder
         int no_sens: number of the current sensitivity settings
+        bool create: Create the folder, otherwise only the path is returned (default = True)
     :return:
         str sens_dir: name of the sensitivity folder
     '''
@@ -264,6 +526,8 @@ def create_sens_folder(out_dir, no_sens):
     sensdir = (os.path.dirname(wkdir) + '\\02_Output\\' + out_dir + '\\Sensitivity_' + str(no_sens)
                + '\\')
 
+    if not create:
+        return sensdir
     if not os.path.isdir(sensdir):
         os.mkdir(sensdir)
     else:
@@ -273,18 +537,23 @@ def create_sens_folder(out_dir, no_sens):
     return sensdir
 
 
-def create_model_config(sens_dir, settings, scenario, sens, run_no):
+def get_model_config(sens_dir, settings, scenario, sens, run_no, branch_year=0, seed=None):
     '''
-    Function that will create the model.config file, which is needed to run the model and includes all settings for the
-    scenario and the sensitivity analysis.
+    Function that will return the name and the config of a run, which includes all settings for the scenario and the
+    sensitivity analysis. With a branch year the policies (branch_settings) are part of the branch config instead and
+    are only switched on at the branch year.
     :param:
         str sens_dir: Path ouf the individual run folder
         dict settings: Dictionary of setting parameters
         dict scenario: Dictionary of scenario parameters
         dict sens: Dictionary of sensitivity analysis parameters
         int run_no: Number of the current run
+        int branch_year: Year in which the policies are switched on (default = 0, from the start)
+        int seed: Random seed of the run (default = None, no seed)
     :return:
         str run_name: Name of the run
+        str config: Content of the model.config
+        str branch: Content of the branch.config (None without branch year)
     '''
 
     run_name = ''
@@ -319,16 +588,55 @@ def create_model_config(sens_dir, settings, scenario, sens, run_no):
     config += str('run: ' + run_name + '\n')
     config += str('run_no: ' + str(run_no) + '\n')
     config += str('run_path: ' + sens_dir.replace('\\', '/') + '\n')
+    if seed is not None:
+        config += str('seed: ' + str(seed) + '\n')
     for i in settings.keys():
-        config += str('settings.' + i + ': ' + str(settings[i]) + '\n')
+        if isinstance(settings[i], list):
+            config += str('settings.' + i + ': [' + ' '.join('"' + j + '"' if isinstance(j, str) else str(j)
+                                                              for j in settings[i]) + ']\n')
+        else:
+            config += str('settings.' + i + ': ' + str(settings[i]) + '\n')
+
+    branch = str('### NETLOGO ABM MODEL BRANCH\n')
+    branch += str('branch_year: ' + str(branch_year) + '\n')
 
     config += str('\n### SCENARIO SETTINGS\n')
     for i in scenario.keys():
-        config += str('scenario.' + i + ': ' + str(scenario[i]) + '\n')
+        if branch_year > 0 and str('scenario.' + i).startswith(tuple(branch_settings)):
+            branch += str('scenario.' + i + ': ' + str(scenario[i]) + '\n')
+        else:
+            config += str('scenario.' + i + ': ' + str(scenario[i]) + '\n')
 
     config += str('\n### SENSITIVITY SETTINGS\n')
     for i in sens.keys():
-        config += str(i + ': ' + str(sens[i]) + '\n')
+        if branch_year > 0 and i.startswith(tuple(branch_settings)):
+            branch += str(i + ': ' + str(sens[i]) + '\n')
+        else:
+            config += str(i + ': ' + str(sens[i]) + '\n')
+
+    if branch_year <= 0:
+        branch = None
+
+    return run_name, config, branch
+
+
+def create_model_config(sens_dir, settings, scenario, sens, run_no, branch_year=0, seed=None):
+    '''
+    Function that will create the model.config file, which is needed to run the model and includes all settings for the
+    scenario and the sensitivity analysis. With a branch year the policies (branch_settings) are written into the
+    branch.config file instead and are only switched on at the branch year.
+    :param:
+        str sens_dir: Path ouf the individual run folder
+        dict settings: Dictionary of setting parameters
+        dict scenario: Dictionary of scenario parameters
+        dict sens: Dictionary of sensitivity analysis parameters
+        int run_no: Number of the current run
+        int branch_year: Year in which the policies are switched on (default = 0, from the start)
+        int seed: Random seed of the run (default = None, no seed)
+    :return:
+        str run_name: Name of the run
+    '''
+    run_name, config, branch = get_model_config(sens_dir, settings, scenario, sens, run_no, branch_year, seed)
 
     filename = str(sens_dir + 'model.config')
     try:
@@ -339,20 +647,106 @@ def create_model_config(sens_dir, settings, scenario, sens, run_no):
         print('Error in create_model_config: File already exists.')
         exit(600)
 
+    if branch is not None:
+        filename = str(sens_dir + 'branch.config')
+        try:
+            with open(filename, 'w') as file:
+                file.write(branch)
+                file.close()
+        except FileExistsError:
+            print('Error in create_model_config: File already exists.')
+            exit(601)
+
     return(run_name)
 
 
-def create_run_folder(sens_dir, run_no):
+def get_seed(options, sens_no, run_no, no_runs):
+    '''
+    Function that will return the random seed of a run. With seed: shared the seed only depends on the number of the
+    run, so the same runs of all sensitivities and of all experiments with the same seed_base are paired. With
+    seed: run every run of the experiment gets its own seed.
+    :param:
+        dict options: Settings for the execution of the experiment
+        int sens_no: Number of the sensitivity
+        int run_no: Number of the run
+        int no_runs: Number of runs per sensitivity
+    :return:
+        int seed: Random seed of the run (None without seeds)
+    '''
+    if options['seed'].lower() == 'shared':
+        return options['seed_base'] + run_no
+    elif options['seed'].lower() == 'run':
+        return options['seed_base'] + (sens_no - 1) * no_runs + run_no
+
+    return None
+
+
+def get_manifest_config(row, settings, options):
+    '''
+    Function that will build the config of a run from its entry in manifest.csv, so no model.config is needed.
+    :param:
+        pd.Series row: Entry of the run in manifest.csv
+        dict settings: Dictionary of setting parameters
+        dict options: Settings for the execution of the experiment
+    :return:
+        dict config: Lines of the config as dict {'model': list, 'branch': list}
+    '''
+    scenario = {i: bool(row['scenario.' + i]) for i in scenario_settings if 'scenario.' + i in row.index}
+    sens = {i: row[i].item() if hasattr(row[i], 'item') else row[i] for i in sensitivity_settings if i in row.index}
+    seed = None if pd.isna(row['Seed']) or row['Seed'] == '' else int(row['Seed'])
+    config, branch = get_model_config(row['Path'], settings, scenario, sens, int(row['No']), options['branch_year'],
+                                      seed)[1:]
+
+    return {'model': config.splitlines(), 'branch': branch.splitlines() if branch is not None else []}
+
+
+def get_config(run_dir, config=None):
+    '''
+    Function that will return the lines of the model.config and the branch.config of a run. A config built from
+    manifest.csv is returned as it is.
+    :param:
+        str run_dir: Path to the output folder
+        dict config: Lines of the config as dict {'model': list, 'branch': list} (default = None, load the files)
+    :return:
+        dict config: Lines of the config as dict {'model': list, 'branch': list}
+    '''
+    if config is not None:
+        return config
+
+    config = {'model': [], 'branch': []}
+    for i, file in [['model', 'model.config'], ['branch', 'branch.config']]:
+        if os.path.isfile(os.path.join(run_dir, file)):
+            with open(os.path.join(run_dir, file)) as config_file:
+                config[i] = [line.rstrip('\n') for line in config_file.readlines()]
+
+    return config
+
+
+def get_netlogo_list(list_lines):
+    '''
+    Function that will convert a list of strings into a NetLogo list.
+    :param:
+        list list_lines: List of strings
+    :return:
+        str -: NetLogo list of the strings
+    '''
+    return '[' + ' '.join('"' + i.replace('\\', '\\\\').replace('"', '\\"') + '"' for i in list_lines) + ']'
+
+
+def create_run_folder(sens_dir, run_no, create=True):
     '''
     Function that will create the run folder, named on the current run and sensitivity settings.
     :param:
         str sens_dir: Path of the current sensitivity folder
         int run_no: Number of the current run
+        bool create: Create the folder, otherwise only the path is returned (default = True)
     :return:
         str run_dir: Path of the run folder
     '''
     run_dir = sens_dir + 'Run_' + str(run_no) + '\\'
 
+    if not create:
+        return run_dir
     if not os.path.isdir(run_dir):
         os.mkdir(run_dir)
     else:
@@ -362,22 +756,273 @@ def create_run_folder(sens_dir, run_no):
     return run_dir
 
 
-def run_model(run_name, run_no, run_dir):
+def get_tables(list_header):
+    '''
+    Function that will collect the output tables the model kept in memory since the last call.
+    :param:
+        dict list_header: Names of the columns for every output file
+    :return:
+        dict tables: New lines of every output file as dict {file: {column: np.array}}
+    '''
+    tables = {}
+    for file in list_header.keys():
+        header = list_header[file]
+        values = np.asarray(netlogo.report(str('write.pop_memory "' + file + '"'))).reshape(-1, len(header))
+        tables[file] = {header[i]: values[:, i] for i in range(len(header))}
+
+    return tables
+
+
+def get_experiment_dir(run_dir):
+    '''
+    Function that will return the output folder of the experiment a run belongs to, which is the first folder above the
+    run folder with the runs.init. Runs of all scenarios and of the screening share its snapshots and branches.
+    :param:
+        str run_dir: Path to the output folder
+    :return:
+        str out_path: Path of the output folder of the experiment
+    '''
+    out_path = os.path.dirname(os.path.normpath(run_dir))
+    for i in range(3):
+        out_path = os.path.dirname(out_path)
+        if os.path.isfile(os.path.join(out_path, 'runs.init')):
+            return out_path
+
+    return os.path.dirname(os.path.dirname(os.path.normpath(run_dir)))
+
+
+def get_snapshot_file(run_dir, run_no, config):
+    '''
+    Function that will return the path of the snapshot of the world after setup for a run. The name of the snapshot is
+    the hash of the model.config without the meta values and the restart_settings, so all runs that only differ in
+    these settings share the same snapshot. With warm_start: run the number of the run is part of the hash as well, so
+    every run number has its own initial world.
+    :param:
+        str run_dir: Path to the output folder
+        int run_no: Number of the run
+        dict config: Lines of the config as dict {'model': list, 'branch': list}
+    :return:
+        str snapshot_file: Path of the snapshot
+    '''
+    list_lines = []
+    for line in config['model']:
+        name = line.split(':')[0].strip()
+        if name in ['run', 'run_no', 'run_path'] or name.startswith(tuple(restart_settings)):
+            continue
+        list_lines.append(line.strip())
+    if warm_start == 'run':
+        list_lines.append('run_no: ' + str(run_no))
+    key = hashlib.md5('\n'.join(list_lines).encode()).hexdigest()
+    snapshot_dir = os.path.join(get_experiment_dir(run_dir), 'snapshots')
+
+    return os.path.join(snapshot_dir, key + '.csv')
+
+
+def get_branch_path(run_dir, run_no, config):
+    '''
+    Function that will return the branch year and the path of the shared years before the branch year for a run. The
+    name of the folder is the hash of the model.config without the meta values, the number of the run and the branch
+    year, so all runs that only differ in their policies (branch_settings) share the same years.
+    :param:
+        str run_dir: Path to the output folder
+        int run_no: Number of the run
+        dict config: Lines of the config as dict {'model': list, 'branch': list}
+    :return:
+        int branch_year: Year in which the policies are switched on (0 without branch.config)
+        str branch_path: Path of the folder with the shared years (None without branch.config)
+    '''
+    if len(config['branch']) == 0:
+        return 0, None
+
+    branch_year = 0
+    for line in config['branch']:
+        if line.split(':')[0].strip() == 'branch_year':
+            branch_year = int(line.split(':')[1])
+    list_lines = ['run_no: ' + str(run_no), 'branch_year: ' + str(branch_year)]
+    for line in config['model']:
+        if line.split(':')[0].strip() not in ['run', 'run_no', 'run_path']:
+            list_lines.append(line.strip())
+    key = hashlib.md5('\n'.join(list_lines).encode()).hexdigest()
+    branch_dir = os.path.join(get_experiment_dir(run_dir), 'branches')
+
+    return branch_year, os.path.join(branch_dir, key)
+
+
+def save_branch(branch_path, run_dir, list_tables):
+    '''
+    Function that will save the world and the output of the years before the branch year, so other runs can continue
+    from there. The folder is written under a temporary name and renamed in one step when it is complete.
+    :param:
+        str branch_path: Path of the folder with the shared years
+        str run_dir: Path to the output folder
+        list list_tables: Tables of every year kept in memory, each as dict {file: {column: np.array}}
+    :return:
+    '''
+    tmp_path = branch_path + '.' + str(os.getpid()) + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    netlogo.command(str('export-world "' + os.path.join(tmp_path, 'world.csv').replace('\\', '/') + '"'))
+    for i in os.listdir(run_dir):
+        if i not in ['model.config', 'branch.config'] and os.path.isfile(os.path.join(run_dir, i)):
+            shutil.copy(os.path.join(run_dir, i), tmp_path)
+    if list_tables:
+        him_store.save_run(tmp_path, him_store.merge_tables(list_tables))
+    try:
+        os.rename(tmp_path, branch_path)
+    except OSError:
+        # Another worker saved the same years in the meantime
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_branch(branch_path, run_dir):
+    '''
+    Function that will copy the output of the years before the branch year into the run folder.
+    :param:
+        str branch_path: Path of the folder with the shared years
+        str run_dir: Path to the output folder
+    :return:
+        dict tables: Tables of the years before the branch year kept in memory (None without settings.memory)
+    '''
+    for i in os.listdir(branch_path):
+        if i not in ['world.csv', him_store.store_file]:
+            shutil.copy(os.path.join(branch_path, i), run_dir)
+    if not os.path.isfile(os.path.join(branch_path, him_store.store_file)):
+        return None
+    tables = him_store.load_run(branch_path)
+
+    return {file: {column: tables[file][column].values for column in tables[file].columns} for file in tables.keys()}
+
+
+def is_stopped(list_values, years, tol, degenerate=True):
+    '''
+    Function that will check if a run is in a degenerate or steady state for the last years. A run is degenerate if
+    there are neither live hydrogen producers nor electrolyzers and steady if no value of stop_reporters changed by more
+    than the tolerance relative to its value. With scenario.time_lag new producers are created after the time lag, so
+    the degenerate state is not checked.
+    :param:
+        list list_values: Values of stop_reporters of every year
+        int years: Number of years the state has to last
+        float tol: Tolerance for the relative change of a value
+        bool degenerate: Check the degenerate state (default = True)
+    :return:
+        str -: degenerate, steady or None if the run goes on
+    '''
+    if years <= 0 or len(list_values) <= years:
+        return None
+    values = np.array(list_values[-(years + 1):], dtype=float)
+    if degenerate and np.all(values[1:, 0] == 0) and np.all(values[1:, 1] == 0):
+        return 'degenerate'
+    change = np.abs(np.diff(values, axis=0)) / np.maximum(np.abs(values[:-1]), 1e-9)
+    if np.all(change <= tol):
+        return 'steady'
+
+    return None
+
+
+def get_fill_years(file, year, day_years=None):
+    '''
+    Function that will return the years of an output table that are filled after an early stop. The daily tables are
+    only filled for the sampled years.
+    :param:
+        str file: Name of the csv file
+        int year: Last year of the run
+        list day_years: Sampled years of the daily data (default = None, all years)
+    :return:
+        list -: Years to fill
+    '''
+    return [i for i in range(year + 1, 80) if day_years is None or not file.endswith('_day.csv') or i in day_years]
+
+
+def fill_years(run_dir, tables, year, callback=None, day_years=None):
     '''
-    Function that will run the model.
+    Function that will fill the years after an early stop with the last year, so every output table has all 80 years.
+    The csv files are extended by the lines of the last year with the next years, the tables kept in memory are handed
+    to the callback. The daily tables are filled for every sampled year after the stop with the last sampled year up to
+    the stop, as the year of the stop itself is not written if it is not sampled.
+    :param:
+        str run_dir: Path to the output folder
+        dict tables: Last lines of every output table kept in memory (None without settings.memory)
+        int year: Last year of the run
+        function callback: Function called with the tick and the filled lines of the output tables (default = None)
+        list day_years: Sampled years of the daily data (default = None, all years)
+    :return:
+    '''
+    if tables is not None:
+        for i in range(year + 1, 80):
+            filled = {file: dict(tables[file]) for file in tables.keys() if i in get_fill_years(file, year, day_years)}
+            for file in filled.keys():
+                filled[file]['Year'] = np.full(len(filled[file]['Year']), i)
+            if callback is not None:
+                callback(i, filled)
+        return
+
+    for file in him_store.output_files:
+        out_file = os.path.join(run_dir, file)
+        if not os.path.isfile(out_file):
+            continue
+        with open(out_file, newline='') as csv_file:
+            lines = csv_file.readlines()
+        if len(lines) < 2:
+            continue
+        index = lines[0].strip().split(';').index('Year')
+        list_years = [float(line.split(';')[index]) for line in lines[1:] if line.strip()]
+        list_years = [i for i in list_years if i <= year]
+        if len(list_years) == 0:
+            print('Warning in fill_years: ' + file + ' has no year up to the stop in year ' + str(year)
+                  + ' and is not filled.')
+            continue
+        last = [line for line in lines[1:] if line.strip() and float(line.split(';')[index]) == max(list_years)]
+        with open(out_file, 'a', newline='') as csv_file:
+            for i in get_fill_years(file, year, day_years):
+                for line in last:
+                    values = line.split(';')
+                    values[index] = str(i)
+                    csv_file.write(';'.join(values))
+
+
+def run_model(run_name, run_no, run_dir, config=None, horizon=81, callback=None):
+    '''
+    Function that will run the model. With settings.memory the model keeps the output tables in memory instead of
+    writing the csv files, the new lines are collected after every year and handed to the callback. With a warm start
+    the world is restored from the snapshot after setup if there is one, otherwise the snapshot is created after setup.
+    With a branch year the run continues from the shared years before the branch year if they were already run,
+    otherwise they are saved when the branch year is reached. The policies of the run are switched on at the branch
+    year. A config built from manifest.csv is set with pynetlogo instead of loading the model.config, the run folder is
+    only created if the run writes output files. Runs with a shorter horizon stop early, e.g. for the screening. With
+    the early stop a run that stays in a degenerate or steady state for stop_years ends and its remaining years are
+    filled with the last year.
     :param:
         str run_name: Name of the run
         int run_no: Number of the run
         str run_dir: Path to the output folder
+        dict config: Lines of the config as dict {'model': list, 'branch': list} (default = None, load the files)
+        int horizon: Number of ticks of the run (default = 81, all years)
+        function callback: Function called with the tick and the new lines of the output tables (None without
+                           settings.memory) after every tick (default = None)
     :return:
-        bool -: True if everything works out
+        dict -: Result of the run with the year of the early stop as {'stopped': int} (None without early stop)
     '''
 
     # Output so people know it's still running
     print('Run ' + str(run_no) + ' is running...')
 
-    # Clear model
-    netlogo.command('setup-meta')
+    # Config of the run and run folder for the output files
+    lines = get_config(run_dir, config)
+    if config is not None and 'settings.write: True' in lines['model']:
+        os.makedirs(run_dir, exist_ok=True)
+
+    # Clear model, restore the world at the branch year or restore the world after setup
+    branch_year, branch_path = get_branch_path(run_dir, run_no, lines)
+    branch = branch_path is not None and os.path.isdir(branch_path)
+    snapshot_file = get_snapshot_file(run_dir, run_no, lines) if warm_start != 'none' and not branch else None
+    restart = snapshot_file is not None and os.path.isfile(snapshot_file)
+    if branch:
+        netlogo.command('file-close-all')
+        netlogo.command(str('import-world "' + os.path.join(branch_path, 'world.csv').replace('\\', '/') + '"'))
+    elif restart:
+        netlogo.command('file-close-all')
+        netlogo.command(str('import-world "' + snapshot_file.replace('\\', '/') + '"'))
+    else:
+        netlogo.command('setup-meta')
 
     # Set meta values in the model
     tmpName = str('set meta.run "' + run_name + '"')
@@ -386,87 +1031,1189 @@ def run_model(run_name, run_no, run_dir):
     netlogo.command(tmpName)
     netlogo.command(tmpNO)
     netlogo.command(tmpDir)
+    netlogo.command(str('set meta.config_lines ' + get_netlogo_list(config['model'] if config is not None else [])))
+    netlogo.command(str('set meta.branch_lines ' + get_netlogo_list(config['branch'] if config is not None else [])))
+
+    # Setup the model and save the world for the following runs
+    start_tick = 0
+    if branch:
+        tables = load_branch(branch_path, run_dir)
+        netlogo.command('setup-branch')
+        start_tick = branch_year
+        if callback is not None and tables is not None:
+            callback(start_tick - 1, tables)
+    elif restart:
+        netlogo.command('setup-restart')
+    else:
+        netlogo.command('setup')
+        if snapshot_file is not None:
+            os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+            tmp_file = snapshot_file + '.' + str(os.getpid()) + '.tmp'
+            netlogo.command(str('export-world "' + tmp_file.replace('\\', '/') + '"'))
+            os.replace(tmp_file, snapshot_file)
+
+    # Header of the output tables kept in memory
+    list_header = {}
+    if netlogo.report('settings.write and settings.memory'):
+        for file in him_store.output_files:
+            header = [str(i) for i in netlogo.report(str('write.get_header "' + file + '"'))]
+            # Files that are not an output channel have no header
+            if len(header) > 0:
+                list_header[file] = header
+
+    # Run model for 80 year or a shorter horizon
+    list_tables = []
+    list_values = []
+    time_lag = None
+    last_tables = {}
+    stopped = None
+    tick = start_tick - 1
+    for tick in range(start_tick, horizon):
+        # Save the shared years and switch on the policies
+        if branch_path is not None and not branch and tick == branch_year:
+            save_branch(branch_path, run_dir, list_tables)
+            netlogo.command('setup-branch')
+        netlogo.command('go')
+        tables = get_tables(list_header) if list_header else None
+        for file in tables.keys() if tables is not None else []:
+            if len(tables[file]['Year']) > 0:
+                last_tables[file] = tables[file]
+        if branch_path is not None and tables is not None and tick < branch_year:
+            list_tables.append(tables)
+        if callback is not None:
+            callback(tick, tables)
+
+        # Early stop in a degenerate or steady state, not before the policies are switched on
+        if early_stop is not None and tick >= branch_year and tick < 79:
+            if time_lag is None:
+                time_lag = bool(netlogo.report('is-number? scenario.time_lag'))
+            list_values.append(netlogo.report(str('(list ' + ' '.join(stop_reporters) + ')')))
+            state = is_stopped(list_values, early_stop['years'], early_stop['tol'], degenerate=not time_lag)
+            if state is not None:
+                print('Run ' + str(run_no) + ' stopped in year ' + str(tick) + ' (' + state + ')')
+                stopped = tick
+                break
+
+    # Finish the run, the model writes the config and closes all files in the last year
+    if tick < 80:
+        netlogo.command('set global.year 80')
+        netlogo.command('go')
+    if stopped is not None:
+        day_years = [int(i) for i in netlogo.report('ifelse-value is-list? settings.day_years [settings.day_years] '
+                                                    + '[n-values 80 [i -> i]]')]
+        fill_years(run_dir, last_tables if tables is not None else None, stopped, callback, day_years)
+
+    return {'stopped': stopped}
+
+
+def initializer(model_file, mode='none', stop=None, jvm_args=None):
+    '''
+    Function that will initialize the model.
+    :param:
+        str model_file: Filepath for the model to run
+        str mode: Warm start of the runs - none, run or config (default = none)
+        dict stop: Early stop as {'years': int, 'tol': float} (default = None, no early stop)
+        list jvm_args: Arguments for the JVM, e.g. the heap (default = None, none)
+    :return:
+    '''
+
+    global netlogo, warm_start, early_stop
+    warm_start = mode.lower()
+    early_stop = stop
+    netlogo = pynetlogo.NetLogoLink(netlogo_home=netlogo_file, jvm_path=jvm_file, gui=False,
+                                    jvmargs=jvm_args if jvm_args is not None else [])
+    netlogo.load_model(model_file)
 
-    # Setup the model
-    netlogo.command('setup')
 
-    # Run model for 80 year
-    ticks = 81
-    netlogo.repeat_command('go', ticks)
+def get_memory():
+    '''
+    Function that will report the used heap of the JVM of the current worker. The committed heap is not used, as it
+    grows towards the maximum heap no matter how much the runs need.
+    :return:
+        float memory: Used heap of the JVM in MB
+    '''
+    runtime = jpype.java.lang.Runtime.getRuntime()
 
-    return(True)
+    return (runtime.totalMemory() - runtime.freeMemory()) / 1048576
 
 
-def initializer(model_file):
+def get_pool_sizing(no_conruns, options):
     '''
-    Function that will initialize the model.
+    Function that will return the arguments of the JVMs and the automatic sizing of the pool. With concurrent_runs: auto
+    the pool chooses the number of workers within the memory budget and, without a fixed jvm_heap, the heap of the JVMs.
     :param:
-        str model_file: Filepath for the model to run
+        int no_conruns: Number of concurrent runs (0 for an automatic number)
+        dict options: Settings for the execution of the experiment
     :return:
+        list jvm_args: Arguments for the JVM of every worker
+        dict auto: Automatic sizing of the pool (see him_pool.start_pool) or None for a fixed pool
     '''
+    jvm_args = options['jvm_options'] + (['-Xmx' + str(options['jvm_heap']) + 'm'] if options['jvm_heap'] > 0 else [])
+    if no_conruns > 0:
+        return jvm_args, None
+    auto = {'budget': options['memory_budget'] * him_pool.get_total_memory(), 'cores': os.cpu_count() or 1,
+            'min_workers': 1, 'workers': True, 'heap': options['jvm_heap'] == 0}
+    print('Pool is sized automatically with a memory budget of ' + str(round(auto['budget'])) + ' MB and '
+          + str(auto['cores']) + ' cores')
 
-    global netlogo
-    netlogo = pynetlogo.NetLogoLink(netlogo_home=netlogo_file, jvm_path=jvm_file, gui=False)
-    netlogo.load_model(model_file)
+    return jvm_args, auto
 
 
-def main():
-    # List of experiments
-    experiment = pd.DataFrame(columns=['Name', 'No', 'Path'])
+def get_chunksize(no_left, no_conruns, chunksize):
+    '''
+    Function that will return the size of the next chunk of runs. With a fixed chunksize every chunk has the same size,
+    with a chunksize of 0 the size shrinks with the number of runs left (guided self-scheduling), so the end of the
+    experiment is handed out one run at a time.
+    :param:
+        int no_left: Number of runs not yet handed out
+        int no_conruns: Number of concurrent runs
+        int chunksize: Fixed size of a chunk or 0 for adaptive chunks
+    :return:
+        int size: Size of the next chunk
+    '''
+    if chunksize > 0:
+        return chunksize
+
+    return max(1, int(np.ceil(no_left / (2 * no_conruns))))
+
+
+def schedule_runs(pool, runs, chunksize=1, callback=None, retries=0, more=None):
+    '''
+    Generator that hands out the runs to the workers of the pool and yields the results as soon as they are completed.
+    Only one chunk per worker is handed out at a time, so a worker that finishes early takes the next runs instead of
+    waiting for a pre-assigned share of the experiment. Failed runs are handed out again until they ran out of retries.
+    The warm-up run of an automatically sized pool is handed out alone, the chunks follow the current size of the pool.
+    :param:
+        dict pool: Pool of workers (see him_pool)
+        list runs: List of runs, each as [index, run_name, run_no, run_dir, config, horizon]
+        int chunksize: Fixed size of a chunk or 0 for adaptive chunks (default = 1)
+        function callback: Function called with the indices of every chunk that is handed out (default = None)
+        int retries: Number of retries for a failed run (default = 0)
+        function more: Function called after every completed run that returns further runs to hand out (default = None)
+    :return:
+        list -: Result of a run as [index, result, runtime, tables, attempts]
+    '''
+    runs = list(runs)
+    dict_runs = {entry[0]: entry for entry in runs}
+    attempts = {entry[0]: 0 for entry in runs}
+    no_total = len(runs)
+    no_done = 0
+
+    while runs or him_pool.is_busy(pool):
+        # Hand out chunks to all idle workers
+        for worker_id in him_pool.get_idle_workers(pool):
+            if not runs:
+                break
+            if him_pool.is_warmup(pool):
+                if him_pool.is_busy(pool):
+                    break
+                size = 1
+            else:
+                size = get_chunksize(len(runs), len(pool['workers']), chunksize)
+            chunk = runs[:size]
+            del runs[:size]
+            if callback is not None:
+                callback([entry[0] for entry in chunk])
+            him_pool.submit(pool, worker_id, chunk)
+
+        # Collect the results, runs of dead workers are handed out again
+        results, lost = him_pool.get_results(pool)
+        runs = lost + runs
+        for entry in results:
+            attempts[entry[0]] += 1
+            if not entry[1]:
+                reset_run(dict_runs[entry[0]][3])
+                if attempts[entry[0]] <= retries:
+                    print('Run ' + str(dict_runs[entry[0]][2]) + ' failed and is retried')
+                    runs.append(dict_runs[entry[0]])
+                    continue
+            no_done += 1
+            yield entry + [attempts[entry[0]]]
+            if more is not None:
+                for new in more():
+                    dict_runs[new[0]] = new
+                    attempts[new[0]] = 0
+                    runs.append(new)
+                    no_total += 1
+        if len(results) > 0:
+            print(str(no_done) + '/' + str(no_total) + ' runs completed')
+
+
+def load_runtime_history(out_dir):
+    '''
+    Function that will load the runtimes of all previous experiments in the output folder.
+    :param:
+        str out_dir: Name of the current output folder, which is skipped
+    :return:
+        pd.DataFrame history: Parameters and runtime of all previous runs
+    '''
+    result_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output')
+    list_df = []
+    for i in os.listdir(result_dir):
+        file = os.path.join(result_dir, i, 'manifest.csv')
+        if i != out_dir and os.path.isfile(file):
+            tmp_df = pd.read_csv(file, sep=';')
+            tmp_df = tmp_df[tmp_df['State'] == 'done']
+            # Runs from the cache and runs with the short horizon of the screening say nothing about the runtime
+            if 'Cached' in tmp_df.columns:
+                tmp_df = tmp_df[tmp_df['Cached'] != True]
+            if 'Fidelity' in tmp_df.columns:
+                tmp_df = tmp_df[tmp_df['Fidelity'] != 'low']
+            list_df.append(tmp_df)
+
+    if len(list_df) == 0:
+        return pd.DataFrame()
+
+    return pd.concat(list_df, ignore_index=True)
+
+
+def predict_runtime(experiment, history):
+    '''
+    Function that will predict the runtime of each run with a log-linear regression on the model parameters, fitted on
+    the runtimes of previous experiments.
+    :param:
+        pd.DataFrame experiment: List of all runs including their parameters
+        pd.DataFrame history: Parameters and runtime of previous runs
+    :return:
+        np.array prediction: Predicted runtime of each run in seconds
+    '''
+    parameters = sensitivity_settings + [str('scenario.' + i) for i in scenario_settings]
+    columns = [i for i in parameters if i in experiment.columns and i in history.columns]
+    x_hist = np.column_stack([np.ones(len(history))] + [history[i].astype(float) for i in columns])
+    y_hist = np.log(history['Runtime'].astype(float).clip(lower=1e-3))
+    coef = np.linalg.lstsq(x_hist, y_hist, rcond=None)[0]
+
+    x_exp = np.column_stack([np.ones(len(experiment))] + [experiment[i].astype(float) for i in columns])
+
+    return np.exp(x_exp @ coef)
 
-    # Check if model ok
-    model_dir = check_model()
-    model_dir += '\\main.nlogo'
+
+def load_size_history(out_dir, no_samples=5):
+    '''
+    Function that will load the size of the output files of previous experiments per year of a run. Only the first
+    completed runs of every experiment are checked. Files saved in results.npz are measured by their compressed size in
+    the numpy file.
+    :param:
+        str out_dir: Name of the current output folder, which is skipped
+        int no_samples: Number of runs checked per experiment (default = 5)
+    :return:
+        pd.DataFrame history: Size of every output file of the checked runs as bytes per year and its format (csv, npz)
+    '''
+    result_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output')
+    list_size = []
+    for i in os.listdir(result_dir):
+        file = os.path.join(result_dir, i, 'manifest.csv')
+        if i == out_dir or not os.path.isfile(file):
+            continue
+        try:
+            horizon = load_init(os.path.join(result_dir, i))[7]['horizon']
+        except SystemExit:
+            continue
+        tmp_df = pd.read_csv(file, sep=';')
+        tmp_df = tmp_df[tmp_df['State'] == 'done']
+        if 'Fidelity' in tmp_df.columns:
+            tmp_df = tmp_df[tmp_df['Fidelity'] != 'low']
+        for run_dir in tmp_df['Path'].head(no_samples):
+            years = min(horizon, 80)
+            for j in him_store.output_files:
+                if os.path.isfile(os.path.join(run_dir, j)):
+                    list_size.append({'File': j, 'Format': 'csv',
+                                      'Bytes': os.path.getsize(os.path.join(run_dir, j)) / years})
+            if os.path.isfile(os.path.join(run_dir, him_store.store_file)):
+                size = {}
+                with zipfile.ZipFile(os.path.join(run_dir, him_store.store_file)) as store:
+                    for info in store.infolist():
+                        size[info.filename.split('|')[0]] = size.get(info.filename.split('|')[0], 0) + \
+                                                            info.compress_size
+                for j in size.keys():
+                    list_size.append({'File': j, 'Format': 'npz', 'Bytes': size[j] / years})
+
+    return pd.DataFrame(list_size, columns=['File', 'Format', 'Bytes'])
+
+
+def get_makespan(list_runtime, no_conruns):
+    '''
+    Function that will return the wall-clock time of a list of runs on a number of workers, with the longest runs
+    handed out first.
+    :param:
+        list list_runtime: Runtime of every run in seconds
+        int no_conruns: Number of concurrent runs
+    :return:
+        float -: Wall-clock time in seconds
+    '''
+    workers = [0.0] * max(1, no_conruns)
+    for i in sorted(list_runtime, reverse=True):
+        heapq.heappush(workers, heapq.heappop(workers) + i)
+
+    return max(workers)
+
+
+def estimate_experiment(experiment, init):
+    '''
+    Function that will predict the runtime and the size of the output of a new experiment from previous experiments.
+    The runtime of every run is predicted like for the longest-job-first scheduler and scaled with its horizon, the size
+    of every output file with the mean size per year of the previous runs in the same format (csv or npz), only for the
+    output channels and the sampled years of the daily data. Runs that may be skipped by the adaptive replication, the
+    progressive Sobol or the screening are all counted.
+    :param:
+        pd.DataFrame experiment: List of all runs including their parameters
+        tuple init: Settings of the runs.init (see load_init)
+    :return:
+        dict estimate: Predicted CPU-hours, wall-clock hours and size of every output file in bytes
+    '''
+    no_conruns, settings, options = init[1], init[2], init[7]
+    # With an automatic number of workers at most one run per core
+    no_conruns = no_conruns if no_conruns > 0 else os.cpu_count() or 1
+    years = np.where(experiment['Fidelity'] == 'low', min(options['screening_horizon'], 80),
+                     min(options['horizon'], 80))
+    estimate = {'cpu_hours': np.nan, 'wall_hours': np.nan, 'size': {}}
+
+    # Runtime
+    history = load_runtime_history(None)
+    if len(history) > 0:
+        runtime = predict_runtime(experiment, history) * years / 80
+        estimate['cpu_hours'] = np.sum(runtime) / 3600
+        estimate['wall_hours'] = get_makespan(runtime, no_conruns) / 3600
+        print('Predicted runtime: ' + str(round(estimate['cpu_hours'], 1)) + ' CPU-hours, '
+              + str(round(estimate['wall_hours'], 1)) + ' hours with ' + str(no_conruns) + ' concurrent runs (history '
+              + 'of ' + str(len(history)) + ' runs)')
+    else:
+        print('No runtimes of previous experiments found, the runtime can not be predicted')
+
+    # Size of the output files
+    if not settings.get('write', False):
+        print('Predicted output: none (write: false)')
+        return estimate
+    history = load_size_history(None)
+    file_format = 'npz' if settings.get('memory', False) else 'csv'
+    history = history[history['Format'] == file_format].groupby('File')['Bytes'].mean()
+    if len(history) == 0:
+        print('No ' + file_format + ' output of previous experiments found, the size can not be predicted')
+        return estimate
+    print('Predicted output (' + file_format + '):')
+    for i in history.index:
+        if i not in settings.get('output', him_store.output_files):
+            continue
+        estimate['size'][i] = history[i] * np.sum(years)
+        if i.endswith('_day.csv') and 'day_years' in settings:
+            estimate['size'][i] = history[i] * sum(np.sum(np.array(settings['day_years'])[:, None] < years, axis=0))
+        print('    ' + i + ': ' + str(round(estimate['size'][i] / 1e9, 2)) + ' GB')
+    total = sum(estimate['size'].values())
+    free = shutil.disk_usage(os.path.join(os.path.dirname(os.getcwd()), '02_Output')).free
+    print('    total: ' + str(round(total / 1e9, 2)) + ' GB of ' + str(round(free / 1e9, 2)) + ' GB free')
+    if total > free:
+        print('Warning in estimate_experiment: The output does not fit on the disk.')
+
+    return estimate
+
+
+def get_checksum(run_dir):
+    '''
+    Function that will calculate the checksums of all output files of a run.
+    :param:
+        str run_dir: Path of the run folder
+    :return:
+        str checksum: Checksums of all output files as file:md5, seperated by comma
+    '''
+    list_checksum = []
+    if os.path.isdir(run_dir):
+        for i in sorted(os.listdir(run_dir)):
+            file = os.path.join(run_dir, i)
+            if i not in ['model.config', 'branch.config'] and os.path.isfile(file):
+                md5 = hashlib.md5()
+                with open(file, 'rb') as tmp_file:
+                    for block in iter(lambda: tmp_file.read(1048576), b''):
+                        md5.update(block)
+                list_checksum.append(i + ':' + md5.hexdigest())
+
+    return ','.join(list_checksum)
+
+
+def get_model_hash(model_dir):
+    '''
+    Function that will calculate the hash of the model, which includes main.nlogo, all .nls files and the input data.
+    :param:
+        str model_dir: Path of the model folder
+    :return:
+        str model_hash: sha256 of all model files
+    '''
+    list_files = [os.path.join(model_dir, 'main.nlogo')]
+    list_files += sorted(os.path.join(model_dir, i) for i in os.listdir(model_dir) if i.endswith('.nls'))
+    data_dir = os.path.join(model_dir, '01_Data')
+    if os.path.isdir(data_dir):
+        list_files += sorted(os.path.join(data_dir, i) for i in os.listdir(data_dir))
+
+    sha256 = hashlib.sha256()
+    for file in list_files:
+        if os.path.isfile(file):
+            sha256.update(os.path.relpath(file, model_dir).replace('\\', '/').encode())
+            with open(file, 'rb') as tmp_file:
+                for block in iter(lambda: tmp_file.read(1048576), b''):
+                    sha256.update(block)
+
+    return sha256.hexdigest()
+
+
+def get_cache_path(model_hash, run_no, config, horizon=81, stop=None):
+    '''
+    Function that will return the path of a run in the cache. The name of the folder is the hash of the model and the
+    config of the run without the meta values, so every run with the same settings, scenario, parameters and seed
+    shares the same folder. Runs without a seed are only shared by runs with the same number.
+    :param:
+        str model_hash: sha256 of all model files
+        int run_no: Number of the run
+        dict config: Lines of the config as dict {'model': list, 'branch': list}
+        int horizon: Number of ticks of the run (default = 81)
+        dict stop: Early stop as {'years': int, 'tol': float} (default = None, no early stop)
+    :return:
+        str cache_path: Path of the run in the cache
+    '''
+    list_lines = ['model: ' + model_hash, 'horizon: ' + str(horizon)]
+    if stop is not None:
+        list_lines.append('stop: ' + str(stop['years']) + ', ' + str(stop['tol']))
+    for line in config['model'] + config['branch']:
+        if not line.strip() or line.startswith('#') or line.split(':')[0].strip() in ['run', 'run_no', 'run_path']:
+            continue
+        list_lines.append(line.strip())
+    if not any(line.startswith('seed:') for line in list_lines):
+        list_lines.append('run_no: ' + str(run_no))
+    key = hashlib.sha256('\n'.join(sorted(list_lines)).encode()).hexdigest()
+
+    return os.path.join(os.path.dirname(os.getcwd()), '02_Output', 'cache', key)
+
+
+def link_file(file, out_dir):
+    '''
+    Function that will link a file into a folder and copy it if the file system does not support hard links.
+    :param:
+        str file: Path of the file
+        str out_dir: Path of the folder
+    :return:
+    '''
+    out_file = os.path.join(out_dir, os.path.basename(file))
+    if os.path.isfile(out_file):
+        os.remove(out_file)
+    try:
+        os.link(file, out_file)
+    except OSError:
+        shutil.copy2(file, out_file)
+
+
+def save_cache(cache_path, run_dir):
+    '''
+    Function that will add the output files of a completed run to the cache. The folder is written under a temporary
+    name and renamed in one step when it is complete.
+    :param:
+        str cache_path: Path of the run in the cache
+        str run_dir: Path of the run folder
+    :return:
+    '''
+    if os.path.isdir(cache_path) or not os.path.isdir(run_dir):
+        return
+    list_files = [os.path.join(run_dir, i) for i in os.listdir(run_dir)
+                  if i not in ['model.config', 'branch.config'] and os.path.isfile(os.path.join(run_dir, i))]
+    if len(list_files) == 0:
+        return
+
+    tmp_path = cache_path + '.' + str(os.getpid()) + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    for file in list_files:
+        link_file(file, tmp_path)
+    try:
+        os.rename(tmp_path, cache_path)
+    except OSError:
+        # The same run was added to the cache in the meantime
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_cache(cache_path, run_dir):
+    '''
+    Function that will link the output files of a run from the cache into the run folder.
+    :param:
+        str cache_path: Path of the run in the cache
+        str run_dir: Path of the run folder
+    :return:
+        bool -: True if the run was found in the cache
+    '''
+    if not os.path.isdir(cache_path):
+        return False
+
+    os.makedirs(run_dir, exist_ok=True)
+    for i in os.listdir(cache_path):
+        link_file(os.path.join(cache_path, i), run_dir)
+
+    return True
+
+
+def reset_run(run_dir):
+    '''
+    Function that will delete all output files of an incomplete run, so it can be run again.
+    :param:
+        str run_dir: Path of the run folder
+    :return:
+    '''
+    if os.path.isdir(run_dir):
+        for i in os.listdir(run_dir):
+            file = os.path.join(run_dir, i)
+            if i not in ['model.config', 'branch.config'] and os.path.isfile(file):
+                os.remove(file)
+
+
+def write_manifest(out_path, experiment):
+    '''
+    Function that will write the manifest of the experiment. The file is replaced in one step, so an interruption never
+    leaves a broken manifest behind.
+    :param:
+        str out_path: Path of the output folder
+        pd.DataFrame experiment: List of all runs including their state
+    :return:
+    '''
+    out_file = os.path.join(out_path, 'manifest.csv')
+    experiment.to_csv(out_file + '.tmp', sep=';', index=False)
+    os.replace(out_file + '.tmp', out_file)
+
+
+def load_manifest(out_path):
+    '''
+    Function that will load the manifest of an interrupted experiment and reset all runs that are not completed.
+    Completed runs with missing or changed output files are run again as well.
+    :param:
+        str out_path: Path of the output folder
+    :return:
+        pd.DataFrame experiment: List of all runs including their state
+    '''
+    try:
+        experiment = pd.read_csv(os.path.join(out_path, 'manifest.csv'), sep=';', keep_default_na=False)
+    except FileNotFoundError:
+        print('Error in load_manifest: manifest.csv not found in ' + out_path + '.')
+        exit(800)
+
+    for i in experiment.index:
+        if experiment.loc[i, 'State'] == 'done' and get_checksum(experiment.loc[i, 'Path']) == \
+                experiment.loc[i, 'Checksum']:
+            continue
+        reset_run(experiment.loc[i, 'Path'])
+        experiment.loc[i, 'State'] = 'pending'
+        experiment.loc[i, 'Checksum'] = ''
+    print(str(sum(experiment['State'] == 'done')) + '/' + str(len(experiment)) + ' runs already completed')
+
+    return experiment
+
+
+def get_sens_runs(experiment, sens):
+    '''
+    Function that will select all runs of a sensitivity of a scenario.
+    :param:
+        pd.DataFrame experiment: List of all runs
+        tuple sens: Name of the scenario and number of the sensitivity
+    :return:
+        pd.Series -: True for every run of the sensitivity
+    '''
+    return (experiment['Scenario'] == sens[0]) & (experiment['Sensitivity'] == sens[1])
+
+
+def get_sens_name(sens):
+    '''
+    Function that will return the name of a sensitivity of a scenario for the output.
+    :param:
+        tuple sens: Name of the scenario and number of the sensitivity
+    :return:
+        str -: Name of the sensitivity
+    '''
+    return (sens[0] + ' ' if sens[0] else '') + 'Sensitivity ' + str(sens[1])
+
+
+def is_converged(experiment, sens, options):
+    '''
+    Function that will check if the KPIs of a sensitivity are precise enough. This is the case if at least min_runs runs
+    are done and the 95% confidence interval of the mean of every KPI is narrower than ci_width relative to the mean.
+    :param:
+        pd.DataFrame experiment: List of all runs including their state and KPIs
+        tuple sens: Name of the scenario and number of the sensitivity
+        dict options: Settings for the execution of the experiment
+    :return:
+        bool -: True if no more runs are needed
+    '''
+    done = experiment[get_sens_runs(experiment, sens) & (experiment['State'] == 'done')]
+    if len(done) < max(2, options['min_runs']):
+        return False
+    for i in options['kpis']:
+        values = pd.to_numeric(done['KPI.' + i], errors='coerce').dropna().values
+        if len(values) < 2:
+            return False
+        width = 2 * stats.t.ppf(0.975, len(values) - 1) * np.std(values, ddof=1) / np.sqrt(len(values))
+        if width > 0 and width > options['ci_width'] * abs(np.mean(values)):
+            return False
+
+    return True
+
+
+def update_replication(experiment, index, queue, options):
+    '''
+    Function that will save the KPIs of a completed run and decide if its sensitivity needs another run. If the KPIs are
+    precise enough all runs of the sensitivity that were not handed out yet are skipped.
+    :param:
+        pd.DataFrame experiment: List of all runs including their state and KPIs
+        int index: Index of the completed run
+        dict queue: Indices of the runs not handed out yet for every sensitivity of every scenario
+        dict options: Settings for the execution of the experiment
+    :return:
+        list -: Indices of the runs to hand out next
+    '''
+    sens = (experiment.loc[index, 'Scenario'], experiment.loc[index, 'Sensitivity'])
+    if experiment.loc[index, 'State'] == 'done':
+        for i in options['kpis']:
+            experiment.loc[index, 'KPI.' + i] = him_store.get_kpi(experiment.loc[index, 'Path'], i)
+    if len(queue[sens]) == 0:
+        return []
+    if is_converged(experiment, sens, options):
+        print(get_sens_name(sens) + ' converged after ' + str(sum(get_sens_runs(experiment, sens) &
+              (experiment['State'] == 'done'))) + ' runs, ' + str(len(queue[sens])) + ' runs are skipped')
+        experiment.loc[queue[sens], 'State'] = 'skipped'
+        queue[sens] = []
+        return []
+
+    return [queue[sens].pop(0)]
+
+
+def update_sobol(experiment, sobol, order, options):
+    '''
+    Function that will decide if the progressive Sobol needs the next base samples. As soon as all runs of the current
+    base samples are completed the indices are calculated. If they are stable or the design is completed all remaining
+    runs are skipped, otherwise the number of base samples is doubled.
+    :param:
+        pd.DataFrame experiment: List of all runs including their state and KPIs
+        dict sobol: Sensitivity config of the experiment with the current number of base samples and indices
+        list order: Indices of all runs in the order to hand them out
+        dict options: Settings for the execution of the experiment
+    :return:
+        list -: Indices of the runs to hand out next
+    '''
+    step = him_analyze.get_sobol_step(sobol)
+    batch = experiment['Sensitivity'] <= sobol['samples'] * step
+    if sobol['done'] or any(experiment.loc[batch, 'State'].isin(['pending', 'running'])):
+        return []
+
+    him_analyze.update_kpis(experiment, options['kpis'])
+    indices = him_analyze.get_sobol_indices(sobol, him_analyze.get_kpi_means(experiment, options['kpis']),
+                                            options['kpis'], sobol['samples'])
+    converged = him_analyze.is_sobol_converged(indices, sobol['previous'], options['sobol_tol'])
+    if converged or sobol['samples'] * step >= len(sobol['values']):
+        sobol['done'] = True
+        skipped = experiment[~batch & (experiment['State'] == 'pending')].index
+        experiment.loc[skipped, 'State'] = 'skipped'
+        print('Sobol indices ' + ('stable' if converged else 'not stable') + ' after ' + str(sobol['samples'])
+              + ' base samples, ' + str(len(skipped)) + ' runs are skipped')
+        return []
+
+    sobol['previous'] = indices
+    sobol['samples'] *= 2
+    print('Sobol indices not stable after ' + str(sobol['samples'] // 2) + ' base samples, continue with '
+          + str(sobol['samples']))
+    batch = experiment['Sensitivity'] <= sobol['samples'] * step
+
+    return [i for i in order if batch[i] and experiment.loc[i, 'State'] == 'pending']
+
+
+def update_screening(experiment, screening, order, options):
+    '''
+    Function that will decide which sensitivities are run with the full horizon. As soon as all runs of the screening
+    are completed, the sensitivities with the highest screening KPI (promote) are promoted, as well as all
+    sensitivities whose KPI is uncertain, i.e. the cut-off is within two standard errors of the mean or there is no
+    result. The full runs of all other sensitivities are skipped.
+    :param:
+        pd.DataFrame experiment: List of all runs including their state, fidelity and KPIs
+        dict screening: State of the screening
+        list order: Indices of all runs in the order to hand them out
+        dict options: Settings for the execution of the experiment
+    :return:
+        list -: Indices of the runs to hand out next
+    '''
+    low = experiment['Fidelity'] == 'low'
+    if screening['done'] or any(experiment.loc[low, 'State'].isin(['pending', 'running'])):
+        return []
+    screening['done'] = True
+
+    kpi = 'KPI.' + options['screening_kpi']
+    him_analyze.update_kpis(experiment, [options['screening_kpi']])
+    done = experiment[low & (experiment['State'] == 'done')]
+    result = done.groupby('Sensitivity')[kpi].agg(['mean', 'std', 'count']).dropna(subset=['mean'])
+    result = result.reindex(experiment['Sensitivity'].unique())
+    cutoff = result['mean'].quantile(1 - options['promote'])
+    sem = (result['std'] / np.sqrt(result['count'])).fillna(0)
+    promoted = result.index[(result['mean'] >= cutoff) | (result['mean'] + 2 * sem >= cutoff) | result['mean'].isna()]
+
+    high = (experiment['Fidelity'] == 'high') & experiment['Sensitivity'].isin(promoted)
+    skipped = experiment[(experiment['Fidelity'] == 'high') & ~high & (experiment['State'] == 'pending')].index
+    experiment.loc[skipped, 'State'] = 'skipped'
+    print('Screening done, ' + str(len(promoted)) + '/' + str(len(result)) + ' sensitivities are run with the full '
+          + 'horizon, ' + str(len(skipped)) + ' runs are skipped')
+
+    return [i for i in order if high[i] and experiment.loc[i, 'State'] == 'pending']
+
+
+def create_experiment(init_dir=None, name=None, dry_run=False):
+    '''
+    Function that will create the output folder, all run folders and model.config files of a new experiment. With
+    config_files: false only the output folder is created, the config of every run is part of manifest.csv. With a
+    scenario design every scenario gets its own folder with the sensitivities, named like the runs. With a dry run no
+    folder or file is created at all.
+    :param:
+        str init_dir: Folder of the runs.init file (default = current folder)
+        str name: Name of the output folder (default = None, current date and time)
+        bool dry_run: Only create the list of all runs (default = False)
+    :return:
+        str out_dir: Name of the output folder
+        pd.DataFrame experiment: List of all runs including their parameters
+    '''
+    # List of experiments
+    list_experiment = []
 
     # Load the run.init file
-    init = load_init()
-    no_runs, no_conruns, settings, scenario, sens_type, sens_var, sens = (init[0], init[1], init[2], init[3], init[4],
-                                                                          init[5], init[6])
+    init = load_init(init_dir)
+    no_runs, settings, scenario, sens_type, sens_var, sens, options = (init[0], init[2], init[3], init[4], init[5],
+                                                                       init[6], init[7])
 
     # Create Output folder
-    out_dir = create_out_folder()
+    if dry_run:
+        out_dir = 'dry-run' if name is None else name
+        options = dict(options, config_files=False)
+    else:
+        out_dir = create_out_folder(name)
 
     # Create different settings - not necessary for single_run
-    sensitivity = create_sensitivity(sens_var, sens)
+    bounds = [sens[i] for i in sens_var]
+    no_sens_runs = options['sobol_max'] if options['progressive'] else 11
+    sensitivity = create_sensitivity(sens_var, sens, no_sens_runs, sens_type, options['trajectories'],
+                                     options['levels'])
 
     # Create Settings folder
     no_sens = len(sensitivity)
     # Fix for no sensitivity analysis
     if no_sens < 1:
         no_sens = 1
-    i = 1
-    while i <= no_sens:
-        sens_dir = create_sens_folder(out_dir, i)
-        for j in sens_var:
-            sens[j] = sensitivity.iloc[i-1][j]
-
-        j = 1
-        while j <= no_runs:
-            # Create Run folders and model.config
-            run_dir = create_run_folder(sens_dir, j)
-            run_name = create_model_config(run_dir, settings, scenario, sens, j)
-
-            # Add current run to the list of all experiments
-            experiment.loc[len(experiment)] = {'Name': run_name, 'No': j, 'Path': run_dir}
-
-            j += 1
-        i += 1
+    # With a scenario design every scenario has its own folder
+    list_scenario = get_scenarios(scenario, options)
+    list_scenario_dir = []
+    for scenario in list_scenario:
+        scenario_name = get_model_config('', settings, scenario, {}, 0)[0] if options['scenario_design'] != 'none' \
+            else ''
+        scenario_dir = out_dir + '\\' + scenario_name if scenario_name else out_dir
+        if scenario_name:
+            if not dry_run:
+                os.mkdir(os.path.dirname(os.getcwd()) + '\\02_Output\\' + scenario_dir)
+            list_scenario_dir.append(scenario_dir)
+
+        # With screening the design is created a second time for the runs with the short horizon
+        list_fidelity = [['high', scenario_dir]]
+        if options['screening']:
+            list_fidelity.append(['low', scenario_dir + '\\Screening'])
+            if options['config_files']:
+                os.mkdir(os.path.dirname(os.getcwd()) + '\\02_Output\\' + scenario_dir + '\\Screening')
+        list_experiment += create_scenario(list_fidelity, scenario_name, no_sens, no_runs, settings, scenario, sens,
+                                           sens_var, sensitivity, options)
+    print(str(len(list_scenario)) + ' scenarios with ' + str(no_sens) + ' sensitivities and ' + str(no_runs)
+          + ' runs each')
+    experiment = pd.DataFrame(list_experiment)
+    experiment['State'] = 'pending'
+    experiment['Checksum'] = ''
+    experiment['Runtime'] = np.nan
+    experiment['Attempts'] = 0
+    if dry_run:
+        return out_dir, experiment
 
     # Copy run.init file to folder
-    init_file = str(os.getcwd() + '\\runs.init')
+    init_file = str((os.getcwd() if init_dir is None else init_dir) + '\\runs.init')
     out_file = str(os.path.dirname(os.getcwd()) + '\\02_Output\\' + out_dir + '\\runs.init')
     shutil.copy(init_file, out_file)
 
-    # Create sensitivity.config
+    # Create sensitivity.config, with a scenario design in every scenario folder
     if len(sensitivity) > 0:
-        create_sensitivity_file(out_dir, sens_type, sens_var, no_sens, sensitivity)
-
-    # Calculation with multiprocessing
-    with multiprocessing.Pool(no_conruns, initializer=initializer, initargs=(model_dir,)) as executor:
-        results = []
-        for entry in executor.starmap(run_model, experiment.values.tolist()):
-            results.append(entry)
-        results = pd.DataFrame(results)
+        for i in list_scenario_dir if len(list_scenario_dir) > 0 else [out_dir]:
+            create_sensitivity_file(i, sens_type, sens_var, no_sens, sensitivity, bounds, options['levels'])
+
+    return out_dir, experiment
+
+
+def create_scenario(list_fidelity, scenario_name, no_sens, no_runs, settings, scenario, sens, sens_var, sensitivity,
+                    options):
+    '''
+    Function that will create the sensitivity and run folders and model.config files of a scenario.
+    :param:
+        list list_fidelity: Fidelities of the runs, each as [fidelity, output folder]
+        str scenario_name: Name of the scenario folder ('' without scenario design)
+        int no_sens: Number of sensitivities
+        int no_runs: Number of runs per sensitivity
+        dict settings: Dictionary of setting parameters
+        dict scenario: Dictionary of scenario parameters
+        dict sens: Dictionary of sensitivity analysis parameters
+        list sens_var: Parameters of the sensitivity analysis
+        pd.DataFrame sensitivity: Parameters of every sensitivity
+        dict options: Settings for the execution of the experiment
+    :return:
+        list list_experiment: Runs of the scenario, each as dict
+    '''
+    list_experiment = []
+    for fidelity, fidelity_dir in list_fidelity:
+        i = 1
+        while i <= no_sens:
+            sens_dir = create_sens_folder(fidelity_dir, i, options['config_files'])
+            for j in sens_var:
+                sens[j] = sensitivity.iloc[i-1][j]
+
+            j = 1
+            while j <= no_runs:
+                # Create Run folders and model.config
+                run_dir = create_run_folder(sens_dir, j, options['config_files'])
+                seed = get_seed(options, i, j, no_runs)
+                if options['config_files']:
+                    run_name = create_model_config(run_dir, settings, scenario, sens, j, options['branch_year'],
+                                                   seed)
+                else:
+                    run_name = get_model_config(run_dir, settings, scenario, sens, j, options['branch_year'],
+                                                seed)[0]
+
+                # Add current run to the list of all experiments
+                entry = {'Name': run_name, 'No': j, 'Path': run_dir, 'Scenario': scenario_name, 'Sensitivity': i,
+                         'Seed': seed if seed is not None else np.nan, 'Fidelity': fidelity}
+                entry.update(sens)
+                entry.update({str('scenario.' + k): float(scenario[k]) for k in scenario.keys()})
+                list_experiment.append(entry)
+
+                j += 1
+            i += 1
+
+    return list_experiment
+
+
+def get_run(job, i):
+    '''
+    Function that will return a run of an experiment as it is handed out to the workers. Without model.config files the
+    config is built from manifest.csv.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        int i: Index of the run
+    :return:
+        list -: Run as [index, run_name, run_no, run_dir, config, horizon]
+    '''
+    experiment, options = job['experiment'], job['options']
+    config = None if options['config_files'] else get_manifest_config(experiment.loc[i], job['settings'], options)
+    horizon = options['screening_horizon'] if experiment.loc[i, 'Fidelity'] == 'low' else options['horizon']
+
+    return [i] + experiment.loc[i, ['Name', 'No', 'Path']].tolist() + [config, horizon]
+
+
+def update_manifest(job, force=False):
+    '''
+    Function that will write the manifest of an experiment, but not more often than every 10 seconds.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        bool force: Write the manifest in any case (default = False)
+    :return:
+    '''
+    if force or time.time() - job['last_write'] > 10:
+        write_manifest(job['out_path'], job['experiment'])
+        job['last_write'] = time.time()
+
+
+def set_running(job, list_index):
+    '''
+    Function that will mark runs of an experiment as running when they are handed out.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        list list_index: Indices of the runs
+    :return:
+    '''
+    job['experiment'].loc[list_index, 'State'] = 'running'
+    update_manifest(job)
+
+
+def start_experiment(out_path, experiment):
+    '''
+    Function that will prepare a new or resumed experiment for the pool of workers. Runs in the cache are linked and
+    the order of the runs is set by the scheduler, the branches, the adaptive replication, the progressive Sobol and the
+    screening.
+    :param:
+        str out_path: Path of the output folder
+        pd.DataFrame experiment: List of all runs including their state
+    :return:
+        dict job: State of the experiment with the indices of the runs to hand out first (order)
+    '''
+    init = load_init(out_path)
+    settings, options = init[2], init[7]
+    if 'Cached' not in experiment.columns:
+        experiment['Cached'] = False
+    if 'Fidelity' not in experiment.columns:
+        experiment['Fidelity'] = 'high'
+    if 'Stopped' not in experiment.columns:
+        experiment['Stopped'] = np.nan
+    if 'Scenario' not in experiment.columns:
+        experiment['Scenario'] = ''
+    stop = {'years': options['stop_years'], 'tol': options['stop_tol']} if options['early_stop'] else None
+    job = {'out_path': out_path, 'out_dir': os.path.basename(os.path.normpath(out_path)), 'experiment': experiment,
+           'init': init, 'settings': settings, 'options': options, 'stop': stop, 'last_write': time.time(),
+           'cache': {}, 'queue': {}, 'sobol': None, 'screening': None, 'ingest': [], 'ingest_pool': None}
+    write_manifest(out_path, experiment)
+
+    # Runs that are already in the cache are linked instead of run again
+    if options['cache']:
+        model_hash = get_model_hash(os.path.dirname(os.getcwd()))
+        for i in experiment[experiment['State'] != 'done'].index:
+            entry = get_run(job, i)
+            job['cache'][i] = get_cache_path(model_hash, entry[2], get_config(entry[3], entry[4]), entry[5], stop)
+            if load_cache(job['cache'][i], entry[3]):
+                experiment.loc[i, 'State'] = 'done'
+                experiment.loc[i, 'Checksum'] = get_checksum(entry[3])
+                experiment.loc[i, 'Runtime'] = 0.0
+                experiment.loc[i, 'Cached'] = True
+        print(str(sum(experiment['Cached'] == True)) + '/' + str(len(experiment)) + ' runs found in the cache')
+        write_manifest(out_path, experiment)
+
+    # Order of the runs - longest predicted runs first if history is available
+    order = experiment[experiment['State'] != 'done'].index
+    if options['scheduler'].lower() == 'ljf':
+        history = load_runtime_history(job['out_dir'])
+        if len(history) > 0:
+            prediction = pd.Series(predict_runtime(experiment.loc[order], history), index=order)
+            order = prediction.sort_values(ascending=False).index
+            print('Longest-job-first scheduling based on ' + str(len(history)) + ' previous runs')
+        else:
+            print('No runtimes of previous experiments found, runs are scheduled in order')
+
+    # Order of the runs - the first run of every branch is run first, so the others can continue from its branch year
+    if options['branch_year'] > 0:
+        list_first = []
+        list_other = []
+        list_branch = set()
+        for i in order:
+            entry = get_run(job, i)
+            branch_path = get_branch_path(entry[3], entry[2], get_config(entry[3], entry[4]))[1]
+            if branch_path in list_branch:
+                list_other.append(i)
+            else:
+                list_first.append(i)
+                list_branch.add(branch_path)
+        order = list_first + list_other
+        print(str(len(list_first)) + ' branches for ' + str(len(order)) + ' runs, policies start in year '
+              + str(options['branch_year']))
+
+    # Adaptive replication - every sensitivity of every scenario starts with min_runs runs, the next runs are only
+    # handed out as long as the KPIs are not precise enough
+    queue = job['queue']
+    if options['adaptive']:
+        him_analyze.update_kpis(experiment, options['kpis'])
+        list_order = []
+        for sens in experiment[['Scenario', 'Sensitivity']].drop_duplicates().itertuples(index=False, name=None):
+            sens_runs = get_sens_runs(experiment, sens)
+            queue[sens] = [i for i in order if sens_runs[i]]
+            if is_converged(experiment, sens, options):
+                experiment.loc[queue[sens], 'State'] = 'skipped'
+                queue[sens] = []
+            no_done = sum(sens_runs & (experiment['State'] == 'done'))
+            no_start = max(1, options['min_runs'] - no_done)
+            list_order += queue[sens][:no_start]
+            del queue[sens][:no_start]
+        list_order = set(list_order)
+        order = [i for i in order if i in list_order]
+        print('Adaptive replication, ' + str(len(order)) + ' runs are handed out first')
+
+    # Progressive Sobol - the base samples of the design are handed out in doublings, starting with sobol_min, until
+    # the indices are stable
+    job['order_all'] = list(order)
+    if options['progressive'] and init[4] == 'Sobol' and len(init[5]) > 1:
+        sobol = him_analyze.load_sensitivity_config(out_path)
+        sobol.update({'samples': options['sobol_min'], 'previous': None, 'done': False})
+        batch = experiment['Sensitivity'] <= sobol['samples'] * him_analyze.get_sobol_step(sobol)
+        order = [i for i in job['order_all'] if batch[i]]
+        while len(order) == 0 and not sobol['done']:
+            order = update_sobol(experiment, sobol, job['order_all'], options)
+        job['sobol'] = sobol
+        print('Progressive Sobol, ' + str(len(order)) + ' runs of ' + str(sobol['samples']) + ' base samples are '
+              + 'handed out first')
+
+    # Multi-fidelity screening - the design is run with the short horizon first, only the promising or uncertain
+    # sensitivities are promoted to runs with the full horizon
+    if options['screening']:
+        screening = {'done': False}
+        order = [i for i in job['order_all'] if experiment.loc[i, 'Fidelity'] == 'low']
+        while len(order) == 0 and not screening['done']:
+            order = update_screening(experiment, screening, job['order_all'], options)
+        job['screening'] = screening
+        print('Screening with a horizon of ' + str(options['screening_horizon']) + ' years, ' + str(len(order))
+              + ' runs are handed out first')
+    job['order'] = list(order)
+
+    return job
+
+
+def update_experiment(job, index, result, runtime, tables, attempts):
+    '''
+    Function that will save the result of a completed run of an experiment and decide which runs are handed out next.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        int index: Index of the run
+        dict result: Result of the run (False if the run failed)
+        float runtime: Runtime of the run in seconds
+        dict tables: Tables of the run kept in memory (None without settings.memory)
+        int attempts: Number of attempts of the run
+    :return:
+        list list_more: Indices of the runs to hand out next
+    '''
+    experiment, options = job['experiment'], job['options']
+    if result and tables:
+        os.makedirs(experiment.loc[index, 'Path'], exist_ok=True)
+        him_store.save_run(experiment.loc[index, 'Path'], tables)
+    experiment.loc[index, 'State'] = 'done' if result else 'failed'
+    experiment.loc[index, 'Checksum'] = get_checksum(experiment.loc[index, 'Path'])
+    experiment.loc[index, 'Runtime'] = runtime
+    experiment.loc[index, 'Attempts'] = attempts
+    experiment.loc[index, 'Stopped'] = result['stopped'] if result and result['stopped'] is not None else np.nan
+    if result and index in job['cache']:
+        save_cache(job['cache'][index], experiment.loc[index, 'Path'])
+    list_more = []
+    if options['adaptive']:
+        list_more += update_replication(experiment, index, job['queue'], options)
+    if job['sobol'] is not None:
+        list_more += update_sobol(experiment, job['sobol'], job['order_all'], options)
+    if job['screening'] is not None:
+        list_more += update_screening(experiment, job['screening'], job['order_all'], options)
+    if result and options['ingest']:
+        submit_ingest(job, index)
+    update_ingest(job)
+    update_manifest(job)
+
+    return list_more
+
+
+def submit_ingest(job, index):
+    '''
+    Function that will hand out the ingest of a completed run to the pool of processes for the ingest. The pool is
+    started with the first run.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        int index: Index of the run
+    :return:
+    '''
+    if job['ingest_pool'] is None:
+        job['ingest_pool'] = multiprocessing.Pool(processes=job['options']['ingest_processes'])
+    job['ingest'].append([index, job['ingest_pool'].apply_async(him_store.ingest_run, (
+        job['experiment'].loc[index, 'Path'], job['options']['ingest_raw']))])
+
+
+def update_ingest(job, wait=False):
+    '''
+    Function that will save the checksum and the KPIs of all ingested runs, as the ingest changes their output files.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        bool wait: Wait for all runs that are still ingested and close the pool (default = False)
+    :return:
+    '''
+    experiment = job['experiment']
+    list_left = []
+    for index, ingest in job['ingest']:
+        if not wait and not ingest.ready():
+            list_left.append([index, ingest])
+            continue
+        try:
+            values = ingest.get()
+        except Exception as error:
+            print('Warning in update_ingest: Run ' + str(experiment.loc[index, 'No']) + ' could not be ingested ('
+                  + repr(error) + ')')
+            values = {}
+        experiment.loc[index, 'Checksum'] = get_checksum(experiment.loc[index, 'Path'])
+        for kpi in job['options']['kpis']:
+            if kpi in values:
+                experiment.loc[index, 'KPI.' + kpi] = values[kpi]
+    job['ingest'] = list_left
+
+    if wait and job['ingest_pool'] is not None:
+        job['ingest_pool'].close()
+        job['ingest_pool'].join()
+        job['ingest_pool'] = None
+
+
+def finish_experiment(job, analyze=True):
+    '''
+    Function that will finish an experiment when all runs are done and ingested. With a scenario design every scenario
+    folder gets its own manifest.csv, so it can be used like the output folder of a single scenario. Morris and Sobol
+    experiments are analyzed with him_analyze.
+    :param:
+        dict job: State of the experiment (see start_experiment)
+        bool analyze: Analyze the experiment, otherwise it is left to the caller (default = True)
+    :return:
+        list list_scenario_path: Output folders to analyze (empty without Morris or Sobol)
+    '''
+    experiment, options = job['experiment'], job['options']
+    update_ingest(job, wait=True)
+    update_manifest(job, force=True)
+    list_scenario_path = [job['out_path']]
+    if options['scenario_design'] != 'none':
+        list_scenario_path = []
+        for i in experiment['Scenario'].unique():
+            list_scenario_path.append(os.path.join(job['out_path'], i))
+            write_manifest(list_scenario_path[-1], experiment[experiment['Scenario'] == i])
+
+    # Analysis of the sensitivity analysis
+    if job['init'][4] not in ['Morris', 'Sobol']:
+        return []
+    for i in list_scenario_path if analyze else []:
+        him_analyze.analyze_experiment(i, options['kpis'])
+
+    return list_scenario_path
+
+
+def main():
+    # Load the command line arguments
+    args = load_args()
+
+    # Check if model ok
+    model_dir = check_model()
+    model_dir += '\\main.nlogo'
+
+    # Predict the runtime and the size of the output of a new experiment without running it
+    if args['dry_run']:
+        experiment = create_experiment(dry_run=True)[1]
+        print('Dry run with ' + str(len(experiment)) + ' runs')
+        estimate_experiment(experiment, load_init())
+        return
+
+    # Create a new experiment or resume an interrupted one
+    result_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output')
+    if args['resume'] is None:
+        out_dir, experiment = create_experiment()
+        out_path = os.path.join(result_dir, out_dir)
+    else:
+        out_path = args['resume'] if os.path.isdir(args['resume']) else os.path.join(result_dir, args['resume'])
+        out_dir = os.path.basename(os.path.normpath(out_path))
+        print('Resuming experiment ' + out_dir)
+        experiment = load_manifest(out_path)
+    job = start_experiment(out_path, experiment)
+    options = job['options']
+
+    # Runs that are handed out after a run is completed
+    list_more = []
+
+    def get_more():
+        tmp_list = [get_run(job, i) for i in list_more]
+        list_more.clear()
+        return tmp_list
+
+    # Calculation with the pool of workers
+    runs = [get_run(job, i) for i in job['order']]
+    jvm_args, auto = get_pool_sizing(job['init'][1], options)
+    pool = him_pool.start_pool(job['init'][1], initializer, (model_dir, options['warm_start'], job['stop']), run_model,
+                               get_memory, options['recycle_runs'], options['recycle_memory'], options['timeout'],
+                               options['timeout_tick'], jvm_args, auto)
+    try:
+        for index, result, runtime, tables, attempts in schedule_runs(pool, runs, options['chunksize'],
+                                                                      callback=lambda i: set_running(job, i),
+                                                                      retries=options['retries'], more=get_more):
+            list_more += update_experiment(job, index, result, runtime, tables, attempts)
+    finally:
+        him_pool.close_pool(pool)
+        update_manifest(job, force=True)
+
+    finish_experiment(job)
 
     print('done')
 
@@ -0,0 +1,320 @@
+'''
+him - Hydrogen Investment Model
+This script stores the output tables of a run that were collected from the model in memory. All tables of a run are
+saved column by column in one compressed numpy file inside the run folder, so no csv file has to be written or parsed.
+Runs that were written as csv files can be loaded the same way or ingested into the numpy file while the experiment is
+still running, together with a summary of the KPIs over time.
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+             - KPIs of a run for the adaptive replication
+             - KPIs of a run for a list of years for the analysis of the sensitivity indices over time
+             - ingest of the csv files of a run into the numpy file with a summary of the KPIs over time, the csv files
+               can be kept, compressed or deleted
+             - output channels of an experiment from its runs.init, so the plots can skip the tables that were not
+               written
+'''
+
+# import
+import os, gzip, shutil
+import pandas as pd
+import numpy as np
+
+# globals
+global store_file
+global summary_file
+global output_files
+global kpi_settings
+global kpi_series
+
+store_file = 'results.npz'
+summary_file = 'summary.csv'
+output_files = ['pm_year.csv', 'pm_day.csv', 'pp_year.csv', 'res_year.csv', 'hm_year.csv', 'hm_day.csv',
+                'hp_year.csv', 'elc_year.csv', 'em_year.csv', 'ep_year.csv', 'man_year.csv', 'sale_year.csv']
+# KPIs of a run as [file, column, year] - year 0 is 2023
+kpi_settings = {'elc_capacity_2030': ['hm_year.csv', 'Installed capacity Electrolyzers', 7],
+                'elc_capacity_2035': ['hm_year.csv', 'Installed capacity Electrolyzers', 12],
+                'elc_capacity_2050': ['hm_year.csv', 'Installed capacity Electrolyzers', 27],
+                'res_capacity_2050': ['pm_year.csv', 'Installed capacity Renewables', 27],
+                'man_capacity_2050': ['em_year.csv', 'Installed capacity Manufacturings', 27],
+                'elc_price_2050': ['pm_year.csv', 'Weighted Price Electricity', 27],
+                'h2_price_2050': ['hm_year.csv', 'Price Hydrogen', 27],
+                'lcoh_2050': ['hm_year.csv', 'LCOH', 27]}
+# KPIs of a run over time as [file, column]
+kpi_series = {'elc_capacity': ['hm_year.csv', 'Installed capacity Electrolyzers'],
+              'res_capacity': ['pm_year.csv', 'Installed capacity Renewables'],
+              'man_capacity': ['em_year.csv', 'Installed capacity Manufacturings'],
+              'elc_price': ['pm_year.csv', 'Weighted Price Electricity'],
+              'h2_price': ['hm_year.csv', 'Price Hydrogen'],
+              'lcoh': ['hm_year.csv', 'LCOH']}
+
+
+def merge_tables(list_tables):
+    '''
+    Function that will merge the tables of all years of a run into one table per file.
+    :param:
+        list list_tables: Tables of every year, each as dict {file: {column: np.array}}
+    :return:
+        dict tables: Tables of the run as dict {file: {column: np.array}}
+    '''
+    tables = {}
+    for batch in list_tables:
+        for file in batch.keys():
+            if file not in tables:
+                tables[file] = {column: [] for column in batch[file].keys()}
+            for column in batch[file].keys():
+                tables[file][column].append(batch[file][column])
+
+    return {file: {column: np.concatenate(tables[file][column]) for column in tables[file].keys()}
+            for file in tables.keys()}
+
+
+def save_run(run_dir, tables):
+    '''
+    Function that will save the tables of a run. Columns with whole numbers only are saved as integers, like pd.read_csv
+    would load them. The file is replaced in one step, so an interruption never leaves a broken file behind.
+    :param:
+        str run_dir: Path of the run folder
+        dict tables: Tables of the run as dict {file: {column: np.array}}
+    :return:
+    '''
+    arrays = {}
+    for file in tables.keys():
+        for column in tables[file].keys():
+            values = np.asarray(tables[file][column])
+            if values.dtype.kind == 'f' and len(values) > 0 and np.all(np.isfinite(values)) and \
+                    np.all(np.mod(values, 1) == 0):
+                values = values.astype(np.int64)
+            elif values.dtype.kind == 'O':
+                values = values.astype(str)
+            arrays[file + '|' + column] = values
+
+    out_file = os.path.join(run_dir, store_file)
+    with open(out_file + '.tmp', 'wb') as tmp_file:
+        np.savez_compressed(tmp_file, **arrays)
+    os.replace(out_file + '.tmp', out_file)
+
+
+def load_run(run_dir):
+    '''
+    Function that will load all tables of a run from its numpy file.
+    :param:
+        str run_dir: Path of the run folder
+    :return:
+        dict tables: Tables of the run as dict {file: pd.DataFrame}
+    '''
+    tables = {}
+    with np.load(os.path.join(run_dir, store_file)) as data:
+        for key in data.files:
+            file, column = key.split('|', 1)
+            tables.setdefault(file, {})[column] = data[key]
+
+    return {file: pd.DataFrame(tables[file]) for file in tables.keys()}
+
+
+def has_table(run_dir, file):
+    '''
+    Function that will check if a table of a run exists, either in the numpy file or as csv file.
+    :param:
+        str run_dir: Path of the run folder
+        str file: Name of the csv file
+    :return:
+        bool -: True if the table exists
+    '''
+    if os.path.isfile(os.path.join(run_dir, file)):
+        return True
+    if os.path.isfile(os.path.join(run_dir, store_file)):
+        with np.load(os.path.join(run_dir, store_file)) as data:
+            return any(key.split('|', 1)[0] == file for key in data.files)
+
+    return False
+
+
+def get_channels(path):
+    '''
+    Function that will return the output channels of an experiment, read from the runs.init in the given folder or in
+    one of the folders above it (experiment, scenario, sensitivity or run folder).
+    :param:
+        str path: Path of a folder of the experiment
+    :return:
+        list channels: Names of the csv files written by every run (all output_files if the output is not restricted)
+    '''
+    path = os.path.normpath(path)
+    for i in range(4):
+        if os.path.isfile(os.path.join(path, 'runs.init')):
+            with open(os.path.join(path, 'runs.init')) as init_file:
+                for line in init_file.readlines():
+                    line = line.replace(' ', '').replace('\n', '').split(':')
+                    if line[0] == 'output' and len(line) > 1:
+                        channels = [j + '.csv' for j in line[1].strip('[]').split(',') if j]
+                        return channels if len(channels) > 0 else output_files
+            break
+        path = os.path.dirname(path)
+
+    return output_files
+
+
+def load_table(run_dir, file):
+    '''
+    Function that will load a table of a run, either from the numpy file or from the csv file.
+    :param:
+        str run_dir: Path of the run folder
+        str file: Name of the csv file
+    :return:
+        pd.DataFrame -: Table of the run
+    '''
+    if os.path.isfile(os.path.join(run_dir, store_file)):
+        with np.load(os.path.join(run_dir, store_file)) as data:
+            columns = {key.split('|', 1)[1]: data[key] for key in data.files if key.split('|', 1)[0] == file}
+        if len(columns) > 0:
+            return pd.DataFrame(columns)
+
+    return pd.read_csv(os.path.join(run_dir, file), sep=';')
+
+
+def get_summary(tables):
+    '''
+    Function that will summarize the KPIs over time of a run.
+    :param:
+        dict tables: Tables of the run as dict {file: pd.DataFrame}
+    :return:
+        pd.DataFrame summary: Value of every KPI (see kpi_series) for every year, indexed by the year
+    '''
+    summary = {}
+    for kpi in kpi_series.keys():
+        file, column = kpi_series[kpi]
+        if file in tables and column in tables[file].columns:
+            summary[kpi] = tables[file].groupby('Year')[column].first()
+    summary = pd.DataFrame(summary)
+    summary.index.name = 'Year'
+
+    return summary
+
+
+def load_summary(run_dir):
+    '''
+    Function that will load the summary of the KPIs over time of an ingested run.
+    :param:
+        str run_dir: Path of the run folder
+    :return:
+        pd.DataFrame -: Value of every KPI for every year, indexed by the year (None if the run was not ingested)
+    '''
+    if not os.path.isfile(os.path.join(run_dir, summary_file)):
+        return None
+
+    return pd.read_csv(os.path.join(run_dir, summary_file), sep=';').set_index('Year')
+
+
+def ingest_run(run_dir, raw='keep'):
+    '''
+    Function that will ingest the csv files of a completed run into its numpy file and save the summary of its KPIs over
+    time. Tables that are already in the numpy file are kept. The csv files are kept, compressed with gzip or deleted
+    afterwards.
+    :param:
+        str run_dir: Path of the run folder
+        str raw: Handling of the csv files - keep, compress or delete (default = keep)
+    :return:
+        dict values: Value of every KPI of the run (see kpi_settings) as dict {kpi: float}
+    '''
+    list_csv = [file for file in output_files if os.path.isfile(os.path.join(run_dir, file))]
+    tables = load_run(run_dir) if os.path.isfile(os.path.join(run_dir, store_file)) else {}
+    for file in list_csv:
+        tables[file] = pd.read_csv(os.path.join(run_dir, file), sep=';')
+    if len(list_csv) > 0:
+        save_run(run_dir, {file: {column: tables[file][column].values for column in tables[file].columns}
+                           for file in tables.keys()})
+
+    summary = get_summary(tables)
+    if len(summary.columns) > 0:
+        summary.to_csv(os.path.join(run_dir, summary_file + '.tmp'), sep=';')
+        os.replace(os.path.join(run_dir, summary_file + '.tmp'), os.path.join(run_dir, summary_file))
+
+    for file in list_csv if raw != 'keep' else []:
+        if raw == 'compress':
+            with open(os.path.join(run_dir, file), 'rb') as csv_file:
+                with gzip.open(os.path.join(run_dir, file + '.gz'), 'wb') as gz_file:
+                    shutil.copyfileobj(csv_file, gz_file)
+        os.remove(os.path.join(run_dir, file))
+
+    return {kpi: get_kpi(run_dir, kpi) for kpi in kpi_settings.keys()}
+
+
+def get_series_name(file, column):
+    '''
+    Function that will return the name of the KPI over time for a column of a table.
+    :param:
+        str file: Name of the csv file
+        str column: Name of the column
+    :return:
+        str -: Name of the KPI (see kpi_series, None if the column is not a KPI over time)
+    '''
+    for kpi in kpi_series.keys():
+        if kpi_series[kpi] == [file, column]:
+            return kpi
+
+    return None
+
+
+def get_kpi(run_dir, kpi):
+    '''
+    Function that will report a KPI of a run. The KPI is taken from the summary of an ingested run if possible.
+    :param:
+        str run_dir: Path of the run folder
+        str kpi: Name of the KPI (see kpi_settings)
+    :return:
+        float -: Value of the KPI (np.nan if the table or the year is missing)
+    '''
+    file, column, year = kpi_settings[kpi]
+    summary = load_summary(run_dir)
+    series = get_series_name(file, column)
+    if summary is not None and series in summary.columns:
+        return float(summary.loc[year, series]) if year in summary.index else np.nan
+
+    try:
+        table = load_table(run_dir, file)
+    except FileNotFoundError:
+        return np.nan
+    values = table.loc[table['Year'] == year, column]
+    if len(values) == 0:
+        return np.nan
+
+    return float(values.iloc[0])
+
+
+def get_kpi_series(run_dir, kpis, years):
+    '''
+    Function that will report KPIs of a run for a list of years. Every table is only loaded once, the KPIs of an
+    ingested run are taken from its summary.
+    :param:
+        str run_dir: Path of the run folder
+        list kpis: Names of the KPIs (see kpi_series)
+        list years: Years of the KPIs - year 0 is 2023
+    :return:
+        dict values: Value of every KPI and year as dict {(kpi, year): float} (np.nan if the table or the year is
+                     missing)
+    '''
+    values = {}
+    tables = {}
+    summary = load_summary(run_dir)
+    for kpi in kpis:
+        if summary is not None and kpi in summary.columns:
+            for year in years:
+                values[(kpi, year)] = float(summary.loc[year, kpi]) if year in summary.index else np.nan
+            continue
+        file, column = kpi_series[kpi]
+        if file not in tables:
+            try:
+                tables[file] = load_table(run_dir, file).set_index('Year')
+            except FileNotFoundError:
+                tables[file] = None
+        for year in years:
+            if tables[file] is None or year not in tables[file].index:
+                values[(kpi, year)] = np.nan
+            else:
+                values[(kpi, year)] = float(np.asarray(tables[file].loc[year, column]).ravel()[0])
+
+    return values
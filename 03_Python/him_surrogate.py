@@ -0,0 +1,280 @@
+'''
+him - Hydrogen Investment Model
+This script trains surrogates of the model on the results of a completed experiment. For every KPI a Gaussian process
+is fitted on the parameters of the sensitivity analysis and the mean KPI of every sensitivity. A query is answered with
+the mean and the standard deviation of the prediction and is flagged if it lies outside of the trained region or the
+prediction is too uncertain, so a real run of the model is needed.
+
+Use:
+python him_surrogate.py <outdir> train [kpi, ...]
+python him_surrogate.py <outdir> query <parameter>=<value> [<parameter>=<value>, ...]
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+             - queries with unknown parameters are rejected, parameters set to the centre are reported as Filled
+'''
+
+# import
+import os, sys
+import pandas as pd
+import numpy as np
+from scipy import linalg, optimize
+import him_analyze, him_store
+
+# globals
+global surrogate_file
+global surrogate_settings
+
+surrogate_file = 'surrogate.npz'
+# max_points: sensitivities used for training (random subset), restarts: fits with different start values, domain_tol:
+# tolerance of the trained region relative to the range of every parameter, max_std: standard deviation of a prediction
+# relative to the prior above which it is flagged as uncertain
+surrogate_settings = {'max_points': 1000, 'restarts': 3, 'domain_tol': 0.0, 'max_std': 0.5, 'seed': 0}
+
+
+def get_kernel(x_1, x_2, length, variance):
+    '''
+    Function that will calculate the squared exponential kernel with one length scale per parameter.
+    :param:
+        np.array x_1: Scaled parameters of the first points
+        np.array x_2: Scaled parameters of the second points
+        np.array length: Length scale of every parameter
+        float variance: Variance of the kernel
+    :return:
+        np.array -: Covariance of all pairs of points
+    '''
+    distance = (x_1[:, None, :] - x_2[None, :, :]) / length
+
+    return variance * np.exp(-0.5 * np.sum(distance ** 2, axis=2))
+
+
+def get_neg_log_likelihood(theta, x, y):
+    '''
+    Function that will calculate the negative log marginal likelihood of a Gaussian process.
+    :param:
+        np.array theta: Log of the length scales, the variance and the noise
+        np.array x: Scaled parameters of the training points
+        np.array y: Standardized KPI of the training points
+    :return:
+        float -: Negative log marginal likelihood
+    '''
+    k = get_kernel(x, x, np.exp(theta[:-2]), np.exp(theta[-2])) + (np.exp(theta[-1]) + 1e-8) * np.eye(len(x))
+    try:
+        chol = linalg.cholesky(k, lower=True)
+    except linalg.LinAlgError:
+        return 1e10
+    alpha = linalg.cho_solve((chol, True), y)
+
+    return 0.5 * y @ alpha + np.sum(np.log(np.diag(chol))) + 0.5 * len(x) * np.log(2 * np.pi)
+
+
+def fit_gp(x, y, restarts=3, seed=0):
+    '''
+    Function that will fit a Gaussian process by maximizing the log marginal likelihood from several start values.
+    :param:
+        np.array x: Scaled parameters of the training points
+        np.array y: Standardized KPI of the training points
+        int restarts: Number of start values (default = 3)
+        int seed: Seed for the start values (default = 0)
+    :return:
+        dict gp: Length scales, variance, noise, weights and Cholesky factor of the Gaussian process
+    '''
+    rng = np.random.default_rng(seed)
+    bounds = [(np.log(1e-2), np.log(1e2))] * x.shape[1] + [(np.log(1e-2), np.log(1e2)), (np.log(1e-8), 0.0)]
+    best = None
+    for i in range(restarts):
+        theta = np.concatenate([np.log(rng.uniform(0.1, 1.0, x.shape[1])), [0.0, np.log(1e-2)]])
+        result = optimize.minimize(get_neg_log_likelihood, theta, args=(x, y), method='L-BFGS-B', bounds=bounds)
+        if best is None or result.fun < best.fun:
+            best = result
+
+    length, variance, noise = np.exp(best.x[:-2]), np.exp(best.x[-2]), np.exp(best.x[-1])
+    chol = linalg.cholesky(get_kernel(x, x, length, variance) + (noise + 1e-8) * np.eye(len(x)), lower=True)
+
+    return {'length': length, 'variance': variance, 'noise': noise, 'alpha': linalg.cho_solve((chol, True), y),
+            'chol': chol}
+
+
+def train_surrogate(out_path, kpis=None):
+    '''
+    Function that will train a Gaussian process for every KPI on the parameters and the mean KPI of every sensitivity
+    of an experiment. Parameters are scaled to the trained region, KPIs are standardized. Sensitivities without
+    completed runs are left out.
+    :param:
+        str out_path: Path of the output folder
+        list kpis: Names of the KPIs (default = None, all of him_store.kpi_settings)
+    :return:
+        dict surrogate: Parameters, trained region, training points and Gaussian process of every KPI
+    '''
+    kpis = list(him_store.kpi_settings.keys()) if kpis is None else kpis
+    config = him_analyze.load_sensitivity_config(out_path)
+    if len(config['parameters']) == 0:
+        print('Error in train_surrogate: No parameters in the sensitivity.config of ' + out_path + '.')
+        exit(100)
+    experiment = pd.read_csv(os.path.join(out_path, 'manifest.csv'), sep=';')
+    x_all = experiment.groupby('Sensitivity')[config['parameters']].first().astype(float)
+    means = him_analyze.load_kpis(out_path, kpis).reindex(x_all.index)
+
+    x_min = x_all.min().values
+    x_max = x_all.max().values
+    surrogate = {'parameters': config['parameters'], 'x_min': x_min, 'x_max': x_max, 'kpis': {}}
+    rng = np.random.default_rng(surrogate_settings['seed'])
+    for i in kpis:
+        y = means['KPI.' + i].values
+        index = np.where(np.isfinite(y))[0]
+        if len(index) < 2:
+            print('Warning in train_surrogate: Not enough completed sensitivities for ' + i + '.')
+            continue
+        if len(index) > surrogate_settings['max_points']:
+            index = np.sort(rng.choice(index, surrogate_settings['max_points'], replace=False))
+        x = get_scaled(surrogate, x_all.values[index])
+        y_mean, y_std = np.mean(y[index]), np.std(y[index])
+        y_std = y_std if y_std > 0 else 1.0
+        gp = fit_gp(x, (y[index] - y_mean) / y_std, surrogate_settings['restarts'], surrogate_settings['seed'])
+        gp.update({'x': x, 'y_mean': y_mean, 'y_std': y_std})
+        surrogate['kpis'][i] = gp
+        print('Surrogate for ' + i + ' trained on ' + str(len(index)) + ' sensitivities')
+
+    return surrogate
+
+
+def get_scaled(surrogate, values):
+    '''
+    Function that will scale parameters to the trained region, which is [0, 1] for every parameter.
+    :param:
+        dict surrogate: Surrogate of the model
+        np.array values: Parameters of the points
+    :return:
+        np.array -: Scaled parameters of the points
+    '''
+    span = np.where(surrogate['x_max'] > surrogate['x_min'], surrogate['x_max'] - surrogate['x_min'], 1.0)
+
+    return (np.asarray(values, dtype=float) - surrogate['x_min']) / span
+
+
+def save_surrogate(out_path, surrogate):
+    '''
+    Function that will save the surrogate into the output folder of the experiment.
+    :param:
+        str out_path: Path of the output folder
+        dict surrogate: Surrogate of the model
+    :return:
+    '''
+    arrays = {'parameters': np.array(surrogate['parameters']), 'x_min': surrogate['x_min'],
+              'x_max': surrogate['x_max']}
+    for i in surrogate['kpis'].keys():
+        for j in surrogate['kpis'][i].keys():
+            arrays[i + '|' + j] = np.asarray(surrogate['kpis'][i][j])
+
+    out_file = os.path.join(out_path, surrogate_file)
+    with open(out_file + '.tmp', 'wb') as tmp_file:
+        np.savez_compressed(tmp_file, **arrays)
+    os.replace(out_file + '.tmp', out_file)
+
+
+def load_surrogate(out_path):
+    '''
+    Function that will load the surrogate of an experiment.
+    :param:
+        str out_path: Path of the output folder
+    :return:
+        dict surrogate: Surrogate of the model
+    '''
+    try:
+        data = np.load(os.path.join(out_path, surrogate_file))
+    except FileNotFoundError:
+        print('Error in load_surrogate: ' + surrogate_file + ' not found in ' + out_path + '. Train it first.')
+        exit(200)
+
+    surrogate = {'parameters': [str(i) for i in data['parameters']], 'x_min': data['x_min'], 'x_max': data['x_max'],
+                 'kpis': {}}
+    for key in data.files:
+        if '|' in key:
+            kpi, name = key.split('|', 1)
+            value = data[key]
+            surrogate['kpis'].setdefault(kpi, {})[name] = value if value.ndim > 0 else float(value)
+    data.close()
+
+    return surrogate
+
+
+def predict(surrogate, queries):
+    '''
+    Function that will predict the KPIs for a list of parameters. Parameters that are missing in a query are set to the
+    centre of the trained region and listed in the Filled column. A query is flagged as outside if any parameter is
+    outside of the trained region and a KPI as uncertain if its standard deviation is above max_std relative to the
+    prior.
+    :param:
+        dict surrogate: Surrogate of the model
+        pd.DataFrame queries: Parameters of every query, one column per parameter
+    :return:
+        pd.DataFrame result: Queries with the filled parameters, the mean, standard deviation and uncertain flag of
+                             every KPI and the outside flag
+    '''
+    unknown = [i for i in queries.columns if i not in surrogate['parameters']]
+    if len(unknown) > 0:
+        raise ValueError('Unknown parameters ' + ', '.join(unknown) + ', the surrogate is trained on '
+                         + ', '.join(surrogate['parameters']))
+    result = queries.copy()
+    result['Filled'] = ','.join(i for i in surrogate['parameters'] if i not in queries.columns)
+    values = np.column_stack([queries[i].astype(float).values if i in queries.columns else
+                              np.repeat((surrogate['x_min'][j] + surrogate['x_max'][j]) / 2, len(queries))
+                              for j, i in enumerate(surrogate['parameters'])])
+    x = get_scaled(surrogate, values)
+    tol = surrogate_settings['domain_tol']
+    result['Outside'] = np.any((x < -tol) | (x > 1 + tol), axis=1)
+
+    for i in surrogate['kpis'].keys():
+        gp = surrogate['kpis'][i]
+        k = get_kernel(x, gp['x'], gp['length'], gp['variance'])
+        v = linalg.solve_triangular(gp['chol'], k.T, lower=True)
+        std = np.sqrt(np.clip(gp['variance'] - np.sum(v ** 2, axis=0), 0, None))
+        result[i] = gp['y_mean'] + gp['y_std'] * (k @ gp['alpha'])
+        result[i + ' std'] = gp['y_std'] * std
+        result[i + ' uncertain'] = std > surrogate_settings['max_std'] * np.sqrt(gp['variance'])
+
+    return result
+
+
+def predict_grid(surrogate, name_x, values_x, name_y, values_y, fixed=None):
+    '''
+    Function that will predict the KPIs on a grid of two parameters, e.g. for a heatmap. All other parameters are set to
+    the fixed values or the centre of the trained region.
+    :param:
+        dict surrogate: Surrogate of the model
+        str name_x: Name of the first parameter
+        list values_x: Values of the first parameter
+        str name_y: Name of the second parameter
+        list values_y: Values of the second parameter
+        dict fixed: Values of the other parameters (default = None)
+    :return:
+        pd.DataFrame result: Grid with the mean, standard deviation and flags of every KPI (see predict)
+    '''
+    grid = pd.DataFrame([{name_x: i, name_y: j} for i in values_x for j in values_y])
+    if fixed is not None:
+        for i in fixed.keys():
+            grid[i] = fixed[i]
+
+    return predict(surrogate, grid)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[2] not in ['train', 'query']:
+        print('Error: Use python him_surrogate.py <outdir> train [kpi, ...] or python him_surrogate.py <outdir> query '
+              '<parameter>=<value> [...]')
+        exit(300)
+    result_dir = os.path.join(os.path.dirname(os.getcwd()), '02_Output')
+    path = sys.argv[1] if os.path.isdir(sys.argv[1]) else os.path.join(result_dir, sys.argv[1])
+    if sys.argv[2] == 'train':
+        save_surrogate(path, train_surrogate(path, sys.argv[3:] if len(sys.argv) > 3 else None))
+    else:
+        query = pd.DataFrame([{i.split('=')[0]: float(i.split('=')[1]) for i in sys.argv[3:]}])
+        try:
+            print(predict(load_surrogate(path), query).T.to_string())
+        except ValueError as error:
+            print('Error: ' + str(error) + '.')
+            exit(301)
@@ -0,0 +1,68 @@
+'''
+him - Hydrogen Investment Model
+Tests for the acknowledgement of runs in the work queue of him_queue. Run with python -m unittest in 03_Python.
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+'''
+
+# import
+import os, json, tempfile, unittest
+import him_queue
+
+
+def get_task(index):
+    '''
+    Function that will return a task of the queue without a model config.
+    :param:
+        int index: Index of the run
+    :return:
+        dict -: Run as dict (see him_queue.get_task)
+    '''
+    return {'index': index, 'name': 'Sensitivity_1', 'no': index + 1, 'path': os.path.join('Sensitivity_1', 'Run_1'),
+            'config': None, 'horizon': 80, 'warm_start': 'none', 'stop': False, 'timeout': 0.0, 'timeout_tick': 0.0}
+
+
+class TestAckTask(unittest.TestCase):
+    def test_ack(self):
+        with tempfile.TemporaryDirectory() as out_path:
+            queue = him_queue.get_queue_dir(out_path)
+            him_queue.write_task(queue, 0, get_task(3))
+            lease_file, task = him_queue.claim_task(queue, 'host-1')
+            self.assertEqual(task['index'], 3)
+            self.assertTrue(him_queue.ack_task(queue, lease_file, {'stopped': None}, 1.5, 'host-1'))
+
+            name = os.path.basename(lease_file)
+            self.assertEqual(os.listdir(queue['leased']), [])
+            self.assertEqual(os.listdir(queue['done']), [name])
+            self.assertEqual(os.listdir(queue['work']), [name])
+            with open(os.path.join(queue['work'], name)) as result_file:
+                self.assertEqual(json.load(result_file)['runtime'], 1.5)
+
+    def test_expired_lease(self):
+        with tempfile.TemporaryDirectory() as out_path:
+            queue = him_queue.get_queue_dir(out_path)
+            him_queue.write_task(queue, 0, get_task(3))
+            lease_file, task = him_queue.claim_task(queue, 'host-1')
+
+            # The lease expired, the coordinator put the task back into the queue and another worker claimed it
+            os.rename(lease_file, os.path.join(queue['pending'], '000000_3.json'))
+            lease_file_2, task_2 = him_queue.claim_task(queue, 'host-2')
+            self.assertEqual(task_2['index'], 3)
+
+            # The first worker finishes late, its result is dropped and nothing of the second worker is touched
+            self.assertFalse(him_queue.ack_task(queue, lease_file, {'stopped': None}, 1.0, 'host-1'))
+            self.assertEqual(os.listdir(queue['work']), [])
+            self.assertEqual(os.listdir(queue['done']), [])
+            self.assertEqual(os.listdir(queue['leased']), [os.path.basename(lease_file_2)])
+
+            self.assertTrue(him_queue.ack_task(queue, lease_file_2, {'stopped': None}, 2.0, 'host-2'))
+            self.assertEqual(os.listdir(queue['done']), [os.path.basename(lease_file_2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+'''
+him - Hydrogen Investment Model
+Tests for the early stop and the filling of the years after an early stop in him_run_model. Run with python -m unittest in 03_Python.
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+'''
+
+# import
+import os, tempfile, unittest
+import numpy as np
+import him_run_model
+
+
+def write_csv(run_dir, file, years):
+    '''
+    Function that will write an output table with two lines per year.
+    :param:
+        str run_dir: Path of the run folder
+        str file: Name of the csv file
+        list years: Years of the table
+    :return:
+    '''
+    with open(os.path.join(run_dir, file), 'w', newline='') as csv_file:
+        csv_file.write('Year;Day;Value\n')
+        for i in years:
+            for j in [1, 2]:
+                csv_file.write(str(i) + ';' + str(j) + ';' + str(i * 10 + j) + '\n')
+
+
+def read_years(run_dir, file):
+    '''
+    Function that will read the years and values of an output table.
+    :param:
+        str run_dir: Path of the run folder
+        str file: Name of the csv file
+    :return:
+        dict years: Values of every year as dict {year: list}
+    '''
+    years = {}
+    with open(os.path.join(run_dir, file)) as csv_file:
+        for line in csv_file.readlines()[1:]:
+            values = line.strip().split(';')
+            years.setdefault(int(values[0]), []).append(int(values[2]))
+
+    return years
+
+
+def get_values(hp, elc, years):
+    '''
+    Function that will return the values of stop_reporters of every year with constant values except the first two.
+    :param:
+        list hp: Number of live hydrogen producers of every year
+        list elc: Electrolyzer capacity of every year
+        int years: Number of years
+    :return:
+        list -: Values of stop_reporters of every year
+    '''
+    return [[hp[i], elc[i]] + [10.0] * (len(him_run_model.stop_reporters) - 2) for i in range(years)]
+
+
+class TestIsStopped(unittest.TestCase):
+    def test_stop_reporters(self):
+        self.assertEqual(him_run_model.stop_reporters[0], 'count HydrogenProducers with [HP.alive]')
+        self.assertEqual(him_run_model.stop_reporters[1], 'sum [ELC.capacity] of Electrolyzers')
+
+    def test_degenerate(self):
+        values = get_values([3, 1, 0, 0, 0, 0], [50.0, 5.0, 0.0, 0.0, 0.0, 0.0], 6)
+        self.assertEqual(him_run_model.is_stopped(values, 3, 1e-6), 'degenerate')
+        self.assertIsNone(him_run_model.is_stopped(values, 5, 1e-6))
+
+    def test_degenerate_time_lag(self):
+        # With a time lag new producers are created later, so the run is steady at most
+        values = get_values([3, 1, 0, 0, 0, 0], [50.0, 5.0, 0.0, 0.0, 0.0, 0.0], 6)
+        self.assertEqual(him_run_model.is_stopped(values, 3, 1e-6, degenerate=False), 'steady')
+        values[-1][2] = 12.0
+        self.assertIsNone(him_run_model.is_stopped(values, 3, 1e-6, degenerate=False))
+
+    def test_steady(self):
+        values = get_values([4, 4, 4, 4], [80.0, 80.0, 80.0, 80.0], 4)
+        self.assertEqual(him_run_model.is_stopped(values, 3, 1e-6), 'steady')
+
+    def test_continue(self):
+        values = get_values([4, 4, 5, 5], [80.0, 80.0, 95.0, 95.0], 4)
+        self.assertIsNone(him_run_model.is_stopped(values, 3, 1e-6))
+        self.assertIsNone(him_run_model.is_stopped(values[:3], 3, 1e-6))
+        self.assertIsNone(him_run_model.is_stopped(get_values([4] * 4, [80.0] * 4, 4), 0, 1e-6))
+
+
+class TestFillYears(unittest.TestCase):
+    def test_csv_day_years(self):
+        # Stop in year 5, the daily data is sampled every 3 years, so the stop year itself has no daily data
+        day_years = list(range(0, 80, 3))
+        with tempfile.TemporaryDirectory() as run_dir:
+            write_csv(run_dir, 'pm_year.csv', range(0, 6))
+            write_csv(run_dir, 'pm_day.csv', [0, 3])
+            him_run_model.fill_years(run_dir, None, 5, day_years=day_years)
+
+            year = read_years(run_dir, 'pm_year.csv')
+            self.assertEqual(sorted(year.keys()), list(range(0, 80)))
+            self.assertEqual(year[79], [51, 52])
+            day = read_years(run_dir, 'pm_day.csv')
+            self.assertEqual(sorted(day.keys()), day_years)
+            self.assertEqual(day[6], [31, 32])
+            self.assertEqual(day[78], [31, 32])
+
+    def test_csv_all_years(self):
+        with tempfile.TemporaryDirectory() as run_dir:
+            write_csv(run_dir, 'hm_day.csv', range(0, 11))
+            him_run_model.fill_years(run_dir, None, 10)
+            day = read_years(run_dir, 'hm_day.csv')
+            self.assertEqual(sorted(day.keys()), list(range(0, 80)))
+            self.assertEqual(day[11], [101, 102])
+
+    def test_memory_day_years(self):
+        day_years = [7, 27, 50]
+        tables = {'pm_year.csv': {'Year': np.array([30]), 'Value': np.array([301])},
+                  'pm_day.csv': {'Year': np.array([27, 27]), 'Value': np.array([271, 272])}}
+        filled = {}
+        him_run_model.fill_years(None, tables, 30, callback=lambda tick, batch: filled.update({tick: batch}),
+                                 day_years=day_years)
+        self.assertEqual(sorted(filled.keys()), list(range(31, 80)))
+        self.assertNotIn('pm_day.csv', filled[31])
+        self.assertEqual(list(filled[50]['pm_day.csv']['Year']), [50, 50])
+        self.assertEqual(list(filled[50]['pm_day.csv']['Value']), [271, 272])
+        self.assertEqual(list(filled[79]['pm_year.csv']['Year']), [79])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+him - Hydrogen Investment Model
+Tests for the queries of the surrogate in him_surrogate. Run with python -m unittest in 03_Python.
+
+version: 0.1.26.10.18
+date: 2026-10-18
+author: Jesse
+
+changelog:
+0.1.26.10.18 - start new script
+'''
+
+# import
+import unittest
+import pandas as pd
+import numpy as np
+import him_surrogate
+
+
+def get_surrogate():
+    '''
+    Function that will train a small surrogate on a KPI that only depends on the first of two parameters.
+    :return:
+        dict surrogate: Surrogate of the model
+    '''
+    rng = np.random.default_rng(0)
+    values = rng.uniform([0.0, 10.0], [1.0, 20.0], (20, 2))
+    surrogate = {'parameters': ['const.beta', 'const.gamma'], 'x_min': np.array([0.0, 10.0]),
+                 'x_max': np.array([1.0, 20.0]), 'kpis': {}}
+    x = him_surrogate.get_scaled(surrogate, values)
+    y = 2 * values[:, 0]
+    gp = him_surrogate.fit_gp(x, (y - np.mean(y)) / np.std(y), restarts=1)
+    gp.update({'x': x, 'y_mean': np.mean(y), 'y_std': np.std(y)})
+    surrogate['kpis']['lcoh_2050'] = gp
+
+    return surrogate
+
+
+class TestPredict(unittest.TestCase):
+    def setUp(self):
+        self.surrogate = get_surrogate()
+
+    def test_unknown_parameter(self):
+        queries = pd.DataFrame([{'const.beta': 0.5, 'const.gama': 15.0}])
+        with self.assertRaises(ValueError) as error:
+            him_surrogate.predict(self.surrogate, queries)
+        self.assertIn('const.gama', str(error.exception))
+
+    def test_missing_parameter(self):
+        queries = pd.DataFrame([{'const.beta': 0.5}])
+        result = him_surrogate.predict(self.surrogate, queries)
+        self.assertEqual(result.loc[0, 'Filled'], 'const.gamma')
+        self.assertFalse(result.loc[0, 'Outside'])
+        self.assertAlmostEqual(result.loc[0, 'lcoh_2050'], 1.0, delta=0.1)
+
+    def test_all_parameters(self):
+        queries = pd.DataFrame([{'const.beta': 0.25, 'const.gamma': 12.0}])
+        result = him_surrogate.predict(self.surrogate, queries)
+        self.assertEqual(result.loc[0, 'Filled'], '')
+        self.assertAlmostEqual(result.loc[0, 'lcoh_2050'], 0.5, delta=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()